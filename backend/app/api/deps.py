@@ -1,45 +1,105 @@
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.core import security
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
+from app.core import security, config, metrics, request_context
+from app.core.logging_config import debug_sampled
+from app.core.cache import LRUCache
 from app.models.user import User
 
+logger = logging.getLogger(__name__)
+
 # Points to the endpoint where the client gets the token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
-def get_current_user(
+@dataclass(frozen=True)
+class CurrentUser:
+    """
+    Read-only snapshot of the authenticated user.
+    Handlers that need to change the row must use get_current_user_db instead.
+    """
+    id: int
+    email: str
+    first_name: str
+    last_name: str
+    dob: Optional[date]
+    location: Optional[str]
+    role: str
+    is_active: bool
+    is_banned: bool
+    plan: str
+    subscription_expiry: Optional[datetime]
+
+    @classmethod
+    def from_orm_user(cls, user: User) -> "CurrentUser":
+        return cls(
+            id=user.id, email=user.email, first_name=user.first_name, last_name=user.last_name,
+            dob=user.dob, location=user.location, role=user.role, is_active=user.is_active,
+            is_banned=user.is_banned, plan=user.plan, subscription_expiry=user.subscription_expiry
+        )
+
+# Per-process cache keyed by token subject (email). Avoids the user lookup on every request.
+principal_cache = LRUCache("principal", maxsize=config.PRINCIPAL_CACHE_MAX_SIZE, ttl=config.PRINCIPAL_CACHE_TTL_SECONDS)
+metrics.register("principal_cache", principal_cache.stats)
+
+def invalidate_user(email: Optional[str]) -> None:
+    """Call after any write to a user row so this worker stops serving the old snapshot."""
+    if email:
+        principal_cache.delete(email)
+
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
+    db: AsyncSession = Depends(get_async_db)
+) -> CurrentUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
     try:
-        # DEBUG LOGS
-        print(f"🕵️‍♂️ [DEBUG] Token received: {token[:10]}...") 
-        
         payload = jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
-        
+
         email: str = payload.get("sub")
         if email is None:
-            print("❌ [DEBUG] No 'sub' (email) in token.")
+            debug_sampled(logger, "Token has no 'sub' claim")
             raise credentials_exception
-            
+
     except JWTError as e:
-        print(f"❌ [DEBUG] JWT Decode Error: {e}")
+        debug_sampled(logger, "JWT decode error: %s", e)
         raise credentials_exception
-        
+
+    # Token is still verified on every request; only the DB lookup is cached
+    principal = principal_cache.get(email)
+    if principal is not None:
+        request_context.set_user(principal.id)
+        return principal
+
     # Fetch User from DB
-    user = db.query(User).filter(User.email == email).first()
+    user = await db.scalar(select(User).filter(User.email == email))
     if user is None:
-        print(f"❌ [DEBUG] User {email} not found in Database.")
+        debug_sampled(logger, "Token subject not found in database")
         raise credentials_exception
-        
-    # FIXED LINE BELOW: Changed .full_name to .first_name
-    print(f"✅ [DEBUG] User authenticated: {user.first_name}")
-    return user
\ No newline at end of file
+
+    principal = CurrentUser.from_orm_user(user)
+    principal_cache.set(email, principal)
+    request_context.set_user(principal.id)
+    debug_sampled(logger, "Authenticated user %s (cache miss)", principal.id)
+    return principal
+
+async def get_current_user_db(
+    principal: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """Loads the live ORM row for handlers that modify the current user."""
+    user = await db.get(User, principal.id)
+    if user is None:
+        invalidate_user(principal.email)
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials", headers={"WWW-Authenticate": "Bearer"})
+    return user
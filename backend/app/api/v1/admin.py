@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel
-from app.core.database import get_db
+from app.core.database import get_async_db
+from app.core.response_cache import cache, DOCTORS, doctor_tag
 from app.models.user import User
 from app.models.doctor import Doctor
 from app.models.appointment import Appointment
@@ -11,10 +13,11 @@ from app.models.audit import AuditLog
 from app.schemas.user import UserResponse
 from app.schemas.doctor import DoctorResponse
 from app.api import deps
+from app.services import platform_stats
 
 router = APIRouter()
 
-def get_current_admin(current_user: User = Depends(deps.get_current_user)):
+def get_current_admin(current_user: deps.CurrentUser = Depends(deps.get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access only")
     return current_user
@@ -27,60 +30,60 @@ class AdminStats(BaseModel):
     active_appointments: int
 
 @router.get("/stats", response_model=AdminStats)
-def get_admin_stats(db: Session = Depends(get_db), admin: User = Depends(get_current_admin)):
-    total_users = db.query(User).filter(User.role == "patient").count()
-    total_doctors = db.query(User).filter(User.role == "doctor").count()
-    pending_verifications = db.query(Doctor).filter(Doctor.is_verified == False).count()
-    
-    paid_appts = db.query(Appointment).filter(Appointment.payment_status == "paid").all()
-    total_revenue = sum(a.amount for a in paid_appts)
-    
-    active_appointments = db.query(Appointment).filter(Appointment.status.in_(["pending", "confirmed"])).count()
+async def get_admin_stats(db: AsyncSession = Depends(get_async_db), admin: deps.CurrentUser = Depends(get_current_admin)):
+    # Running totals (app/services/platform_stats.py): a handful of rows, however many appointments exist
+    return await platform_stats.read(db)
 
-    return {
-        "total_users": total_users,
-        "total_doctors": total_doctors,
-        "pending_verifications": pending_verifications,
-        "total_revenue": total_revenue,
-        "active_appointments": active_appointments
-    }
+@router.post("/stats/recompute", response_model=AdminStats)
+async def recompute_admin_stats(db: AsyncSession = Depends(get_async_db), admin: deps.CurrentUser = Depends(get_current_admin)):
+    """Rebuilds the totals from the source tables. For drift after seeds or manual SQL; scans everything."""
+    totals = await db.run_sync(lambda session: platform_stats.recompute(session.connection()))
+    await db.commit()
+    return totals
 
 @router.get("/users", response_model=List[UserResponse])
-def get_all_users(role: Optional[str] = None, db: Session = Depends(get_db), admin: User = Depends(get_current_admin)):
-    query = db.query(User)
+async def get_all_users(role: Optional[str] = None, db: AsyncSession = Depends(get_async_db), admin: deps.CurrentUser = Depends(get_current_admin)):
+    query = select(User)
     if role: query = query.filter(User.role == role)
-    return query.all()
+    return (await db.scalars(query)).all()
 
 @router.put("/users/{user_id}/suspend")
-def suspend_user(user_id: int, db: Session = Depends(get_db), admin: User = Depends(get_current_admin)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def suspend_user(user_id: int, db: AsyncSession = Depends(get_async_db), admin: deps.CurrentUser = Depends(get_current_admin)):
+    user = await db.scalar(select(User).filter(User.id == user_id))
     if not user: raise HTTPException(404, "User not found")
     user.is_banned = not user.is_banned
-    db.commit()
+    await db.commit()
+    deps.invalidate_user(user.email)
     status = "suspended" if user.is_banned else "active"
     return {"message": f"User is now {status}."}
 
 # --- NEW: FETCH PENDING DOCTORS ---
 @router.get("/doctors/pending", response_model=List[DoctorResponse])
-def get_pending_doctors(db: Session = Depends(get_db), admin: User = Depends(get_current_admin)):
+async def get_pending_doctors(db: AsyncSession = Depends(get_async_db), admin: deps.CurrentUser = Depends(get_current_admin)):
     # Fetch ONLY unverified doctors
-    return db.query(Doctor).filter(Doctor.is_verified == False).all()
+    return (await db.scalars(select(Doctor).filter(Doctor.is_verified == False))).all()
 
 @router.put("/doctors/{doctor_id}/verify")
-def verify_doctor(doctor_id: int, db: Session = Depends(get_db), admin: User = Depends(get_current_admin)):
-    doctor = db.query(Doctor).filter(Doctor.id == doctor_id).first()
-    if not doctor: raise HTTPException(404, "Doctor not found")
-    doctor.is_verified = True
-    doctor.is_available = True 
-    db.commit()
+async def verify_doctor(doctor_id: int, db: AsyncSession = Depends(get_async_db), admin: deps.CurrentUser = Depends(get_current_admin)):
+    # Guarded on is_verified so verifying twice only counts once
+    verified = await db.scalar(update(Doctor).where(Doctor.id == doctor_id, Doctor.is_verified == False).values(is_verified=True, is_available=True).returning(Doctor.id))
+    if verified:
+        await platform_stats.bump(db, pending_verifications=-1)
+    elif not await db.scalar(select(Doctor.id).filter(Doctor.id == doctor_id)):
+        raise HTTPException(404, "Doctor not found")
+    await db.commit()
+    if verified: await cache.invalidate(DOCTORS, doctor_tag(doctor_id))
     return {"message": "Doctor verified."}
 
 @router.delete("/doctors/{doctor_id}/reject")
-def reject_doctor(doctor_id: int, db: Session = Depends(get_db), admin: User = Depends(get_current_admin)):
-    doctor = db.query(Doctor).filter(Doctor.id == doctor_id).first()
+async def reject_doctor(doctor_id: int, db: AsyncSession = Depends(get_async_db), admin: deps.CurrentUser = Depends(get_current_admin)):
+    doctor = await db.scalar(select(Doctor).filter(Doctor.id == doctor_id))
     if not doctor: raise HTTPException(404, "Doctor not found")
-    user_to_delete = db.query(User).filter(User.id == doctor.user_id).first()
-    db.delete(doctor)
-    if user_to_delete: db.delete(user_to_delete)
-    db.commit()
-    return {"message": "Doctor application rejected and account removed."}
\ No newline at end of file
+    user_to_delete = await db.scalar(select(User).filter(User.id == doctor.user_id))
+    await db.delete(doctor)
+    if user_to_delete: await db.delete(user_to_delete)
+    await platform_stats.bump(db, pending_verifications=0 if doctor.is_verified else -1, **(platform_stats.user_delta(user_to_delete.role, -1) if user_to_delete else {}))
+    await db.commit()
+    if user_to_delete: deps.invalidate_user(user_to_delete.email)
+    await cache.invalidate(DOCTORS, doctor_tag(doctor_id))
+    return {"message": "Doctor application rejected and account removed."}
@@ -1,184 +1,371 @@
-
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
-from typing import List
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select, update, func, tuple_, literal, DateTime
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload, contains_eager
+from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel
-from app.core.database import get_db
+from app.core import config, events
+from app.core.database import get_async_db, AsyncSessionLocal
+from app.core.sse import sse, stream, PING
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
 from app.models.appointment import Appointment, DoctorSlot
 from app.models.doctor import Doctor
 from app.models.user import User
 from app.models.review import Review
 from app.schemas.appointment import SlotCreate, SlotResponse, AppointmentCreate, AppointmentResponse, GeneralBookRequest
 from app.api import deps
+from app.services import platform_stats, doctor_stats
 
 router = APIRouter()
 
 # ... (Helper to Map Response) ...
+def scheduled_time(a) -> Optional[datetime]:
+    # When the appointment happens: the slot time for scheduled visits, the request time for general ones
+    return (a.slot.start_time if a.slot else None) or a.start_time
+
 def map_appt(a, doc_name=None):
     d_name = doc_name if doc_name else (a.doctor.full_name if a.doctor else "Waiting...")
-    s_time = a.slot.start_time if a.slot else a.start_time
+    s_time = scheduled_time(a)
     # CHECK IF REVIEW EXISTS
     has_rev = True if a.review else False
     return AppointmentResponse(
-        id=a.id, doctor_name=d_name, status=a.status, 
-        payment_status=a.payment_status, start_time=s_time, 
+        id=a.id, doctor_name=d_name, status=a.status,
+        payment_status=a.payment_status, start_time=s_time,
         notes=a.notes, amount=a.amount, has_review=has_rev
     )
 
+# Everything map_appt touches. Lazy loads are not allowed under asyncio, so load it up front.
+APPT_LOAD = (selectinload(Appointment.doctor), selectinload(Appointment.slot), selectinload(Appointment.review))
+
+async def get_appt(db: AsyncSession, appt_id: int, *extra_options):
+    # populate_existing: re-read rows already in the session (e.g. right after a commit)
+    stmt = select(Appointment).options(*APPT_LOAD, *extra_options).filter(Appointment.id == appt_id).execution_options(populate_existing=True)
+    return await db.scalar(stmt)
+
+async def transition(db: AsyncSession, appt: Appointment, **changes):
+    """
+    Moves an appointment to a new status/payment state and books the dashboard and doctor deltas in the same
+    transaction. The UPDATE is guarded on the state we read, so two racing requests can't both count one transition.
+    """
+    before = (appt.status, appt.payment_status, appt.amount)
+    moved = await db.scalar(
+        update(Appointment)
+        .where(Appointment.id == appt.id, Appointment.status == appt.status, Appointment.payment_status == appt.payment_status)
+        .values(**changes)
+        .returning(Appointment.id)
+    )
+    if not moved:
+        await db.rollback()
+        raise HTTPException(409, "Appointment was changed by another request")
+    # The ORM-enabled UPDATE already synchronized `appt` in the session
+    await platform_stats.bump(db, **platform_stats.appointment_delta(before, (appt.status, appt.payment_status, appt.amount)))
+    await doctor_stats.record(db, appt, before[:2])
+
+def general_queue_filter():
+    # Paid general consultations nobody has picked up yet
+    return (Appointment.doctor_id == None, Appointment.slot_id == None, Appointment.status == "pending", Appointment.payment_status == "paid")
+
+def patient_view(a):
+    # doctor_name field used for Patient Name in Doctor View
+    p_name = f"{a.patient.first_name} {a.patient.last_name}" if a.patient else "Unknown"
+    start = a.slot.start_time if a.slot else a.start_time
+    return AppointmentResponse(id=a.id, doctor_name=p_name, status=a.status, payment_status=a.payment_status, start_time=start, notes=a.notes, has_review=False)
+
+# --- LIVE DOCTOR FEED ---
+def listing(a):
+    """The live doctor list (topic, name) this appointment currently shows up in, or None."""
+    if a.status != "pending" or a.payment_status != "paid": return None
+    if a.doctor_id is None and a.slot_id is None: return (events.QUEUE_TOPIC, "queue")
+    if a.doctor_id is not None and a.slot_id is not None: return (events.doctor_topic(a.doctor_id), "requests")
+    return None
+
+async def publish_move(a, before):
+    """Call after commit with listing() from before the change; streams get removed/added deltas."""
+    after = listing(a)
+    if before == after: return
+    if before: await events.bus.publish(before[0], {"type": "removed", "list": before[1], "id": a.id})
+    if after: await events.bus.publish(after[0], {"type": "added", "list": after[1], "appointment": patient_view(a).model_dump(mode="json")})
+
 # ... (Slots & Booking - Standard) ...
 @router.post("/slots", response_model=SlotResponse, status_code=status.HTTP_201_CREATED)
-def create_slot(slot: SlotCreate, db: Session = Depends(get_db)):
-    doctor = db.query(Doctor).filter(Doctor.id == slot.doctor_id).first()
+async def create_slot(slot: SlotCreate, db: AsyncSession = Depends(get_async_db)):
+    doctor = await db.scalar(select(Doctor).filter(Doctor.id == slot.doctor_id))
     if not doctor: raise HTTPException(404, "Doctor not found")
     new_slot = DoctorSlot(doctor_id=slot.doctor_id, start_time=slot.start_time, is_booked=False)
     db.add(new_slot)
-    db.commit()
-    db.refresh(new_slot)
+    await db.commit()
+    await db.refresh(new_slot)
     return new_slot
 
 @router.get("/doctors/{doctor_id}/slots", response_model=List[SlotResponse])
-def get_doctor_slots(doctor_id: int, db: Session = Depends(get_db)):
-    return db.query(DoctorSlot).filter(DoctorSlot.doctor_id == doctor_id, DoctorSlot.is_booked == False).order_by(DoctorSlot.start_time).all()
+async def get_doctor_slots(doctor_id: int, db: AsyncSession = Depends(get_async_db)):
+    return (await db.scalars(select(DoctorSlot).filter(DoctorSlot.doctor_id == doctor_id, DoctorSlot.is_booked == False).order_by(DoctorSlot.start_time))).all()
 
 @router.post("/book", response_model=AppointmentResponse, status_code=status.HTTP_201_CREATED)
-def book_appointment(appt_data: AppointmentCreate, db: Session = Depends(get_db), current_user: User = Depends(deps.get_current_user)):
-    slot = db.query(DoctorSlot).filter(DoctorSlot.id == appt_data.slot_id).first()
-    if not slot or slot.is_booked: raise HTTPException(400, "Slot unavailable")
-    slot.is_booked = True
-    amount = slot.doctor.hourly_rate
+async def book_appointment(appt_data: AppointmentCreate, db: AsyncSession = Depends(get_async_db), current_user: deps.CurrentUser = Depends(deps.get_current_user)):
+    # Claim the slot in one conditional UPDATE. Only one concurrent request can flip
+    # is_booked, every other one gets no row back and fails fast with 409.
+    claimed = (await db.execute(
+        update(DoctorSlot)
+        .where(DoctorSlot.id == appt_data.slot_id, DoctorSlot.is_booked == False)
+        .values(is_booked=True)
+        .returning(DoctorSlot.doctor_id)
+    )).first()
+    if not claimed:
+        await db.rollback()
+        if not await db.scalar(select(DoctorSlot.id).filter(DoctorSlot.id == appt_data.slot_id)):
+            raise HTTPException(404, "Slot not found")
+        raise HTTPException(409, "Slot unavailable")
+
+    amount = await db.scalar(select(Doctor.hourly_rate).filter(Doctor.id == claimed.doctor_id))
     commission = amount * 0.30
     payout = amount - commission
-    new_appt = Appointment(patient_id=current_user.id, doctor_id=slot.doctor_id, slot_id=slot.id, status="pending", payment_status="unpaid", notes=appt_data.notes, amount=amount, commission=commission, payout=payout)
+    new_appt = Appointment(patient_id=current_user.id, doctor_id=claimed.doctor_id, slot_id=appt_data.slot_id, status="pending", payment_status="unpaid", notes=appt_data.notes, amount=amount, commission=commission, payout=payout)
     db.add(new_appt)
-    db.commit()
-    db.refresh(new_appt)
-    return map_appt(new_appt)
+    await platform_stats.bump(db, **platform_stats.appointment_delta(None, ("pending", "unpaid", amount)))
+    try:
+        await db.commit()
+    except IntegrityError:
+        # An older appointment still references this slot; the rollback also releases our claim
+        await db.rollback()
+        raise HTTPException(409, "Slot unavailable")
+    return map_appt(await get_appt(db, new_appt.id))
 
 @router.post("/book-general", response_model=AppointmentResponse, status_code=status.HTTP_201_CREATED)
-def book_general_consultation(req: GeneralBookRequest, db: Session = Depends(get_db), current_user: User = Depends(deps.get_current_user)):
+async def book_general_consultation(req: GeneralBookRequest, db: AsyncSession = Depends(get_async_db), current_user: deps.CurrentUser = Depends(deps.get_current_user)):
     doctor_payout = 1750.0
     patient_price = 2500.0 if current_user.plan == "premium" else 4000.0
     platform_commission = patient_price - doctor_payout
     new_appointment = Appointment(patient_id=current_user.id, doctor_id=None, slot_id=None, start_time=datetime.utcnow(), status="pending", payment_status="unpaid", notes=req.notes, amount=patient_price, commission=platform_commission, payout=doctor_payout)
     db.add(new_appointment)
-    db.commit()
-    db.refresh(new_appointment)
-    return map_appt(new_appointment, "General Practitioner")
+    await platform_stats.bump(db, **platform_stats.appointment_delta(None, ("pending", "unpaid", patient_price)))
+    await db.commit()
+    return map_appt(await get_appt(db, new_appointment.id), "General Practitioner")
+
+# scheduled_time() in SQL, the /my sort key. Both columns are nullable, and a NULL key would end keyset
+# paging (nothing compares below NULL) and sort at opposite ends on PostgreSQL and SQLite,
+# so rows with neither time sort as the oldest.
+NO_TIME = datetime(1970, 1, 1)
+appointment_time = func.coalesce(DoctorSlot.start_time, Appointment.start_time, literal(NO_TIME, DateTime))
 
 @router.get("/my", response_model=List[AppointmentResponse])
-def get_my_appointments(db: Session = Depends(get_db), current_user: User = Depends(deps.get_current_user)):
-    # Eager load review to avoid N+1
-    scheduled = db.query(Appointment).options(joinedload(Appointment.review), joinedload(Appointment.slot)).join(DoctorSlot, Appointment.slot_id == DoctorSlot.id).filter(Appointment.patient_id == current_user.id).all()
-    general = db.query(Appointment).options(joinedload(Appointment.review)).filter(Appointment.patient_id == current_user.id, Appointment.slot_id == None).all()
-    results = [map_appt(a) for a in scheduled + general]
-    results.sort(key=lambda x: x.start_time, reverse=True)
-    return results
+async def get_my_appointments(
+    response: Response,
+    limit: int = Query(config.DEFAULT_PAGE_SIZE, ge=1, le=config.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status_filter: Optional[List[str]] = Query(None, alias="status"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: deps.CurrentUser = Depends(deps.get_current_user),
+):
+    """
+    Newest first, one page at a time. When more rows exist the X-Next-Cursor header carries the
+    token for the next page (?cursor=...). ?status=pending&status=confirmed narrows the list.
+    """
+    # One round trip: the slot is outer-joined for ordering and reused for the response, doctor and review ride along
+    stmt = (
+        select(Appointment)
+        .outerjoin(DoctorSlot, Appointment.slot_id == DoctorSlot.id)
+        .options(contains_eager(Appointment.slot), joinedload(Appointment.doctor), joinedload(Appointment.review))
+        .filter(Appointment.patient_id == current_user.id)
+    )
+    if status_filter:
+        stmt = stmt.filter(Appointment.status.in_(status_filter))
+    if cursor:
+        after_time, after_id = decode_cursor(cursor, datetime, int)
+        if after_time is None or after_id is None:
+            raise HTTPException(400, "Invalid cursor")
+        stmt = stmt.filter(tuple_(appointment_time, Appointment.id) < tuple_(after_time, after_id))
+    # Fetch one extra row to learn whether another page exists
+    appts = (await db.scalars(stmt.order_by(appointment_time.desc(), Appointment.id.desc()).limit(limit + 1))).all()
+
+    page = appts[:limit]
+    if len(appts) > limit:
+        last = page[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(scheduled_time(last) or NO_TIME, last.id)
+    return [map_appt(a) for a in page]
 
 @router.put("/{appt_id}/pay", response_model=AppointmentResponse)
-def pay_appointment(appt_id: int, db: Session = Depends(get_db), current_user: User = Depends(deps.get_current_user)):
-    appt = db.query(Appointment).filter(Appointment.id == appt_id).first()
+async def pay_appointment(appt_id: int, db: AsyncSession = Depends(get_async_db), current_user: deps.CurrentUser = Depends(deps.get_current_user)):
+    appt = await get_appt(db, appt_id, selectinload(Appointment.patient))
     if not appt: raise HTTPException(404, "Not found")
-    appt.payment_status = "paid"
-    db.commit()
-    db.refresh(appt)
+    before = listing(appt)
+    await transition(db, appt, payment_status="paid", **({} if appt.paid_at else {"paid_at": datetime.utcnow()}))
+    await db.commit()
+    await publish_move(appt, before)
     return map_appt(appt)
 
 @router.put("/{appt_id}/cancel", response_model=AppointmentResponse)
-def cancel_my_appointment(appt_id: int, db: Session = Depends(get_db), current_user: User = Depends(deps.get_current_user)):
-    appt = db.query(Appointment).filter(Appointment.id == appt_id).first()
+async def cancel_my_appointment(appt_id: int, db: AsyncSession = Depends(get_async_db), current_user: deps.CurrentUser = Depends(deps.get_current_user)):
+    appt = await get_appt(db, appt_id)
     if not appt: raise HTTPException(404, "Not found")
-    appt.status = "cancelled"
+    before = listing(appt)
+    await transition(db, appt, status="cancelled")
     if appt.slot: appt.slot.is_booked = False
-    db.commit()
-    db.refresh(appt)
+    await db.commit()
+    await publish_move(appt, before)
     return map_appt(appt)
 
 # --- DOCTOR ENDPOINTS ---
+async def load_requests(db: AsyncSession, doctor_id: int):
+    appts = (await db.scalars(select(Appointment).join(DoctorSlot, Appointment.slot_id == DoctorSlot.id).options(joinedload(Appointment.patient), contains_eager(Appointment.slot)).filter(Appointment.doctor_id == doctor_id, Appointment.status == "pending", Appointment.payment_status == "paid"))).all()
+    return [patient_view(a) for a in appts]
+
+async def load_queue(db: AsyncSession):
+    appts = (await db.scalars(select(Appointment).options(joinedload(Appointment.patient)).filter(*general_queue_filter()).order_by(Appointment.start_time, Appointment.id))).all()
+    return [patient_view(a) for a in appts]
+
 @router.get("/doctor/requests", response_model=List[AppointmentResponse])
-def get_doctor_requests(db: Session = Depends(get_db), current_user: User = Depends(deps.get_current_user)):
-    doctor = db.query(Doctor).filter(Doctor.user_id == current_user.id).first()
+async def get_doctor_requests(db: AsyncSession = Depends(get_async_db), current_user: deps.CurrentUser = Depends(deps.get_current_user)):
+    doctor = await db.scalar(select(Doctor).filter(Doctor.user_id == current_user.id))
     if not doctor: raise HTTPException(403, "Not a doctor")
-    appts = db.query(Appointment).options(joinedload(Appointment.patient)).join(DoctorSlot).filter(Appointment.doctor_id == doctor.id, Appointment.status == "pending", Appointment.payment_status == "paid").all()
-    results = []
-    for a in appts:
-        a.patient_name = f"{a.patient.first_name} {a.patient.last_name}" if a.patient else "Unknown"
-        results.append(AppointmentResponse(id=a.id, doctor_name=a.patient_name, status=a.status, payment_status=a.payment_status, start_time=a.slot.start_time, notes=a.notes, has_review=False))
-    return results
+    return await load_requests(db, doctor.id)
 
 @router.get("/doctor/queue", response_model=List[AppointmentResponse])
-def get_general_queue(db: Session = Depends(get_db), current_user: User = Depends(deps.get_current_user)):
-    doctor = db.query(Doctor).filter(Doctor.user_id == current_user.id).first()
+async def get_general_queue(db: AsyncSession = Depends(get_async_db), current_user: deps.CurrentUser = Depends(deps.get_current_user)):
+    doctor = await db.scalar(select(Doctor).filter(Doctor.user_id == current_user.id))
     if not doctor: raise HTTPException(403)
-    appts = db.query(Appointment).options(joinedload(Appointment.patient)).filter(Appointment.doctor_id == None, Appointment.status == "pending", Appointment.payment_status == "paid").all()
-    results = []
-    for a in appts:
-        # doctor_name field used for Patient Name in Doctor View
-        p_name = f"{a.patient.first_name} {a.patient.last_name}" if a.patient else "Unknown"
-        results.append(AppointmentResponse(id=a.id, doctor_name=p_name, status=a.status, payment_status=a.payment_status, start_time=a.start_time, notes=a.notes, has_review=False))
-    return results
+    return await load_queue(db)
+
+async def assign_to_doctor(db: AsyncSession, doctor: Doctor, target):
+    """
+    Hands a queued consultation to the doctor in one conditional UPDATE.
+    The doctor_id IS NULL guard makes a second claimer update zero rows instead of overwriting the first.
+    """
+    claimed = await db.scalar(
+        update(Appointment)
+        .where(Appointment.id == target, *general_queue_filter())
+        .values(doctor_id=doctor.id, status="confirmed")
+        .returning(Appointment)
+    )
+    if claimed:
+        # Paid before anyone claimed it: the earnings become this doctor's now
+        await doctor_stats.record(db, claimed, None)
+    await db.commit()
+    return claimed.id if claimed else None
+
+@router.get("/doctor/stream")
+async def stream_doctor_feed(db: AsyncSession = Depends(get_async_db), current_user: deps.CurrentUser = Depends(deps.get_current_user)):
+    """
+    Server-Sent Events replacing the /doctor/queue and /doctor/requests polls.
+    First a 'snapshot' of both lists, then 'added' / 'removed' deltas as appointments are paid,
+    claimed, accepted, declined or cancelled. 'resync' means the client fell behind: reconnect.
+    """
+    doctor = await db.scalar(select(Doctor).filter(Doctor.user_id == current_user.id))
+    if not doctor: raise HTTPException(403, "Not a doctor")
+    doctor_id = doctor.id
+    # Hand the pooled connection back now; the stream may stay open for hours
+    await db.close()
+
+    async def feed():
+        # Subscribe before reading the snapshot so nothing committed in between is missed.
+        # A delta can repeat a snapshot row, so clients apply them by appointment id.
+        async with events.bus.subscribe(events.QUEUE_TOPIC, events.doctor_topic(doctor_id)) as sub:
+            async with AsyncSessionLocal() as session:
+                queue = await load_queue(session)
+                requests = await load_requests(session, doctor_id)
+            yield sse("snapshot", {"queue": [a.model_dump(mode="json") for a in queue], "requests": [a.model_dump(mode="json") for a in requests]})
+            while True:
+                if sub.overflowed and sub.queue.empty():
+                    yield sse("resync", {})
+                    return
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), timeout=config.SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield PING
+                    continue
+                yield sse(event["type"], event)
+
+    return stream(feed())
+
+@router.put("/doctor/queue/claim-next", response_model=AppointmentResponse)
+async def claim_next_appointment(db: AsyncSession = Depends(get_async_db), current_user: deps.CurrentUser = Depends(deps.get_current_user)):
+    doctor = await db.scalar(select(Doctor).filter(Doctor.user_id == current_user.id))
+    if not doctor: raise HTTPException(403, "Not a doctor")
+    # Oldest unclaimed row first. SKIP LOCKED lets concurrent doctors pass over rows another
+    # transaction is claiming, so each one gets a different consultation instead of queueing up
+    # behind the head row. (SQLite ignores FOR UPDATE; its single writer serializes the UPDATE anyway.)
+    next_id = (
+        select(Appointment.id)
+        .where(*general_queue_filter())
+        .order_by(Appointment.start_time, Appointment.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    appt_id = await assign_to_doctor(db, doctor, next_id)
+    if not appt_id: raise HTTPException(404, "Queue is empty")
+    appt = await get_appt(db, appt_id)
+    await publish_move(appt, (events.QUEUE_TOPIC, "queue"))
+    return map_appt(appt, doctor.full_name)
 
 @router.put("/doctor/queue/{appt_id}/claim", response_model=AppointmentResponse)
-def claim_appointment(appt_id: int, db: Session = Depends(get_db), current_user: User = Depends(deps.get_current_user)):
-    doctor = db.query(Doctor).filter(Doctor.user_id == current_user.id).first()
-    appt = db.query(Appointment).filter(Appointment.id == appt_id, Appointment.doctor_id == None).first()
-    if not appt: raise HTTPException(404)
-    appt.doctor_id = doctor.id
-    appt.status = "confirmed"
-    db.commit()
-    db.refresh(appt)
+async def claim_appointment(appt_id: int, db: AsyncSession = Depends(get_async_db), current_user: deps.CurrentUser = Depends(deps.get_current_user)):
+    doctor = await db.scalar(select(Doctor).filter(Doctor.user_id == current_user.id))
+    if not doctor: raise HTTPException(403, "Not a doctor")
+    if not await assign_to_doctor(db, doctor, appt_id):
+        if not await db.scalar(select(Appointment.id).filter(Appointment.id == appt_id)): raise HTTPException(404)
+        raise HTTPException(409, "No longer in the queue")
+    appt = await get_appt(db, appt_id)
+    await publish_move(appt, (events.QUEUE_TOPIC, "queue"))
     return map_appt(appt, doctor.full_name)
 
 @router.put("/doctor/appointments/{appt_id}/accept", response_model=AppointmentResponse)
-def accept_appointment(appt_id: int, db: Session = Depends(get_db), current_user: User = Depends(deps.get_current_user)):
-    doctor = db.query(Doctor).filter(Doctor.user_id == current_user.id).first()
-    appt = db.query(Appointment).filter(Appointment.id == appt_id).first()
+async def accept_appointment(appt_id: int, db: AsyncSession = Depends(get_async_db), current_user: deps.CurrentUser = Depends(deps.get_current_user)):
+    doctor = await db.scalar(select(Doctor).filter(Doctor.user_id == current_user.id))
+    appt = await get_appt(db, appt_id)
     if not appt: raise HTTPException(404)
-    appt.status = "confirmed"
-    db.commit()
-    db.refresh(appt)
+    before = listing(appt)
+    await transition(db, appt, status="confirmed")
+    await db.commit()
+    await publish_move(appt, before)
     return map_appt(appt, doctor.full_name)
 
 @router.put("/doctor/appointments/{appt_id}/decline", response_model=AppointmentResponse)
-def decline_appointment(appt_id: int, db: Session = Depends(get_db), current_user: User = Depends(deps.get_current_user)):
-    doctor = db.query(Doctor).filter(Doctor.user_id == current_user.id).first()
-    appt = db.query(Appointment).filter(Appointment.id == appt_id).first()
+async def decline_appointment(appt_id: int, db: AsyncSession = Depends(get_async_db), current_user: deps.CurrentUser = Depends(deps.get_current_user)):
+    doctor = await db.scalar(select(Doctor).filter(Doctor.user_id == current_user.id))
+    appt = await get_appt(db, appt_id)
     if not appt: raise HTTPException(404)
-    appt.status = "cancelled"
+    before = listing(appt)
+    await transition(db, appt, status="cancelled")
     if appt.slot: appt.slot.is_booked = False
-    db.commit()
-    db.refresh(appt)
+    await db.commit()
+    await publish_move(appt, before)
     return map_appt(appt, doctor.full_name)
 
 @router.put("/doctor/appointments/{appt_id}/cancel", response_model=AppointmentResponse)
-def cancel_appointment_by_doctor(appt_id: int, db: Session = Depends(get_db), current_user: User = Depends(deps.get_current_user)):
-    doctor = db.query(Doctor).filter(Doctor.user_id == current_user.id).first()
-    appt = db.query(Appointment).filter(Appointment.id == appt_id).first()
+async def cancel_appointment_by_doctor(appt_id: int, db: AsyncSession = Depends(get_async_db), current_user: deps.CurrentUser = Depends(deps.get_current_user)):
+    doctor = await db.scalar(select(Doctor).filter(Doctor.user_id == current_user.id))
+    appt = await get_appt(db, appt_id)
     if not appt: raise HTTPException(404)
-    appt.status = "cancelled"
+    before = listing(appt)
+    await transition(db, appt, status="cancelled")
     if appt.slot: appt.slot.is_booked = False
-    db.commit()
-    db.refresh(appt)
+    await db.commit()
+    await publish_move(appt, before)
     return map_appt(appt, doctor.full_name)
 
 @router.put("/doctor/appointments/{appt_id}/complete", response_model=AppointmentResponse)
-def complete_appointment(appt_id: int, db: Session = Depends(get_db), current_user: User = Depends(deps.get_current_user)):
-    doctor = db.query(Doctor).filter(Doctor.user_id == current_user.id).first()
-    appt = db.query(Appointment).filter(Appointment.id == appt_id).first()
+async def complete_appointment(appt_id: int, db: AsyncSession = Depends(get_async_db), current_user: deps.CurrentUser = Depends(deps.get_current_user)):
+    doctor = await db.scalar(select(Doctor).filter(Doctor.user_id == current_user.id))
+    appt = await get_appt(db, appt_id)
     if not appt: raise HTTPException(404)
-    appt.status = "completed"
-    db.commit()
-    db.refresh(appt)
+    before = listing(appt)
+    await transition(db, appt, status="completed")
+    await db.commit()
+    await publish_move(appt, before)
     return map_appt(appt, doctor.full_name)
 
 @router.get("/doctor/appointments", response_model=List[AppointmentResponse])
-def get_doctor_confirmed_appointments(db: Session = Depends(get_db), current_user: User = Depends(deps.get_current_user)):
-    doctor = db.query(Doctor).filter(Doctor.user_id == current_user.id).first()
-    scheduled = db.query(Appointment).options(joinedload(Appointment.patient), joinedload(Appointment.slot)).join(DoctorSlot, Appointment.slot_id == DoctorSlot.id).filter(Appointment.doctor_id == doctor.id, Appointment.status == "confirmed").all()
-    general = db.query(Appointment).options(joinedload(Appointment.patient)).filter(Appointment.doctor_id == doctor.id, Appointment.slot_id == None, Appointment.status == "confirmed").all()
-    
+async def get_doctor_confirmed_appointments(db: AsyncSession = Depends(get_async_db), current_user: deps.CurrentUser = Depends(deps.get_current_user)):
+    doctor = await db.scalar(select(Doctor).filter(Doctor.user_id == current_user.id))
+    scheduled = (await db.scalars(select(Appointment).join(DoctorSlot, Appointment.slot_id == DoctorSlot.id).options(joinedload(Appointment.patient), contains_eager(Appointment.slot)).filter(Appointment.doctor_id == doctor.id, Appointment.status == "confirmed"))).all()
+    general = (await db.scalars(select(Appointment).options(joinedload(Appointment.patient), selectinload(Appointment.slot)).filter(Appointment.doctor_id == doctor.id, Appointment.slot_id == None, Appointment.status == "confirmed"))).all()
+
     results = []
-    for a in scheduled + general:
+    for a in list(scheduled) + list(general):
         p_name = f"{a.patient.first_name} {a.patient.last_name}" if a.patient else "Unknown"
         start = a.slot.start_time if a.slot else a.start_time
         results.append(AppointmentResponse(id=a.id, doctor_name=p_name, status=a.status, payment_status=a.payment_status, start_time=start, notes=a.notes, has_review=False))
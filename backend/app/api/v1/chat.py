@@ -1,69 +1,217 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
-from pydantic import BaseModel
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict
 
-from app.services import ai_service
-from app.core.database import get_db
+from app.services import ai_service, chat_sessions
+from app.core.database import get_async_db, AsyncSessionLocal
+from app.core.sse import sse, stream
 from app.models.user import User
+from app.models.chat import ChatSession
 from app.api import deps
 
 router = APIRouter()
 
 class ChatRequest(BaseModel):
-    message: str
+    message: str # just the new message: the server keeps the conversation
+    session_id: Optional[int] = None # continue this conversation; None starts a new one
 
 class ChatResponse(BaseModel):
     response: str
+    cached: bool = False # answered from the triage cache; doesn't use up the daily free chats
+    session_id: Optional[int] = None # send it back with the next message (None if the answer failed)
 
-@router.post("/analyze", response_model=ChatResponse)
-async def analyze_symptoms(
-    request: ChatRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_user)
-):
-    if not request.message.strip():
-        raise HTTPException(status_code=400, detail="Message cannot be empty")
+class ChatSessionOut(BaseModel):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+    model_config = ConfigDict(from_attributes=True)
+
+class ChatMessageOut(BaseModel):
+    role: str
+    content: str
 
-    now = datetime.utcnow()
-    today = now.date()
+class ChatSessionDetail(BaseModel):
+    id: int
+    summary: Optional[str] = None # what's left of the older turns
+    messages: List[ChatMessageOut]
 
+def reset_windows(user: User, now: datetime):
     # 1. DAILY RESET
-    if current_user.last_chat_date != today:
-        current_user.daily_chat_count = 0
-        current_user.last_chat_date = today
+    if user.last_chat_date != now.date():
+        user.daily_chat_count = 0
+        user.last_chat_date = now.date()
         # Reset burst on new day too just in case
-        current_user.burst_chat_count = 0 
-        current_user.burst_start_time = now
+        user.burst_chat_count = 0
+        user.burst_start_time = now
+
+    # Reset burst window if 1 hour has passed
+    if not user.burst_start_time or (now - user.burst_start_time) > timedelta(hours=1):
+        user.burst_start_time = now
+        user.burst_chat_count = 0
 
-    # 2. FREE TIER LIMIT
-    if current_user.plan == "free":
-        if current_user.daily_chat_count >= 5:
+def check_limits(user: User, now: datetime, cached: bool = False):
+    reset_windows(user, now)
+
+    # 2. FREE TIER LIMIT (the quota pays for model calls; a cached answer costs nothing)
+    if user.plan == "free" and not cached:
+        if user.daily_chat_count >= 5:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Free tier limit reached (5 chats/day). Please upgrade to Premium."
             )
 
     # 3. BURST LIMIT (Anti-Spam protection for everyone)
-    # Reset burst window if 1 hour has passed
-    if not current_user.burst_start_time or (now - current_user.burst_start_time) > timedelta(hours=1):
-        current_user.burst_start_time = now
-        current_user.burst_chat_count = 0
-    
-    if current_user.burst_chat_count >= 30:
+    if user.burst_chat_count >= 30:
         raise HTTPException(
             status_code=429, # Too Many Requests
             detail="You are chatting too fast. Please take a break."
         )
 
-    # 4. Process Request
-    ai_response = await ai_service.get_medical_response(request.message)
+async def record_chat(user_id: int, daily: bool = True, session_id: Optional[int] = None,
+                      message: Optional[str] = None, answer: Optional[str] = None) -> Optional[int]:
+    """
+    Counts a finished chat and, given the answer, adds the exchange to the conversation (session_id None = new one).
+    One transaction with a row lock on the user: parallel chats of one user must not lose increments.
+    Cached answers (daily=False) still count toward the burst limit, but not the daily quota.
+    Returns the conversation's id.
+    """
+    async with AsyncSessionLocal() as session:
+        user = await session.get(User, user_id, with_for_update=True)
+        if user:
+            reset_windows(user, datetime.utcnow())
+            if daily:
+                user.daily_chat_count += 1
+            user.burst_chat_count += 1
+        if answer is not None:
+            session_id = await chat_sessions.save_exchange(session, user_id, session_id, message, answer)
+        await session.commit()
+    return session_id
+
+async def open_conversation(db: AsyncSession, user: User, request: ChatRequest):
+    """The conversation being continued (None for a new one) and a cached answer, if the message may have one."""
+    if not request.message.strip():
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+    if request.session_id is None:
+        return None, ai_service.cached_response(request.message, user.plan)
+    conversation = await chat_sessions.load(db, user.id, request.session_id)
+    if conversation is None:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    # A follow-up ("yes, since yesterday") only makes sense with its history: never cached
+    return conversation, None
 
-    # 5. Increment Counters
-    current_user.daily_chat_count += 1
-    current_user.burst_chat_count += 1
-    
-    db.add(current_user)
-    db.commit()
+@router.post("/analyze", response_model=ChatResponse)
+async def analyze_symptoms(
+    request: ChatRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(deps.get_current_user_db)
+):
+    conversation, cached = await open_conversation(db, current_user, request)
+    check_limits(current_user, datetime.utcnow(), cached=cached is not None)
+    user_id, plan = current_user.id, current_user.plan
+    # Hand the pooled connection back; the model can take many seconds. The window resets are redone when counting.
+    await db.close()
 
-    return ChatResponse(response=ai_response)
\ No newline at end of file
+    if cached is not None:
+        session_id = await record_chat(user_id, daily=False, message=request.message, answer=cached)
+        return ChatResponse(response=cached, cached=True, session_id=session_id)
+
+    # 4. Process Request (premium plans get a larger model, see ai_router)
+    try:
+        ai_response = await ai_service.answer(request.message, conversation.history() if conversation else (), tier=plan)
+    except ai_service.AIServiceError as e:
+        # The apology is still the reply (and still counted), but stays out of the conversation
+        await record_chat(user_id)
+        return ChatResponse(response=str(e), session_id=request.session_id)
+
+    # 5. Increment Counters and save the exchange
+    session_id = await record_chat(user_id, session_id=request.session_id, message=request.message, answer=ai_response)
+
+    return ChatResponse(response=ai_response, session_id=session_id)
+
+@router.post("/analyze/stream")
+async def analyze_symptoms_stream(
+    request: ChatRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(deps.get_current_user_db)
+):
+    """
+    /analyze as Server-Sent Events, so the answer shows up as the model writes it:
+    'delta' events carry the next piece of text, then 'done' has the full response and the session_id.
+    'error' means the answer broke off; like a dropped connection, it doesn't count against the limits.
+    A cached answer comes as a single 'delta'; 'done' says whether it was cached.
+    """
+    conversation, cached = await open_conversation(db, current_user, request)
+    check_limits(current_user, datetime.utcnow(), cached=cached is not None)
+    user_id, plan = current_user.id, current_user.plan
+    await db.close() # as in /analyze: no pooled connection held through the model call
+
+    async def replay():
+        session_id = await record_chat(user_id, daily=False, message=request.message, answer=cached)
+        yield sse("delta", {"text": cached})
+        yield sse("done", {"response": cached, "cached": True, "session_id": session_id})
+
+    async def answer():
+        parts = []
+        try:
+            history = conversation.history() if conversation else ()
+            async for chunk in ai_service.stream_medical_response(request.message, history, tier=plan):
+                parts.append(chunk)
+                yield sse("delta", {"text": chunk})
+        except ai_service.AIServiceError as e:
+            yield sse("error", {"detail": str(e)})
+            return
+
+        # Only a completed answer is counted (and kept in the conversation)
+        full = "".join(parts)
+        session_id = await record_chat(user_id, session_id=request.session_id, message=request.message, answer=full)
+        yield sse("done", {"response": full, "cached": False, "session_id": session_id})
+
+    body = replay() if cached is not None else answer()
+    return stream(body)
+
+# --- CONVERSATIONS ---
+# None of these change the user row, so the cached principal is enough
+
+@router.get("/sessions", response_model=List[ChatSessionOut])
+async def list_sessions(
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: deps.CurrentUser = Depends(deps.get_current_user)
+):
+    """The user's conversations, most recently active first."""
+    query = (
+        select(ChatSession)
+        .where(ChatSession.user_id == current_user.id)
+        .order_by(ChatSession.updated_at.desc(), ChatSession.id.desc())
+        .limit(limit)
+    )
+    return (await db.scalars(query)).all()
+
+@router.get("/sessions/{session_id}", response_model=ChatSessionDetail)
+async def get_session(
+    session_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: deps.CurrentUser = Depends(deps.get_current_user)
+):
+    conversation = await chat_sessions.load(db, current_user.id, session_id)
+    if conversation is None:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    return ChatSessionDetail(
+        id=conversation.session_id,
+        summary=conversation.summary,
+        messages=[ChatMessageOut(role=role, content=content) for role, content in conversation.turns],
+    )
+
+@router.delete("/sessions/{session_id}")
+async def delete_session(
+    session_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: deps.CurrentUser = Depends(deps.get_current_user)
+):
+    if not await chat_sessions.delete_session(db, current_user.id, session_id):
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    await db.commit()
+    return {"message": "Chat session deleted"}
@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from app.core.database import get_db
+from app.core.database import get_async_db
+from app.core.response_cache import cache, TIPS
 from app.models.content import HealthTip
 from app.models.user import User
 from app.schemas.content import HealthTipCreate, HealthTipUpdate, HealthTipResponse
+from app.api import deps
 from app.api.v1.admin import get_current_admin # Reuse admin dependency
 
 router = APIRouter()
@@ -13,38 +16,42 @@ router = APIRouter()
 # --- PUBLIC ENDPOINTS ---
 
 @router.get("/tips", response_model=List[HealthTipResponse])
-def get_health_tips(
+async def get_health_tips(
+    request: Request,
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Public endpoint to fetch health tips.
+    Public endpoint to fetch health tips. Served from the response cache until an admin edits them.
     """
-    return db.query(HealthTip).order_by(HealthTip.created_at.desc()).offset(skip).limit(limit).all()
+    async def load():
+        return (await db.scalars(select(HealthTip).order_by(HealthTip.created_at.desc()).offset(skip).limit(limit))).all()
+    return await cache.respond(request, [TIPS], List[HealthTipResponse], load)
 
 # --- ADMIN ENDPOINTS ---
 
 @router.post("/admin/tips", response_model=HealthTipResponse, status_code=status.HTTP_201_CREATED)
-def create_health_tip(
+async def create_health_tip(
     tip_in: HealthTipCreate,
-    db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_async_db),
+    admin: deps.CurrentUser = Depends(get_current_admin)
 ):
     new_tip = HealthTip(**tip_in.model_dump())
     db.add(new_tip)
-    db.commit()
-    db.refresh(new_tip)
+    await db.commit()
+    await db.refresh(new_tip)
+    await cache.invalidate(TIPS)
     return new_tip
 
 @router.put("/admin/tips/{tip_id}", response_model=HealthTipResponse)
-def update_health_tip(
+async def update_health_tip(
     tip_id: int,
     tip_in: HealthTipUpdate,
-    db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_async_db),
+    admin: deps.CurrentUser = Depends(get_current_admin)
 ):
-    tip = db.query(HealthTip).filter(HealthTip.id == tip_id).first()
+    tip = await db.scalar(select(HealthTip).filter(HealthTip.id == tip_id))
     if not tip:
         raise HTTPException(status_code=404, detail="Health Tip not found")
     
@@ -52,20 +59,22 @@ def update_health_tip(
     for field, value in update_data.items():
         setattr(tip, field, value)
         
-    db.commit()
-    db.refresh(tip)
+    await db.commit()
+    await db.refresh(tip)
+    await cache.invalidate(TIPS)
     return tip
 
 @router.delete("/admin/tips/{tip_id}")
-def delete_health_tip(
+async def delete_health_tip(
     tip_id: int,
-    db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_async_db),
+    admin: deps.CurrentUser = Depends(get_current_admin)
 ):
-    tip = db.query(HealthTip).filter(HealthTip.id == tip_id).first()
+    tip = await db.scalar(select(HealthTip).filter(HealthTip.id == tip_id))
     if not tip:
         raise HTTPException(status_code=404, detail="Health Tip not found")
         
-    db.delete(tip)
-    db.commit()
+    await db.delete(tip)
+    await db.commit()
+    await cache.invalidate(TIPS)
     return {"message": "Health Tip deleted successfully"}
\ No newline at end of file
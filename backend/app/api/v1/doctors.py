@@ -1,50 +1,120 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.core import config
+from app.core.database import get_async_db
+from app.core.pagination import NEXT_CURSOR_HEADER, after, encode_cursor, decode_cursor
+from app.core.response_cache import cache, DOCTORS, doctor_tag
 from app.models.doctor import Doctor
 from app.models.user import User
 from app.models.appointment import Appointment
+from app.models.stats import DoctorStats
 from app.schemas.doctor import DoctorResponse, DoctorUpdate
 from app.api import deps
+from app.services import doctor_search, doctor_stats
 
 router = APIRouter()
 
 @router.get("/", response_model=List[DoctorResponse])
-def read_doctors(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return db.query(Doctor).filter(Doctor.is_verified == True).offset(skip).limit(limit).all()
+async def read_doctors(request: Request, skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        # Best-ranked first; ranking_score is maintained on each review (app/services/doctor_ratings.py) and indexed
+        query = select(Doctor).filter(Doctor.is_verified == True).order_by(Doctor.ranking_score.desc(), Doctor.id)
+        return (await db.scalars(query.offset(skip).limit(limit))).all()
+    # Same for every caller, so served from the response cache (app/core/response_cache.py)
+    return await cache.respond(request, [DOCTORS], List[DoctorResponse], load)
+
+@router.get("/search", response_model=List[DoctorResponse])
+async def search_doctors(
+    response: Response,
+    q: Optional[str] = Query(None, max_length=100),
+    specialty: Optional[List[str]] = Query(None),
+    available: Optional[bool] = None,
+    min_rate: Optional[float] = Query(None, ge=0),
+    max_rate: Optional[float] = Query(None, ge=0),
+    min_rating: Optional[float] = Query(None, ge=0, le=5),
+    min_experience: Optional[int] = Query(None, ge=0),
+    sort: str = Query("rating", pattern="^(rating|price_asc|price_desc|experience)$"),
+    limit: int = Query(config.DEFAULT_PAGE_SIZE, ge=1, le=config.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Verified doctors matching every given filter. ?q= matches words (or their beginnings) in the name,
+    specialty and bio; ?specialty= can repeat. Paged like /appointments/my: follow X-Next-Cursor.
+    """
+    column, descending, kind = doctor_search.SORTS[sort]
+    stmt = select(Doctor).filter(Doctor.is_verified == True)
+    if specialty:
+        stmt = stmt.filter(Doctor.specialty.in_(specialty))
+    if available is not None:
+        stmt = stmt.filter(Doctor.is_available == available)
+    if min_rate is not None:
+        stmt = stmt.filter(Doctor.hourly_rate >= min_rate)
+    if max_rate is not None:
+        stmt = stmt.filter(Doctor.hourly_rate <= max_rate)
+    if min_rating is not None:
+        stmt = stmt.filter(Doctor.rating >= min_rating)
+    if min_experience is not None:
+        stmt = stmt.filter(Doctor.years_experience >= min_experience)
+    words = doctor_search.terms(q) if q else []
+    if words:
+        stmt = stmt.filter(doctor_search.text_filter(db.bind.dialect.name, words))
+    if cursor:
+        cursor_sort, value, last_id = decode_cursor(cursor, str, kind, int)
+        if cursor_sort != sort: raise HTTPException(400, "Cursor belongs to a different sort")
+        stmt = stmt.filter(after(column, Doctor.id, value, last_id, descending))
+    # Fetch one extra row to learn whether another page exists
+    doctors = (await db.scalars(stmt.order_by(column.desc() if descending else column, Doctor.id).limit(limit + 1))).all()
+
+    page = doctors[:limit]
+    if len(doctors) > limit:
+        last = page[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(sort, getattr(last, column.key), last.id)
+    return page
 
 @router.get("/stats")
-def get_doctor_stats(db: Session = Depends(get_db), current_user: User = Depends(deps.get_current_user)):
+async def get_doctor_stats(db: AsyncSession = Depends(get_async_db), current_user: deps.CurrentUser = Depends(deps.get_current_user)):
     if current_user.role != "doctor": raise HTTPException(403, "Not a doctor")
-    
-    doctor = db.query(Doctor).filter(Doctor.user_id == current_user.id).first()
-    if not doctor: raise HTTPException(404, "Profile not found")
-    
-    # 1. Calculate Earnings (Sum of payout for completed/paid appts)
-    earnings = 0.0
-    paid_appts = db.query(Appointment).filter(Appointment.doctor_id == doctor.id, Appointment.payment_status == "paid").all()
-    for a in paid_appts:
-        earnings += a.payout
-
-    # 2. Calculate Unique Patients
-    patient_ids = set()
-    all_appts = db.query(Appointment).filter(Appointment.doctor_id == doctor.id).all()
-    for a in all_appts:
-        patient_ids.add(a.patient_id)
-    
+
+    # One round trip: the profile, its running totals (app/services/doctor_stats.py) and the distinct patient count
+    patients = select(func.count(func.distinct(Appointment.patient_id))).where(Appointment.doctor_id == Doctor.id).scalar_subquery()
+    row = (await db.execute(
+        select(Doctor, DoctorStats, patients.label("total_patients"))
+        .outerjoin(DoctorStats, DoctorStats.doctor_id == Doctor.id)
+        .filter(Doctor.user_id == current_user.id)
+    )).first()
+    if not row: raise HTTPException(404, "Profile not found")
+    doctor, totals, total_patients = row
+
     return {
-        "earnings": earnings,
-        "total_patients": len(patient_ids),
+        "earnings": totals.earnings if totals else 0.0,
+        "total_patients": total_patients,
+        "paid_appointments": totals.paid_appointments if totals else 0,
+        "completed_appointments": totals.completed_appointments if totals else 0,
         "rating": doctor.rating,
         "reviews": doctor.review_count,
         "years_experience": doctor.years_experience
     }
 
+@router.get("/stats/earnings")
+async def get_doctor_earnings(
+    period: str = Query("day", pattern="^(day|week|month)$"),
+    buckets: int = Query(30, ge=1, le=366),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: deps.CurrentUser = Depends(deps.get_current_user),
+):
+    """Earnings per day, week (from Monday) or month, oldest first, by UTC payment date."""
+    if current_user.role != "doctor": raise HTTPException(403, "Not a doctor")
+    doctor_id = await db.scalar(select(Doctor.id).filter(Doctor.user_id == current_user.id))
+    if not doctor_id: raise HTTPException(404, "Profile not found")
+    return await doctor_stats.earnings_series(db, doctor_id, period, buckets)
+
 @router.put("/me", response_model=DoctorResponse)
-def update_doctor_me(data: DoctorUpdate, db: Session = Depends(get_db), current_user: User = Depends(deps.get_current_user)):
-    doctor = db.query(Doctor).filter(Doctor.user_id == current_user.id).first()
+async def update_doctor_me(data: DoctorUpdate, db: AsyncSession = Depends(get_async_db), current_user: deps.CurrentUser = Depends(deps.get_current_user)):
+    doctor = await db.scalar(select(Doctor).filter(Doctor.user_id == current_user.id))
     if not doctor: raise HTTPException(404, "Not found")
 
     if data.bio: doctor.bio = data.bio
@@ -52,12 +122,15 @@ def update_doctor_me(data: DoctorUpdate, db: Session = Depends(get_db), current_
     if data.years_experience: doctor.years_experience = data.years_experience
     if data.image_url: doctor.image_url = data.image_url
 
-    db.commit()
-    db.refresh(doctor)
+    await db.commit()
+    await db.refresh(doctor)
+    await cache.invalidate(DOCTORS, doctor_tag(doctor.id))
     return doctor
 
 @router.get("/{doctor_id}", response_model=DoctorResponse)
-def read_doctor(doctor_id: int, db: Session = Depends(get_db)):
-    doctor = db.query(Doctor).filter(Doctor.id == doctor_id).first()
-    if not doctor: raise HTTPException(404, "Doctor not found")
-    return doctor
+async def read_doctor(doctor_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        doctor = await db.scalar(select(Doctor).filter(Doctor.id == doctor_id))
+        if not doctor: raise HTTPException(404, "Doctor not found")
+        return doctor
+    return await cache.respond(request, [doctor_tag(doctor_id)], DoctorResponse, load)
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends
+from app.core import metrics
+from app.api import deps
+from app.api.v1.admin import get_current_admin # Reuse admin dependency
+
+router = APIRouter()
+
+@router.get("/")
+def read_metrics(admin: deps.CurrentUser = Depends(get_current_admin)):
+    """
+    Process-local runtime counters (caches, pools, request stats).
+    Each worker reports its own numbers.
+    """
+    return metrics.collect()
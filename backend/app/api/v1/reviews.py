@@ -1,24 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.core.database import get_db
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
+from app.core.response_cache import cache, DOCTORS, doctor_tag
 from app.models.review import Review
 from app.models.appointment import Appointment
-from app.models.doctor import Doctor
 from app.models.user import User
 from app.schemas.review import ReviewCreate, ReviewResponse
 from app.api import deps
+from app.services import doctor_ratings
 
 router = APIRouter()
 
 @router.post("/", response_model=ReviewResponse, status_code=status.HTTP_201_CREATED)
-def create_review(
+async def create_review(
     review_in: ReviewCreate, 
-    db: Session = Depends(get_db), 
-    current_user: User = Depends(deps.get_current_user)):
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: deps.CurrentUser = Depends(deps.get_current_user)):
     
     # 1. Verify Appointment exists and is completed
-    appointment = db.query(Appointment).filter(Appointment.id == review_in.appointment_id).first()
+    appointment = await db.scalar(select(Appointment).filter(Appointment.id == review_in.appointment_id))
     if not appointment: raise HTTPException(404, detail="Appointment not found")
     
     # 2. Verify Permission
@@ -26,10 +28,10 @@ def create_review(
     if appointment.status != "completed": raise HTTPException(400, detail="Can only review completed appointments")
     
     # 3. Check for duplicates
-    if db.query(Review).filter(Review.appointment_id == review_in.appointment_id).first():
+    if await db.scalar(select(Review).filter(Review.appointment_id == review_in.appointment_id)):
         raise HTTPException(400, detail="You have already reviewed this appointment")
 
-    # 4. Save Review
+    # 4. Save the review and fold it into the doctor's rating, in one transaction
     new_review = Review(
         appointment_id=review_in.appointment_id,
         doctor_id=appointment.doctor_id,
@@ -38,18 +40,17 @@ def create_review(
         comment=review_in.comment
     )
     db.add(new_review)
-    db.commit()
-
-    # 5. AUTO-CALCULATE DOCTOR RATING
     if appointment.doctor_id:
-        doctor = db.query(Doctor).filter(Doctor.id == appointment.doctor_id).first()
-        if doctor:
-            stats = db.query(func.avg(Review.rating), func.count(Review.id)).filter(Review.doctor_id == doctor.id).first()
-            if stats[0]:
-                doctor.rating = round(stats[0], 1)
-                doctor.review_count = stats[1]
-                db.add(doctor)
-                db.commit()
+        await doctor_ratings.add_review(db, appointment.doctor_id, review_in.rating)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent request reviewed the same appointment first (reviews.appointment_id is unique)
+        await db.rollback()
+        raise HTTPException(400, detail="You have already reviewed this appointment")
+    if appointment.doctor_id:
+        # The rating shows on the profile and orders the listing
+        await cache.invalidate(DOCTORS, doctor_tag(appointment.doctor_id))
 
-    db.refresh(new_review)
-    return new_review
\ No newline at end of file
+    await db.refresh(new_review)
+    return new_review
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.models.user import User
 from app.api import deps
 from app.schemas.user import UserResponse
@@ -9,14 +9,15 @@ from app.schemas.user import UserResponse
 router = APIRouter()
 
 @router.post("/upgrade", response_model=UserResponse)
-def upgrade_to_premium(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_user)):
+async def upgrade_to_premium(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(deps.get_current_user_db)):
     
     current_user.plan = "premium"
     current_user.subscription_expiry = datetime.utcnow() + timedelta(days=30)
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
+    deps.invalidate_user(current_user.email)
     
     return current_user
\ No newline at end of file
@@ -0,0 +1,151 @@
+import os
+from dotenv import load_dotenv
+
+# Load secrets once for every module that reads settings from here
+load_dotenv()
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+# --- AUTH PRINCIPAL CACHE ---
+# How long a resolved user snapshot is trusted before we hit the database again.
+# Keep this short: other workers only see changes once their entry expires.
+PRINCIPAL_CACHE_TTL_SECONDS = _env_int("PRINCIPAL_CACHE_TTL_SECONDS", 60)
+PRINCIPAL_CACHE_MAX_SIZE = _env_int("PRINCIPAL_CACHE_MAX_SIZE", 10000)
+
+# --- LOGGING ---
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Per-module overrides, e.g. "app.api.deps=DEBUG,sqlalchemy.engine=INFO"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower() # 'text' or 'json'
+# Fraction of hot-path debug events actually emitted when DEBUG is on
+LOG_DEBUG_SAMPLE_RATE = _env_float("LOG_DEBUG_SAMPLE_RATE", 0.01)
+# Fraction of ordinary requests that get a structured request record.
+# Errors and slow requests are always logged.
+LOG_REQUEST_SAMPLE_RATE = _env_float("LOG_REQUEST_SAMPLE_RATE", 0.0)
+LOG_SLOW_REQUEST_MS = _env_float("LOG_SLOW_REQUEST_MS", 1000.0)
+
+# --- DATABASE POOL (PostgreSQL) ---
+# Per worker, per engine. Keep pool_size * workers under the server/pooler connection limit.
+DB_POOL_SIZE = _env_int("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = _env_float("DB_POOL_TIMEOUT", 10.0) # seconds to wait for a free connection
+DB_POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 1800) # seconds; below the pooler's idle timeout
+# Server-side cap per statement, 0 disables. Behind a transaction pooler set it on the role instead.
+DB_STATEMENT_TIMEOUT_MS = _env_int("DB_STATEMENT_TIMEOUT_MS", 15000)
+
+# --- PREPARED STATEMENTS ---
+# 'transaction' = behind PgBouncer/Supavisor in transaction mode (no server-side prepared statements),
+# 'session' or 'none' = direct or session-pooled connection, 'auto' = guess from the port (6432/6543 => transaction).
+DB_POOLER_MODE = os.getenv("DB_POOLER_MODE", "auto").lower()
+# psycopg 3 prepares a statement after it has run this many times on a connection
+DB_PREPARE_THRESHOLD = _env_int("DB_PREPARE_THRESHOLD", 5)
+# SQLAlchemy compiled-SQL cache entries per engine
+DB_QUERY_CACHE_SIZE = _env_int("DB_QUERY_CACHE_SIZE", 1200)
+
+# --- STARTUP ---
+# Dev convenience only: apply pending migrations when a worker boots.
+# In production run `python migrate.py` once per deploy instead.
+DB_AUTO_MIGRATE = _env_bool("DB_AUTO_MIGRATE", False)
+
+# --- LIVE EVENTS (doctor queue stream) ---
+# 'memory' = publish inside this worker only (single worker / dev),
+# 'postgres' = fan out across workers with LISTEN/NOTIFY on the app database.
+EVENTS_BROKER = os.getenv("EVENTS_BROKER", "memory").lower()
+# Per-connection buffer. A client that falls this far behind is told to resync.
+EVENTS_SUBSCRIBER_QUEUE_SIZE = _env_int("EVENTS_SUBSCRIBER_QUEUE_SIZE", 256)
+# Comment line sent on idle streams so proxies don't close them
+SSE_HEARTBEAT_SECONDS = _env_float("SSE_HEARTBEAT_SECONDS", 15.0)
+
+# --- PAGINATION ---
+# List endpoints return at most this many rows unless ?limit= asks for fewer (or more, up to the max)
+DEFAULT_PAGE_SIZE = _env_int("DEFAULT_PAGE_SIZE", 50)
+MAX_PAGE_SIZE = _env_int("MAX_PAGE_SIZE", 200)
+
+# --- QUERY DIAGNOSTICS ---
+# Dev only: add X-DB-Queries / X-DB-Time-Ms / X-DB-N-Plus-One and Server-Timing headers to every response.
+# Production reads the same numbers per route from /api/v1/metrics ("db_queries").
+DB_STATS_HEADERS = _env_bool("DB_STATS_HEADERS", False)
+# The same statement this many times in one request is flagged as a likely N+1
+DB_N_PLUS_ONE_THRESHOLD = _env_int("DB_N_PLUS_ONE_THRESHOLD", 5)
+
+# --- DOCTOR RANKING ---
+# Bayesian average: every doctor starts with this many imaginary reviews at the prior mean,
+# so 2 five-star reviews don't outrank 200 reviews averaging 4.8.
+RANKING_PRIOR_MEAN = _env_float("RANKING_PRIOR_MEAN", 4.0)
+RANKING_PRIOR_WEIGHT = _env_float("RANKING_PRIOR_WEIGHT", 10.0)
+
+# --- RESPONSE CACHE (public catalog: doctor list/profile, health tips) ---
+RESPONSE_CACHE_ENABLED = _env_bool("RESPONSE_CACHE_ENABLED", True)
+# Writes through the API invalidate at once; the TTL only bounds staleness from raw SQL and seed scripts
+RESPONSE_CACHE_TTL_SECONDS = _env_int("RESPONSE_CACHE_TTL_SECONDS", 60)
+RESPONSE_CACHE_MAX_ENTRIES = _env_int("RESPONSE_CACHE_MAX_ENTRIES", 2000)
+# 'memory' = per worker (invalidations reach the other workers over the event bus, so use EVENTS_BROKER=postgres),
+# 'redis' = one cache shared by every worker (pip install redis)
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower()
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+# --- TRIAGE CACHE (AI chat answers, per worker) ---
+TRIAGE_CACHE_ENABLED = _env_bool("TRIAGE_CACHE_ENABLED", True)
+# Advice can be revised (prompt or model changes), so answers don't live long
+TRIAGE_CACHE_TTL_SECONDS = _env_int("TRIAGE_CACHE_TTL_SECONDS", 6 * 3600)
+TRIAGE_CACHE_MAX_ENTRIES = _env_int("TRIAGE_CACHE_MAX_ENTRIES", 5000)
+# Also reuse answers for near-identical messages (word order, plurals, filler words); off = normalized exact match only
+TRIAGE_CACHE_SEMANTIC = _env_bool("TRIAGE_CACHE_SEMANTIC", False)
+# Cosine similarity needed for a similar-message hit. Below ~0.85 a different symptom starts to match.
+TRIAGE_CACHE_SIMILARITY = _env_float("TRIAGE_CACHE_SIMILARITY", 0.9)
+TRIAGE_CACHE_DIMENSIONS = _env_int("TRIAGE_CACHE_DIMENSIONS", 4096)
+
+# --- CHAT SESSIONS (multi-turn triage) ---
+# Rough tokens (~4 characters each) of recent turns sent back to the model word for word.
+# Older turns are folded into the session summary, which gets its own, smaller budget.
+CHAT_HISTORY_TOKEN_BUDGET = _env_int("CHAT_HISTORY_TOKEN_BUDGET", 1200)
+CHAT_SUMMARY_TOKEN_BUDGET = _env_int("CHAT_SUMMARY_TOKEN_BUDGET", 300)
+
+# --- AI PROVIDER CLIENT (timeouts, retries, hedging, circuit breaker) ---
+# One model call (for a stream: until its first chunk)
+AI_TIMEOUT_SECONDS = _env_float("AI_TIMEOUT_SECONDS", 20.0)
+# The whole answer, retries included. Keep it under the proxy's read timeout.
+AI_DEADLINE_SECONDS = _env_float("AI_DEADLINE_SECONDS", 45.0)
+# Longest silence between two chunks of a stream
+AI_STREAM_IDLE_SECONDS = _env_float("AI_STREAM_IDLE_SECONDS", 15.0)
+# Retries of rate limits, 5xx and timeouts, with full-jitter exponential backoff
+AI_MAX_RETRIES = _env_int("AI_MAX_RETRIES", 2)
+AI_RETRY_BASE_MS = _env_int("AI_RETRY_BASE_MS", 250)
+AI_RETRY_MAX_MS = _env_int("AI_RETRY_MAX_MS", 4000)
+# Hedging: a call still running after the recent p95 gets a twin, and the first answer wins.
+# Off by default, as it pays for a second model call; the budget caps hedges to that share of calls.
+AI_HEDGE_ENABLED = _env_bool("AI_HEDGE_ENABLED", False)
+AI_HEDGE_QUANTILE = _env_float("AI_HEDGE_QUANTILE", 0.95)
+AI_HEDGE_MIN_SAMPLES = _env_int("AI_HEDGE_MIN_SAMPLES", 20)
+AI_HEDGE_BUDGET = _env_float("AI_HEDGE_BUDGET", 0.1)
+# This many failed calls in a row open the breaker: calls fail at once for the cooldown, then one trial call decides
+AI_BREAKER_FAILURES = _env_int("AI_BREAKER_FAILURES", 5)
+AI_BREAKER_COOLDOWN_SECONDS = _env_float("AI_BREAKER_COOLDOWN_SECONDS", 30.0)
+
+# --- AI PROVIDERS (triage assistant routing, see app/services/ai_router.py) ---
+# Providers to route between; the ones without credentials are skipped. 'stub' answers with a canned
+# text locally (development without keys) and is never used unless listed here.
+AI_PROVIDERS = [name.strip().lower() for name in os.getenv("AI_PROVIDERS", "gemini,openai").split(",") if name.strip()]
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Any OpenAI-compatible endpoint (Azure, OpenRouter, vLLM, Ollama...); unset = api.openai.com
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+# Model per plan. Premium chats fall back to the free tier's models when every premium one fails.
+GEMINI_MODEL_FREE = os.getenv("GEMINI_MODEL_FREE", "gemini-2.0-flash")
+GEMINI_MODEL_PREMIUM = os.getenv("GEMINI_MODEL_PREMIUM", "gemini-2.5-pro")
+OPENAI_MODEL_FREE = os.getenv("OPENAI_MODEL_FREE", "gpt-4o-mini")
+OPENAI_MODEL_PREMIUM = os.getenv("OPENAI_MODEL_PREMIUM", "gpt-4o")
+AI_STUB_LATENCY_MS = _env_int("AI_STUB_LATENCY_MS", 300)
+# Calls in flight per provider (keep under its rate limit). A full provider is passed over for the next one.
+AI_PROVIDER_MAX_CONCURRENCY = _env_int("AI_PROVIDER_MAX_CONCURRENCY", 32)
+# Routes within this fraction of the fastest one's latency count as just as fast; the cheapest of them wins
+AI_ROUTER_LATENCY_SLACK = _env_float("AI_ROUTER_LATENCY_SLACK", 0.25)
+# Share of calls sent down a random healthy route, so the other routes' latency estimates stay current
+AI_ROUTER_EXPLORE = _env_float("AI_ROUTER_EXPLORE", 0.05)
@@ -1,42 +1,108 @@
+import logging
 import os
 import sys
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from dotenv import load_dotenv
+from app.core import config, metrics
+from app.core.pool_metrics import TimedQueuePool, TimedAsyncQueuePool, pool_snapshot, install_statement_timeout
 
 # 1. Load Secrets
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # 2. Get Database URL
 # CHANGE: We removed the "sqlite" fallback. Now it is None if .env is missing.
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
-# DEBUG PRINT: This will tell us exactly what the script is seeing
-print(f"🔌 CONNECTING TO: {SQLALCHEMY_DATABASE_URL}")
-
 if not SQLALCHEMY_DATABASE_URL:
-    print("❌ ERROR: Could not find DATABASE_URL in .env file.")
+    logger.critical("Could not find DATABASE_URL in .env file.")
     sys.exit(1) # Crash intentionally so we know something is wrong
 
 # --- FIX: Handle Supabase/Render URL format compatibility ---
 if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
     SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-# 3. Configure Engine
+def _async_url(url: str) -> str:
+    """Same database, async driver: aiosqlite for SQLite, psycopg (v3) for Postgres."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if parsed.drivername in ("postgresql", "postgresql+psycopg2"):
+        return parsed.set(drivername="postgresql+psycopg").render_as_string(hide_password=False)
+    return url
+
+ASYNC_DATABASE_URL = _async_url(SQLALCHEMY_DATABASE_URL)
+
+def pooler_mode(url: str) -> str:
+    if config.DB_POOLER_MODE != "auto":
+        return config.DB_POOLER_MODE
+    # PgBouncer's default port and Supabase's transaction-mode pooler port
+    return "transaction" if make_url(url).port in (6432, 6543) else "none"
+
+def postgres_connect_args(url: str) -> dict:
+    """
+    Prepared statements break behind a transaction pooler (the next transaction may land
+    on another server connection), so they are only enabled when we talk to Postgres directly
+    or through a session pooler.
+    """
+    transaction_pooled = pooler_mode(url) == "transaction"
+    driver = make_url(url).get_driver_name()
+    if driver == "psycopg":
+        return {"prepare_threshold": None if transaction_pooled else config.DB_PREPARE_THRESHOLD}
+    if driver == "asyncpg" and transaction_pooled:
+        return {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+    # psycopg2 never uses server-side prepared statements
+    return {}
+
+# Never log the password
+logger.info("Connecting to %s", make_url(SQLALCHEMY_DATABASE_URL).render_as_string(hide_password=True))
+
+# 3. Configure Engines
+# The sync engine is kept for the seed scripts and schema setup; the API uses the async one.
+# Both use instrumented pools so checkout waits and exhaustion show up in /metrics.
 if "sqlite" in SQLALCHEMY_DATABASE_URL:
     engine = create_engine(
-        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False},
+        poolclass=TimedQueuePool
     )
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=TimedAsyncQueuePool)
 else:
     # PostgreSQL specific args (Cloud Production)
+    pool_args = dict(
+        pool_pre_ping=True,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+    )
+    logger.info("Postgres pooler mode: %s", pooler_mode(SQLALCHEMY_DATABASE_URL))
     engine = create_engine(
         SQLALCHEMY_DATABASE_URL,
-        pool_pre_ping=True,
-        connect_args={"prepare_threshold": None}
+        connect_args=postgres_connect_args(SQLALCHEMY_DATABASE_URL),
+        query_cache_size=config.DB_QUERY_CACHE_SIZE,
+        poolclass=TimedQueuePool, **pool_args
     )
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        connect_args=postgres_connect_args(ASYNC_DATABASE_URL),
+        query_cache_size=config.DB_QUERY_CACHE_SIZE,
+        poolclass=TimedAsyncQueuePool, **pool_args
+    )
+    if config.DB_STATEMENT_TIMEOUT_MS:
+        install_statement_timeout(engine, config.DB_STATEMENT_TIMEOUT_MS)
+        install_statement_timeout(async_engine.sync_engine, config.DB_STATEMENT_TIMEOUT_MS)
+
+metrics.register("db_pool", lambda: {"sync": pool_snapshot(engine.pool), "async": pool_snapshot(async_engine.pool)})
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: lazy refreshes are not possible under asyncio, so committed
+# objects must stay readable when the handler builds its response.
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 def get_db():
@@ -44,4 +110,8 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
\ No newline at end of file
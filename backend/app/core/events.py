@@ -0,0 +1,194 @@
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional, Set
+
+from app.core import config, metrics
+
+logger = logging.getLogger(__name__)
+
+# Topics used by the appointments router
+QUEUE_TOPIC = "queue" # general consultations waiting for any GP
+
+def doctor_topic(doctor_id: int) -> str:
+    return f"doctor:{doctor_id}" # paid requests waiting for one doctor
+
+Dispatch = Callable[[str, dict], None]
+
+class Broker(ABC):
+    """
+    Carries published events to every worker's bus.
+    The in-memory broker hands them straight back; others go over the network first.
+    """
+
+    _dispatch: Optional[Dispatch] = None
+
+    async def start(self, dispatch: Dispatch) -> None:
+        self._dispatch = dispatch
+
+    async def stop(self) -> None:
+        pass
+
+    @abstractmethod
+    async def publish(self, topic: str, event: dict) -> None:
+        """Delivers the event to every worker's dispatch (this one's included)."""
+
+class MemoryBroker(Broker):
+    async def publish(self, topic: str, event: dict) -> None:
+        if self._dispatch: # not started => nobody can be subscribed yet
+            self._dispatch(topic, event)
+
+class PostgresBroker(Broker):
+    """
+    LISTEN/NOTIFY on the app database, so every API worker sees every event.
+    One dedicated listening connection per worker; publishes go through the normal pool.
+    """
+
+    CHANNEL = "mediq_events"
+    RECONNECT_SECONDS = 2.0
+
+    def __init__(self, dsn: str, engine):
+        self.dsn = dsn
+        self.engine = engine
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, dispatch: Dispatch) -> None:
+        await super().start(dispatch)
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _listen(self) -> None:
+        import psycopg
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.dsn, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {self.CHANNEL}")
+                    logger.info("Listening for events on %s", self.CHANNEL)
+                    async for notify in conn.notifies():
+                        message = json.loads(notify.payload)
+                        self._dispatch(message["topic"], message["event"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Events published while we reconnect are lost; streams resync from their snapshot
+                logger.exception("Event listener dropped, reconnecting")
+                await asyncio.sleep(self.RECONNECT_SECONDS)
+
+    async def publish(self, topic: str, event: dict) -> None:
+        from sqlalchemy import text
+        payload = json.dumps({"topic": topic, "event": event}, default=str)
+        async with self.engine.connect() as conn:
+            await conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self.CHANNEL, "payload": payload})
+            await conn.commit()
+
+class Subscription:
+    def __init__(self, topics: Set[str]):
+        self.topics = topics
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=config.EVENTS_SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+class EventBus:
+    """Fan-out of small JSON events to the streams connected to this worker."""
+
+    def __init__(self, broker: Broker = None):
+        self.broker = broker or MemoryBroker()
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._listeners: Dict[str, List[Dispatch]] = {}
+        self._started = False
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def set_broker(self, broker: Broker) -> None:
+        if self._started:
+            raise RuntimeError("Set the broker before the event bus starts")
+        self.broker = broker
+
+    async def start(self) -> None:
+        await self.broker.start(self._dispatch)
+        self._started = True
+
+    async def stop(self) -> None:
+        await self.broker.stop()
+        self._started = False
+
+    @asynccontextmanager
+    async def subscribe(self, *topics: str):
+        sub = Subscription(set(topics))
+        for topic in sub.topics:
+            self._subscribers.setdefault(topic, set()).add(sub)
+        try:
+            yield sub
+        finally:
+            for topic in sub.topics:
+                subs = self._subscribers.get(topic)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subscribers[topic]
+
+    def add_listener(self, topic: str, callback: Dispatch) -> None:
+        """In-process consumer called for every event on `topic`, on the event loop. Must be quick and not block."""
+        self._listeners.setdefault(topic, []).append(callback)
+
+    async def publish(self, topic: str, event: dict) -> None:
+        """Best effort: the database commit already happened, so a broker failure must not fail the request."""
+        self.published += 1
+        try:
+            await self.broker.publish(topic, event)
+        except Exception:
+            logger.exception("Could not publish %s event", topic)
+
+    def _dispatch(self, topic: str, event: dict) -> None:
+        for callback in self._listeners.get(topic, ()):
+            try:
+                callback(topic, event)
+            except Exception:
+                logger.exception("Listener for %s events failed", topic)
+        for sub in list(self._subscribers.get(topic, ())):
+            if sub.overflowed:
+                continue
+            try:
+                sub.queue.put_nowait(event)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                # Don't let one slow client buffer without bound; its stream tells it to reload
+                sub.overflowed = True
+                self.dropped += 1
+
+    def stats(self) -> dict:
+        return {
+            "broker": type(self.broker).__name__,
+            "subscriptions": len({sub for subs in self._subscribers.values() for sub in subs}),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped_subscribers": self.dropped,
+        }
+
+bus = EventBus()
+metrics.register("events", bus.stats)
+
+def configure_broker() -> None:
+    """Pick the broker named by EVENTS_BROKER. Called from the app lifespan before bus.start()."""
+    if config.EVENTS_BROKER == "memory":
+        return
+    if config.EVENTS_BROKER != "postgres":
+        raise RuntimeError(f"Unknown EVENTS_BROKER: {config.EVENTS_BROKER}")
+
+    from app.core.database import async_engine
+    url = async_engine.url
+    if url.get_backend_name() != "postgresql":
+        raise RuntimeError("EVENTS_BROKER=postgres needs a PostgreSQL DATABASE_URL")
+    # libpq-style DSN for the dedicated psycopg listening connection.
+    # LISTEN needs a session connection: behind a transaction pooler, point DATABASE_URL at the direct port.
+    dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+    bus.set_broker(PostgresBroker(dsn, async_engine))
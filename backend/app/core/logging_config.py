@@ -0,0 +1,138 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import time
+from typing import Optional
+from app.core import config, request_context
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_STANDARD_ATTRS = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS:
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+def setup_logging() -> None:
+    """
+    Routes all records through a QueueHandler so request threads never block on stdout.
+    A single background listener thread does the actual writing. Safe to call twice.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler()
+    if config.LOG_FORMAT == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(config.LOG_LEVEL)
+
+    for item in filter(None, (part.strip() for part in config.LOG_LEVELS.split(","))):
+        name, _, level = item.partition("=")
+        logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+def debug_sampled(logger: logging.Logger, msg: str, *args, rate: Optional[float] = None) -> None:
+    """Debug log for hot paths: costs one level check when DEBUG is off, and only emits a sample when on."""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    if random.random() < (config.LOG_DEBUG_SAMPLE_RATE if rate is None else rate):
+        logger.debug(msg, *args)
+
+request_logger = logging.getLogger("app.request")
+
+DB_STATS_HEADER_NAMES = ["X-DB-Queries", "X-DB-Time-Ms", "X-DB-N-Plus-One", "Server-Timing"]
+
+def db_stats_headers(stats: request_context.RequestStats) -> list:
+    """Dev headers, as of when the response starts (the handler is done; a streaming body may still query)."""
+    db_ms = round(stats.db_time * 1000, 2)
+    suspects = stats.n_plus_one()
+    headers = {
+        "x-db-queries": str(stats.db_queries),
+        "x-db-time-ms": str(db_ms),
+        "x-db-n-plus-one": "; ".join(f"{s['count']}x {s['statement'][:120]}" for s in suspects) or "none",
+        "server-timing": f'db;dur={db_ms};desc="{stats.db_queries} queries"', # shows up in browser devtools
+    }
+    # Header values must be latin-1 and single-line
+    return [(name.encode(), value.replace("\n", " ").encode("latin-1", "replace")) for name, value in headers.items()]
+
+class RequestLogMiddleware:
+    """
+    Pure ASGI middleware that emits one structured record per request:
+    route, status, latency, DB query count and time, and user id.
+    Errors, slow requests and N+1 suspects are always logged; the rest are sampled.
+    Every request also feeds the per-route DB totals in the metrics endpoint.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = request_context.begin()
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if config.DB_STATS_HEADERS:
+                    message["headers"] = [*message.get("headers", []), *db_stats_headers(stats)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            latency_ms = (time.perf_counter() - start) * 1000
+            # The router writes the matched route into the scope, so we get the template, not the raw path.
+            # Unmatched paths (404s, scanners) are pooled so they can't grow the per-route table.
+            route = getattr(scope.get("route"), "path", None)
+            suspects = stats.n_plus_one() if stats.db_queries >= config.DB_N_PLUS_ONE_THRESHOLD else []
+            request_context.route_stats.record(f"{scope['method']} {route or '<unmatched>'}", stats, suspects)
+            if request_logger.isEnabledFor(logging.INFO) and (
+                status_code >= 500
+                or suspects
+                or latency_ms >= config.LOG_SLOW_REQUEST_MS
+                or random.random() < config.LOG_REQUEST_SAMPLE_RATE
+            ):
+                request_logger.info(
+                    "request",
+                    extra={
+                        "method": scope["method"],
+                        "route": route or scope["path"],
+                        "status": status_code,
+                        "latency_ms": round(latency_ms, 2),
+                        "db_queries": stats.db_queries,
+                        "db_time_ms": round(stats.db_time * 1000, 2),
+                        "n_plus_one": suspects or None,
+                        "user_id": stats.user_id,
+                    },
+                )
@@ -0,0 +1,59 @@
+import bisect
+import threading
+from typing import Callable, Dict
+
+# Each subsystem registers a callable that returns a JSON-friendly dict.
+# The metrics endpoint just walks this registry, so nothing here imports the subsystems.
+_providers: Dict[str, Callable[[], dict]] = {}
+
+def register(name: str, provider: Callable[[], dict]) -> None:
+    _providers[name] = provider
+
+def collect() -> dict:
+    return {name: provider() for name, provider in _providers.items()}
+
+class Histogram:
+    """Fixed-bucket histogram (seconds). Cheap enough to observe on every call."""
+
+    DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total += value
+            if value > self.max:
+                self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation (max for the overflow bucket)."""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = q * self.count
+            seen = 0
+            for index, n in enumerate(self._counts):
+                seen += n
+                if seen >= rank:
+                    return self.buckets[index] if index < len(self.buckets) else self.max
+            return self.max
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            cumulative, running = {}, 0
+            for bound, n in zip(self.buckets, self._counts):
+                running += n
+                cumulative[f"le_{bound}"] = running
+            cumulative["le_inf"] = self.count
+            data = {"count": self.count, "sum": round(self.total, 6), "max": round(self.max, 6), "buckets": cumulative}
+        data.update({"p50": self.quantile(0.5), "p95": self.quantile(0.95), "p99": self.quantile(0.99)})
+        return data
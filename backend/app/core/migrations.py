@@ -0,0 +1,117 @@
+import importlib
+import logging
+import pkgutil
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Index, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from app.core import config
+
+logger = logging.getLogger(__name__)
+
+# Kept out of Base.metadata on purpose: the app itself never touches it
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _metadata,
+    Column("version", String, primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+MIGRATIONS_PACKAGE = "app.migrations"
+# Arbitrary constant so two deploys starting at once don't both migrate
+_ADVISORY_LOCK_ID = 7243001
+
+def discover():
+    """Returns [(version, module)] sorted by version. Modules are named v0001_description.py."""
+    package = importlib.import_module(MIGRATIONS_PACKAGE)
+    found = []
+    for info in pkgutil.iter_modules(package.__path__):
+        if info.name.startswith("v") and info.name[1:5].isdigit():
+            found.append((info.name, importlib.import_module(f"{MIGRATIONS_PACKAGE}.{info.name}")))
+    return sorted(found, key=lambda item: item[0])
+
+def applied_versions(conn: Connection) -> set:
+    schema_migrations.create(conn, checkfirst=True)
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+def pending(engine: Engine):
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+    return [(version, module) for version, module in discover() if version not in done]
+
+def run_migrations(engine: Engine) -> list:
+    """
+    Applies every pending migration, each in its own transaction. Returns the versions applied.
+    A module that sets TRANSACTIONAL = False (e.g. CREATE INDEX CONCURRENTLY) runs in autocommit
+    instead, so its upgrade() must be safe to re-run if it fails halfway.
+    """
+    applied = []
+    with engine.connect() as lock_conn:
+        is_postgres = engine.dialect.name == "postgresql"
+        if is_postgres:
+            lock_conn.exec_driver_sql(f"SELECT pg_advisory_lock({_ADVISORY_LOCK_ID})")
+        try:
+            for version, module in pending(engine):
+                logger.info("Applying migration %s", version)
+                # Backfills and index builds on big tables outlast the API's statement timeout
+                if getattr(module, "TRANSACTIONAL", True):
+                    with engine.begin() as conn:
+                        if is_postgres:
+                            conn.exec_driver_sql("SET LOCAL statement_timeout = 0")
+                        module.upgrade(conn)
+                        conn.execute(schema_migrations.insert().values(version=version, applied_at=datetime.utcnow()))
+                else:
+                    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                        if is_postgres:
+                            conn.exec_driver_sql("SET statement_timeout = 0")
+                        try:
+                            module.upgrade(conn)
+                            conn.execute(schema_migrations.insert().values(version=version, applied_at=datetime.utcnow()))
+                        finally:
+                            if is_postgres:
+                                # Session-level, so put the pool's setting back before the connection is reused
+                                conn.exec_driver_sql(f"SET statement_timeout = {int(config.DB_STATEMENT_TIMEOUT_MS)}")
+                applied.append(version)
+        finally:
+            if is_postgres:
+                lock_conn.exec_driver_sql(f"SELECT pg_advisory_unlock({_ADVISORY_LOCK_ID})")
+                lock_conn.commit()
+    return applied
+
+# --- Helpers for migration modules ---
+# Migrations describe their tables with their own Table/Column/Index objects (or literal SQL), never
+# the app's models, so they keep doing what they did when they shipped. Every helper is idempotent:
+# non-transactional migrations must be safe to re-run.
+
+def has_column(conn: Connection, table: str, column: str) -> bool:
+    return any(c["name"] == column for c in inspect(conn).get_columns(table))
+
+def add_column(conn: Connection, table: str, column: Column) -> None:
+    if not has_column(conn, table, column.name):
+        ddl_type = column.type.compile(dialect=conn.dialect)
+        default = f" DEFAULT {column.server_default.arg}" if column.server_default is not None else ""
+        # NOT NULL needs the default to fill the rows already there
+        not_null = " NOT NULL" if default and not column.nullable else ""
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column.name} {ddl_type}{not_null}{default}")
+
+def _drop_invalid_pg_index(conn: Connection, name: str) -> None:
+    # A failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind that checkfirst would happily skip
+    invalid = conn.execute(text(
+        "SELECT NOT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"
+    ), {"name": name}).scalar()
+    if invalid:
+        logger.warning("Dropping invalid index %s left by an earlier attempt", name)
+        conn.exec_driver_sql(f"DROP INDEX {name}")
+
+def create_index(conn: Connection, index: Index, concurrently: bool = False) -> None:
+    """concurrently=True builds without blocking writes on PostgreSQL; the migration must be TRANSACTIONAL = False."""
+    if not (concurrently and conn.dialect.name == "postgresql"):
+        index.create(conn, checkfirst=True)
+        return
+    _drop_invalid_pg_index(conn, index.name)
+    # Only for this statement: the same Index object is also used by create_all() inside transactions
+    options = index.dialect_options["postgresql"]
+    options["concurrently"] = True
+    try:
+        index.create(conn, checkfirst=True)
+    finally:
+        options["concurrently"] = False
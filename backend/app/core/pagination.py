@@ -0,0 +1,39 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+# Keyset ("seek") pagination: the cursor is the sort key of the last row the client saw.
+# The next page is "rows after that key", which stays an index range scan however deep the client pages,
+# unlike OFFSET which re-reads every skipped row.
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(*values) -> str:
+    """Opaque, URL-safe token for the sort key of the last row on a page."""
+    plain = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(plain, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    """Reverse of encode_cursor. `types` coerces each value (datetime, int, float, str); bad input is a 400."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("wrong arity")
+        return tuple(
+            None if value is None else (datetime.fromisoformat(value) if kind is datetime else kind(value))
+            for kind, value in zip(types, values)
+        )
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise HTTPException(400, "Invalid cursor")
+
+def after(column, id_column, value, last_id, descending: bool = False):
+    """
+    Filter for the rows after (value, last_id) in ORDER BY column [DESC], id_column ASC.
+    Mixed directions rule out a row comparison; the leading bound keeps it an index range.
+    """
+    if descending:
+        return and_(column <= value, or_(column < value, and_(column == value, id_column > last_id)))
+    return and_(column >= value, or_(column > value, and_(column == value, id_column > last_id)))
@@ -0,0 +1,62 @@
+import logging
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from app.core.metrics import Histogram
+
+class PoolStats:
+    def __init__(self):
+        self.checkout_wait = Histogram()
+        self.timeouts = 0
+
+class _TimedCheckoutMixin:
+    """
+    Times how long callers wait for a connection, including waits caused by exhaustion.
+    Stats live on the class (one class per engine) because dispose() replaces the pool instance.
+    """
+    stats: PoolStats
+
+    def _do_get(self):
+        stats = self.stats
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            stats.timeouts += 1
+            raise
+        finally:
+            stats.checkout_wait.observe(time.perf_counter() - start)
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    stats = PoolStats()
+
+class TimedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    stats = PoolStats()
+
+# SQLAlchemy names pool loggers after the pool class. Ours live outside the "sqlalchemy"
+# namespace, so give them the same WARN default its own pools get (echo_pool still works).
+for _cls in (TimedQueuePool, TimedAsyncQueuePool):
+    logging.getLogger(f"{_cls.__module__}.{_cls.__name__}").setLevel(logging.WARNING)
+
+def pool_snapshot(pool) -> dict:
+    stats = pool.stats
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow_in_use": max(pool.overflow(), 0),
+        "timeouts": stats.timeouts,
+        "checkout_wait_seconds": stats.checkout_wait.snapshot(),
+    }
+
+def install_statement_timeout(engine, timeout_ms: int) -> None:
+    """SET statement_timeout on every new connection."""
+
+    @event.listens_for(engine, "connect")
+    def _set_statement_timeout(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"SET statement_timeout = {int(timeout_ms)}")
+        cursor.close()
+        # The driver opened a transaction for the SET; commit so the pool's rollback-on-return keeps it
+        dbapi_connection.commit()
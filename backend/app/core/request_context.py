@@ -0,0 +1,135 @@
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core import config, metrics
+
+@dataclass
+class RequestStats:
+    """Mutable per-request counters. Filled in by the SQL hooks and the auth dependency."""
+    db_queries: int = 0
+    db_time: float = 0.0 # seconds spent in cursor.execute
+    statements: Counter = field(default_factory=Counter) # statement shape -> executions
+    user_id: Optional[int] = None
+
+    def n_plus_one(self) -> List[dict]:
+        """Statement shapes repeated often enough in this request to look like a lazy load in a loop."""
+        return [
+            {"statement": abbreviate(shape), "count": count}
+            for shape, count in self.statements.most_common()
+            if count >= config.DB_N_PLUS_ONE_THRESHOLD
+        ]
+
+# The middleware puts a fresh RequestStats here for each request.
+# Sync handlers run in a threadpool with a *copy* of the context, so we
+# mutate the object instead of re-setting the variable.
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def begin() -> RequestStats:
+    stats = RequestStats()
+    _current.set(stats)
+    return stats
+
+def current() -> Optional[RequestStats]:
+    return _current.get()
+
+def set_user(user_id: int) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.user_id = user_id
+
+# --- STATEMENT SHAPES ---
+# Bound parameters are already placeholders, so the SQL text is the shape. Only expanded IN lists
+# (selectinload batches, IN (...) filters) vary in length: "IN (?, ?, ?)" and "IN (?)" are the same query.
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|\$\d+|:\w+)"
+_IN_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)")
+_SPACES = re.compile(r"\s+")
+
+@lru_cache(maxsize=2048) # the compiled-SQL cache hands us the same strings over and over
+def statement_shape(statement: str) -> str:
+    return _IN_LIST.sub("(...)", _SPACES.sub(" ", statement).strip())
+
+_COLUMN_LIST = re.compile(r"^SELECT .+? FROM ")
+
+def abbreviate(shape: str, limit: int = 300) -> str:
+    """For display: the column list is noise, the FROM/WHERE part says which lazy load it is."""
+    return _COLUMN_LIST.sub("SELECT ... FROM ", shape, count=1)[:limit]
+
+# Listening on the Engine class covers every engine, sync or async
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.statements[statement_shape(statement)] += 1
+        if context is not None:
+            context._request_query_started = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _time_query(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = getattr(context, "_request_query_started", None)
+    if stats is not None and started is not None:
+        stats.db_time += time.perf_counter() - started
+
+# --- PER-ROUTE TOTALS (metrics endpoint) ---
+
+class RouteQueryStats:
+    """
+    Process-wide DB totals per route, so production can spot chatty endpoints
+    without per-request headers. Keeps the last few N+1 shapes seen on each route.
+    """
+
+    MAX_SUSPECTS_PER_ROUTE = 5
+
+    def __init__(self):
+        self._routes: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, stats: RequestStats, suspects: List[dict]) -> None:
+        with self._lock:
+            entry = self._routes.get(route)
+            if entry is None:
+                entry = self._routes[route] = {
+                    "requests": 0, "queries": 0, "max_queries": 0, "db_time_ms": 0.0, "max_db_time_ms": 0.0,
+                    "n_plus_one_requests": 0, "suspects": {},
+                }
+            db_time_ms = stats.db_time * 1000
+            entry["requests"] += 1
+            entry["queries"] += stats.db_queries
+            entry["max_queries"] = max(entry["max_queries"], stats.db_queries)
+            entry["db_time_ms"] += db_time_ms
+            entry["max_db_time_ms"] = max(entry["max_db_time_ms"], db_time_ms)
+            if suspects:
+                entry["n_plus_one_requests"] += 1
+                for suspect in suspects:
+                    seen = entry["suspects"].pop(suspect["statement"], 0) # re-insert: most recent last
+                    entry["suspects"][suspect["statement"]] = max(seen, suspect["count"])
+                while len(entry["suspects"]) > self.MAX_SUSPECTS_PER_ROUTE:
+                    del entry["suspects"][next(iter(entry["suspects"]))]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            routes = {
+                route: {
+                    "requests": e["requests"],
+                    "queries_per_request": round(e["queries"] / e["requests"], 2),
+                    "max_queries": e["max_queries"],
+                    "db_ms_per_request": round(e["db_time_ms"] / e["requests"], 3),
+                    "max_db_ms": round(e["max_db_time_ms"], 3),
+                    "n_plus_one_requests": e["n_plus_one_requests"],
+                    "n_plus_one_suspects": [{"statement": s, "max_count": n} for s, n in e["suspects"].items()],
+                }
+                for route, e in self._routes.items()
+            }
+        # Heaviest routes first
+        return dict(sorted(routes.items(), key=lambda item: item[1]["db_ms_per_request"] * item[1]["requests"], reverse=True))
+
+route_stats = RouteQueryStats()
+metrics.register("db_queries", route_stats.snapshot)
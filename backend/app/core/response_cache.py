@@ -0,0 +1,238 @@
+"""
+Response cache for public GET endpoints whose body is the same for every caller
+(doctor list and profiles, health tips).
+
+Entries hold the serialized JSON, so a hit costs neither a query nor a Pydantic pass.
+Each entry is filed under tags ("doctors", "doctor:12", "tips") and writers call invalidate(*tags)
+after their commit. Invalidating bumps the tag's version, and the versions are part of the key:
+old entries are never read again and age out of the LRU. Versions are read before loading, so a
+slow request that started before a write stores its stale body under the old key, where nobody looks.
+
+Clients get a strong ETag and Last-Modified and can revalidate with If-None-Match / If-Modified-Since.
+"""
+import hashlib
+import logging
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlencode
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from app.core import config, events, metrics
+from app.core.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# --- TAGS ---
+DOCTORS = "doctors" # every public doctor listing
+TIPS = "tips"
+
+def doctor_tag(doctor_id: int) -> str:
+    return f"doctor:{doctor_id}"
+
+# Browsers and the app may keep the body but must revalidate (a cheap 304) before reusing it
+CACHE_CONTROL = "public, no-cache"
+
+TOPIC = "response_cache" # invalidations for the other workers' memory caches
+_ORIGIN = uuid.uuid4().hex # so a worker skips the echo of its own invalidations
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    last_modified: float # unix seconds, when the body was rendered
+
+    def encode(self) -> bytes:
+        return f"{self.etag}\n{self.last_modified}\n".encode() + self.body
+
+    @classmethod
+    def decode(cls, raw: bytes) -> "CachedResponse":
+        etag, last_modified, body = raw.split(b"\n", 2)
+        return cls(body=body, etag=etag.decode(), last_modified=float(last_modified))
+
+class Backend(ABC):
+    """Where entries and tag versions live. Every method may raise; the cache then serves uncached."""
+
+    @abstractmethod
+    async def versions(self, tags: List[str]) -> List[int]:
+        """Current version of each tag (0 if never invalidated)."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        """The entry, or None on a miss."""
+
+    @abstractmethod
+    async def set(self, key: str, entry: CachedResponse) -> None:
+        """Stores the entry under the key."""
+
+    @abstractmethod
+    async def invalidate(self, tags: List[str]) -> None:
+        """Bumps each tag's version, so every entry built under the old one misses."""
+
+    def stats(self) -> dict:
+        return {}
+
+class MemoryBackend(Backend):
+    """Per worker. Invalidations go out on the event bus so the other workers drop their copies too."""
+
+    def __init__(self):
+        self.entries = LRUCache("responses", maxsize=config.RESPONSE_CACHE_MAX_ENTRIES, ttl=config.RESPONSE_CACHE_TTL_SECONDS)
+        self._versions: Dict[str, int] = {}
+
+    async def versions(self, tags: List[str]) -> List[int]:
+        return [self._versions.get(tag, 0) for tag in tags]
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        return self.entries.get(key)
+
+    async def set(self, key: str, entry: CachedResponse) -> None:
+        self.entries.set(key, entry)
+
+    def bump(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    async def invalidate(self, tags: List[str]) -> None:
+        self.bump(tags) # right away here; the bus may take a network round trip
+        await events.bus.publish(TOPIC, {"tags": tags, "origin": _ORIGIN})
+
+    def stats(self) -> dict:
+        return {"entries": self.entries.stats()["size"], "maxsize": config.RESPONSE_CACHE_MAX_ENTRIES, "tags": len(self._versions)}
+
+class RedisBackend(Backend):
+    """One cache for every worker. Versions are counters in Redis, so invalidating is one INCR per tag."""
+
+    PREFIX = "mediq:response:"
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis # optional dependency, only needed for this backend
+        self.client = redis.from_url(url)
+
+    async def versions(self, tags: List[str]) -> List[int]:
+        return [int(v or 0) for v in await self.client.mget([f"{self.PREFIX}tag:{tag}" for tag in tags])]
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        raw = await self.client.get(self.PREFIX + key)
+        return CachedResponse.decode(raw) if raw else None
+
+    async def set(self, key: str, entry: CachedResponse) -> None:
+        await self.client.set(self.PREFIX + key, entry.encode(), ex=config.RESPONSE_CACHE_TTL_SECONDS)
+
+    async def invalidate(self, tags: List[str]) -> None:
+        async with self.client.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.incr(f"{self.PREFIX}tag:{tag}")
+            await pipe.execute()
+
+class ResponseCache:
+    def __init__(self, backend: Backend = None):
+        self.backend = backend or MemoryBackend()
+        self._adapters: Dict[Any, TypeAdapter] = {}
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.errors = 0
+
+    def set_backend(self, backend: Backend) -> None:
+        self.backend = backend
+
+    async def respond(self, request: Request, tags: List[str], model: Any, load: Callable[[], Awaitable[Any]]) -> Response:
+        """
+        The cached response for this URL, or load() serialized as `model` and stored.
+        Exceptions from load() (e.g. a 404) pass through and nothing is stored.
+        """
+        key = None
+        entry = None
+        if config.RESPONSE_CACHE_ENABLED:
+            versions = await self._safely(self.backend.versions(tags))
+            if versions is not None:
+                query = urlencode(sorted(request.query_params.multi_items()))
+                key = f"{request.url.path}?{query}#" + ",".join(f"{tag}={v}" for tag, v in zip(tags, versions))
+                entry = await self._safely(self.backend.get(key))
+        if entry is not None:
+            self.hits += 1
+            outcome = "HIT"
+        else:
+            self.misses += 1
+            outcome = "MISS" if key else "BYPASS"
+            entry = self._render(model, await load())
+            if key:
+                await self._safely(self.backend.set(key, entry))
+
+        headers = {
+            "ETag": entry.etag,
+            "Last-Modified": formatdate(entry.last_modified, usegmt=True),
+            "Cache-Control": CACHE_CONTROL,
+            "X-Cache": outcome,
+        }
+        if self._not_modified(request, entry):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(entry.body, media_type="application/json", headers=headers)
+
+    async def invalidate(self, *tags: str) -> None:
+        """Call after the commit. Never fails the request: the TTL bounds the damage of a lost invalidation."""
+        await self._safely(self.backend.invalidate(list(tags)))
+
+    def on_event(self, topic: str, event: dict) -> None:
+        if isinstance(self.backend, MemoryBackend) and event.get("origin") != _ORIGIN:
+            self.backend.bump(event["tags"])
+
+    def _render(self, model: Any, data: Any) -> CachedResponse:
+        adapter = self._adapters.get(model)
+        if adapter is None:
+            adapter = self._adapters[model] = TypeAdapter(model)
+        body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+        # Strong validator: the same bytes always get the same tag, on every worker
+        return CachedResponse(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"', last_modified=time.time())
+
+    @staticmethod
+    def _not_modified(request: Request, entry: CachedResponse) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            # When both are sent the ETag decides (RFC 9110 13.1.3). Weak comparison, as that section asks.
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or entry.etag in tags
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return int(entry.last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    async def _safely(self, operation: Awaitable) -> Any:
+        try:
+            return await operation
+        except Exception:
+            self.errors += 1
+            logger.exception("Response cache backend failed")
+            return None
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "enabled": config.RESPONSE_CACHE_ENABLED,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "not_modified": self.not_modified,
+            "errors": self.errors,
+            **self.backend.stats(),
+        }
+
+cache = ResponseCache()
+events.bus.add_listener(TOPIC, cache.on_event)
+metrics.register("response_cache", cache.stats)
+
+def configure_backend() -> None:
+    """Pick the backend named by RESPONSE_CACHE_BACKEND. Called from the app lifespan."""
+    if config.RESPONSE_CACHE_BACKEND == "memory":
+        return
+    if config.RESPONSE_CACHE_BACKEND != "redis":
+        raise RuntimeError(f"Unknown RESPONSE_CACHE_BACKEND: {config.RESPONSE_CACHE_BACKEND}")
+    cache.set_backend(RedisBackend(config.RESPONSE_CACHE_REDIS_URL))
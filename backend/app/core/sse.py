@@ -0,0 +1,14 @@
+"""Server-Sent Events helpers shared by the streaming endpoints (doctor feed, chat answers)."""
+import json
+from typing import AsyncIterator
+from fastapi.responses import StreamingResponse
+
+# A comment line: keeps idle proxies from closing the connection, ignored by EventSource
+PING = ": ping\n\n"
+
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def stream(body: AsyncIterator[str]) -> StreamingResponse:
+    # no-cache, and no proxy buffering (nginx), or the events arrive in one lump at the end
+    return StreamingResponse(body, media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
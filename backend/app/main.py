@@ -1,20 +1,67 @@
+import time
+_BOOT_STARTED = time.perf_counter()
+
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.database import engine, Base
+from sqlalchemy import text
+
+# 0. Logging first, so module-level log calls below go through the queue handler
+from app.core.logging_config import setup_logging, RequestLogMiddleware, DB_STATS_HEADER_NAMES
+setup_logging()
+
+from app.core import config, events, metrics as app_metrics, response_cache
+from app.core.database import engine, async_engine
 
 # 1. Import API Routers (The Logic)
 from app.api.v1 import auth, chat, doctors, appointments, admin, content, subscription, reviews
 
 # 2. Import Models (The Database) - ALIASING 'content' TO AVOID CONFLICT
-from app.models import user, doctor, appointment, audit, review
+from app.models import user, doctor, appointment, audit, review, stats
 from app.models import content as content_model 
+from app.models import chat as chat_model
+
+from app.api.v1 import auth, chat, doctors, appointments, admin, content, subscription, reviews, media, metrics # <--- Added media
+
+logger = logging.getLogger(__name__)
+
+# Schema is managed by `python migrate.py` (see app/migrations); nothing is created or reflected here.
+startup_report = {"import_ms": round((time.perf_counter() - _BOOT_STARTED) * 1000, 1)}
+app_metrics.register("startup", lambda: startup_report)
 
-from app.api.v1 import auth, chat, doctors, appointments, admin, content, subscription, reviews, media # <--- Added media
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    phase = time.perf_counter()
+    if config.DB_AUTO_MIGRATE:
+        from app.core.migrations import run_migrations
+        await run_in_threadpool(run_migrations, engine)
+        startup_report["migrate_ms"] = round((time.perf_counter() - phase) * 1000, 1)
+        phase = time.perf_counter()
 
-# Create Database Tables
-Base.metadata.create_all(bind=engine)
+    # Open the first pooled connection now rather than on the first user request
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    startup_report["first_db_connection_ms"] = round((time.perf_counter() - phase) * 1000, 1)
+    startup_report["total_ms"] = round((time.perf_counter() - _BOOT_STARTED) * 1000, 1)
+    logger.info("Startup timing: %s", startup_report, extra={"startup": startup_report})
 
-app = FastAPI(title="MDQplus API")
+    events.configure_broker()
+    await events.bus.start()
+    response_cache.configure_backend()
+
+    yield
+
+    await events.bus.stop()
+    await async_engine.dispose()
+    engine.dispose()
+
+_routers_started = time.perf_counter()
+app = FastAPI(title="MDQplus API", lifespan=lifespan)
+
+# --- REQUEST TRACING ---
+app.add_middleware(RequestLogMiddleware)
 
 # --- CORS CONFIGURATION ---
 app.add_middleware(
@@ -23,6 +70,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Cache", *DB_STATS_HEADER_NAMES], # pagination token, cache validators and dev query stats, readable by browser clients
 )
 
 # --- ROUTER REGISTRATION ---
@@ -35,6 +83,9 @@ app.include_router(content.router, prefix="/api/v1/content", tags=["Content"])
 app.include_router(subscription.router, prefix="/api/v1/subscription", tags=["Subscription"])
 app.include_router(reviews.router, prefix="/api/v1/reviews", tags=["Reviews"])
 app.include_router(media.router, prefix="/api/v1/media", tags=["Media Upload"])
+app.include_router(metrics.router, prefix="/api/v1/metrics", tags=["Metrics"])
+startup_report["router_registration_ms"] = round((time.perf_counter() - _routers_started) * 1000, 1)
+
 @app.get("/")
 def root():
-    return {"message": "MedIQ Brain is Online"}
\ No newline at end of file
+    return {"message": "MedIQ Brain is Online"}
@@ -0,0 +1,103 @@
+"""Baseline schema: the tables that main.py used to create at import time."""
+from sqlalchemy import MetaData, Table, Column, Integer, String, Boolean, Date, DateTime, Float, Text, ForeignKey
+
+# Frozen copy of the models as they were when this migration shipped. Never import app.models here:
+# later model changes belong in later migrations, and must not change what this one creates.
+metadata = MetaData()
+
+users = Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("first_name", String, index=True),
+    Column("last_name", String, index=True),
+    Column("email", String, unique=True, index=True),
+    Column("hashed_password", String),
+    Column("dob", Date),
+    Column("location", String),
+    Column("role", String),
+    Column("is_active", Boolean),
+    Column("is_banned", Boolean),
+    Column("plan", String),
+    Column("subscription_expiry", DateTime),
+    Column("daily_chat_count", Integer),
+    Column("last_chat_date", Date),
+    Column("burst_chat_count", Integer),
+    Column("burst_start_time", DateTime),
+)
+
+doctors = Table(
+    "doctors", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id")),
+    Column("full_name", String, index=True),
+    Column("specialty", String, index=True),
+    Column("bio", String),
+    Column("image_url", String),
+    Column("hourly_rate", Float),
+    Column("rating", Float),
+    Column("review_count", Integer),
+    Column("years_experience", Integer),
+    Column("is_available", Boolean),
+    Column("license_number", String, unique=True, index=True),
+    Column("is_verified", Boolean),
+    Column("documents_url", String),
+)
+
+doctor_slots = Table(
+    "doctor_slots", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("doctor_id", Integer, ForeignKey("doctors.id")),
+    Column("start_time", DateTime, index=True),
+    Column("is_booked", Boolean),
+)
+
+appointments = Table(
+    "appointments", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("patient_id", Integer, ForeignKey("users.id")),
+    Column("doctor_id", Integer, ForeignKey("doctors.id")),
+    Column("slot_id", Integer, ForeignKey("doctor_slots.id"), unique=True),
+    Column("start_time", DateTime),
+    Column("status", String),
+    Column("payment_status", String),
+    Column("notes", String),
+    Column("related_appointment_id", Integer),
+    Column("amount", Float),
+    Column("commission", Float),
+    Column("payout", Float),
+)
+
+reviews = Table(
+    "reviews", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("appointment_id", Integer, ForeignKey("appointments.id"), unique=True),
+    Column("doctor_id", Integer, ForeignKey("doctors.id")),
+    Column("patient_id", Integer, ForeignKey("users.id")),
+    Column("rating", Integer),
+    Column("comment", String),
+    Column("created_at", DateTime),
+)
+
+health_tips = Table(
+    "health_tips", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("title", String, index=True),
+    Column("category", String, index=True),
+    Column("read_time", String),
+    Column("image_url", String),
+    Column("content", Text),
+    Column("created_at", DateTime),
+)
+
+audit_logs = Table(
+    "audit_logs", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("admin_id", Integer, ForeignKey("users.id")),
+    Column("resource", String),
+    Column("reason", String),
+    Column("timestamp", DateTime),
+)
+
+def upgrade(conn):
+    # checkfirst: existing deployments already have these tables from create_all()
+    metadata.create_all(conn, checkfirst=True)
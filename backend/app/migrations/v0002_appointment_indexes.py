@@ -0,0 +1,42 @@
+"""Composite and partial indexes for the appointment and slot hot queries."""
+from sqlalchemy import MetaData, Table, Column, Integer, String, Boolean, DateTime, Index
+from app.core.migrations import create_index
+
+# CREATE INDEX CONCURRENTLY can't run inside a transaction, and it keeps bookings writable
+# while a large appointments table is indexed.
+TRANSACTIONAL = False
+
+# Just the columns the indexes need, as they were when this migration shipped
+metadata = MetaData()
+appointments = Table(
+    "appointments", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("patient_id", Integer),
+    Column("doctor_id", Integer),
+    Column("slot_id", Integer),
+    Column("start_time", DateTime),
+    Column("status", String),
+    Column("payment_status", String),
+)
+doctor_slots = Table(
+    "doctor_slots", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("doctor_id", Integer),
+    Column("start_time", DateTime),
+    Column("is_booked", Boolean),
+)
+
+a, s = appointments.c, doctor_slots.c
+general_queue = a.doctor_id.is_(None) & a.slot_id.is_(None) & (a.status == "pending") & (a.payment_status == "paid")
+
+INDEXES = [
+    Index("ix_appointments_doctor_status_payment", a.doctor_id, a.status, a.payment_status),
+    Index("ix_appointments_general_queue", a.start_time, a.id, postgresql_where=general_queue, sqlite_where=general_queue),
+    Index("ix_appointments_patient_id", a.patient_id),
+    Index("ix_doctor_slots_open_by_doctor", s.doctor_id, s.start_time,
+          postgresql_where=(s.is_booked == False), sqlite_where=(s.is_booked == False)),
+]
+
+def upgrade(conn):
+    for index in INDEXES:
+        create_index(conn, index, concurrently=True)
@@ -0,0 +1,53 @@
+"""Doctor earnings totals and daily buckets, plus appointments.paid_at to bucket by."""
+from sqlalchemy import MetaData, Table, Column, Integer, Float, Date, DateTime, ForeignKey
+from app.core.migrations import add_column
+
+# The tables as they shipped (doctors only as the foreign key target); the fill is frozen SQL
+metadata = MetaData()
+Table("doctors", metadata, Column("id", Integer, primary_key=True))
+doctor_stats = Table(
+    "doctor_stats", metadata,
+    Column("doctor_id", Integer, ForeignKey("doctors.id"), primary_key=True),
+    Column("earnings", Float, nullable=False),
+    Column("paid_appointments", Integer, nullable=False),
+    Column("completed_appointments", Integer, nullable=False),
+)
+doctor_earnings_daily = Table(
+    "doctor_earnings_daily", metadata,
+    Column("doctor_id", Integer, ForeignKey("doctors.id"), primary_key=True),
+    Column("day", Date, primary_key=True),
+    Column("earnings", Float, nullable=False),
+    Column("paid_appointments", Integer, nullable=False),
+)
+
+# When older appointments were paid was never recorded; their booking time is the closest we have
+BACKFILL_PAID_AT = """
+UPDATE appointments SET paid_at = coalesce(start_time, CURRENT_TIMESTAMP)
+WHERE payment_status = 'paid' AND paid_at IS NULL
+"""
+
+FILL_TOTALS = """
+INSERT INTO doctor_stats (doctor_id, earnings, paid_appointments, completed_appointments)
+SELECT doctor_id,
+    coalesce(sum(CASE WHEN payment_status = 'paid' THEN payout ELSE 0.0 END), 0.0),
+    count(CASE WHEN payment_status = 'paid' THEN 1 END),
+    count(CASE WHEN status = 'completed' THEN 1 END)
+FROM appointments WHERE doctor_id IS NOT NULL GROUP BY doctor_id
+"""
+
+# date() gives a date on PostgreSQL and 'YYYY-MM-DD' (how SQLAlchemy stores Date) on SQLite
+FILL_DAYS = """
+INSERT INTO doctor_earnings_daily (doctor_id, day, earnings, paid_appointments)
+SELECT doctor_id, date(coalesce(paid_at, start_time)), coalesce(sum(payout), 0.0), count(*)
+FROM appointments WHERE doctor_id IS NOT NULL AND payment_status = 'paid'
+GROUP BY doctor_id, date(coalesce(paid_at, start_time))
+"""
+
+def upgrade(conn):
+    add_column(conn, "appointments", Column("paid_at", DateTime, nullable=True))
+    conn.exec_driver_sql(BACKFILL_PAID_AT)
+    doctor_stats.create(conn, checkfirst=True)
+    doctor_earnings_daily.create(conn, checkfirst=True)
+    for table, fill in (("doctor_stats", FILL_TOTALS), ("doctor_earnings_daily", FILL_DAYS)):
+        conn.exec_driver_sql(f"DELETE FROM {table}")
+        conn.exec_driver_sql(fill)
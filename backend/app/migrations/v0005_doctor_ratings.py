@@ -0,0 +1,41 @@
+"""Running rating sum and Bayesian ranking score on doctors, filled from the reviews."""
+from sqlalchemy import MetaData, Table, Column, Integer, Float, Boolean, Index, text
+from app.core import config
+from app.core.migrations import add_column, create_index
+
+# The new columns and index as they shipped; the fill is frozen SQL, not app/services/doctor_ratings.py
+metadata = MetaData()
+doctors = Table(
+    "doctors", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("is_verified", Boolean),
+    Column("rating_sum", Integer, nullable=False, server_default="0"),
+    # A doctor inserted without it (outside the ORM) starts at the prior mean, like one inserted by the app
+    Column("ranking_score", Float, nullable=False, server_default=str(config.RANKING_PRIOR_MEAN)),
+)
+VERIFIED_RANKING = Index("ix_doctors_verified_ranking", doctors.c.ranking_score.desc(), doctors.c.id,
+                         postgresql_where=(doctors.c.is_verified == True), sqlite_where=(doctors.c.is_verified == True))
+
+# 5.0 is what a doctor shows before their first review. The ranking score is the Bayesian average
+# (prior_weight * prior_mean + sum) / (prior_weight + count), with the prior from config.
+RESET = "UPDATE doctors SET rating_sum = 0, review_count = 0, rating = 5.0, ranking_score = :prior_mean"
+FILL = """
+UPDATE doctors SET
+    rating_sum = totals.rating_sum,
+    review_count = totals.review_count,
+    rating = round(CAST(totals.rating_sum * 1.0 / totals.review_count AS NUMERIC), 1),
+    ranking_score = (:prior_total + totals.rating_sum) / (:prior_weight + totals.review_count)
+FROM (
+    SELECT doctor_id, sum(rating) AS rating_sum, count(*) AS review_count
+    FROM reviews WHERE doctor_id IS NOT NULL GROUP BY doctor_id
+) AS totals
+WHERE doctors.id = totals.doctor_id
+"""
+
+def upgrade(conn):
+    add_column(conn, "doctors", doctors.c.rating_sum)
+    add_column(conn, "doctors", doctors.c.ranking_score)
+    create_index(conn, VERIFIED_RANKING)
+    prior_mean, prior_weight = config.RANKING_PRIOR_MEAN, config.RANKING_PRIOR_WEIGHT
+    conn.execute(text(RESET), {"prior_mean": prior_mean})
+    conn.execute(text(FILL), {"prior_total": prior_weight * prior_mean, "prior_weight": prior_weight})
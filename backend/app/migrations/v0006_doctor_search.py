@@ -0,0 +1,52 @@
+"""Doctor directory search: full-text index (GIN on PostgreSQL, FTS5 on SQLite) and the specialty listing index."""
+from sqlalchemy import MetaData, Table, Column, Integer, String, Float, Boolean, Index
+from app.core.migrations import create_index
+
+# The columns the indexes need, as they were when this migration shipped
+metadata = MetaData()
+doctors = Table(
+    "doctors", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("specialty", String),
+    Column("is_verified", Boolean),
+    Column("ranking_score", Float),
+)
+d = doctors.c
+
+# Must stay identical to app.models.doctor.SEARCH_DOCUMENT for the planner to use the index
+SEARCH_DOCUMENT = "to_tsvector('simple', coalesce(full_name, '') || ' ' || coalesce(specialty, '') || ' ' || coalesce(bio, ''))"
+
+VERIFIED_SPECIALTY_RANKING = Index("ix_doctors_verified_specialty_ranking", d.specialty, d.ranking_score.desc(), d.id,
+                                   postgresql_where=(d.is_verified == True), sqlite_where=(d.is_verified == True))
+SEARCH = f"CREATE INDEX IF NOT EXISTS ix_doctors_search ON doctors USING gin ({SEARCH_DOCUMENT})"
+
+# External-content FTS5 table: it stores only the index, the text stays in doctors.
+# The update trigger fires on the indexed columns only, so rating updates never touch it.
+SQLITE_FTS = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS doctors_fts USING fts5(
+        full_name, specialty, bio, content='doctors', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS doctors_fts_insert AFTER INSERT ON doctors BEGIN
+        INSERT INTO doctors_fts(rowid, full_name, specialty, bio) VALUES (new.id, new.full_name, new.specialty, new.bio);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS doctors_fts_delete AFTER DELETE ON doctors BEGIN
+        INSERT INTO doctors_fts(doctors_fts, rowid, full_name, specialty, bio) VALUES ('delete', old.id, old.full_name, old.specialty, old.bio);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS doctors_fts_update AFTER UPDATE OF full_name, specialty, bio ON doctors BEGIN
+        INSERT INTO doctors_fts(doctors_fts, rowid, full_name, specialty, bio) VALUES ('delete', old.id, old.full_name, old.specialty, old.bio);
+        INSERT INTO doctors_fts(rowid, full_name, specialty, bio) VALUES (new.id, new.full_name, new.specialty, new.bio);
+    END""",
+    # Index every doctor already there
+    "INSERT INTO doctors_fts(doctors_fts) VALUES ('rebuild')",
+]
+
+def upgrade(conn):
+    # Keyset paging compares sort values, and NULL compares as nothing. The app always writes these.
+    conn.exec_driver_sql("UPDATE doctors SET hourly_rate = 0.0 WHERE hourly_rate IS NULL")
+    conn.exec_driver_sql("UPDATE doctors SET years_experience = 1 WHERE years_experience IS NULL")
+    create_index(conn, VERIFIED_SPECIALTY_RANKING)
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql(SEARCH)
+    if conn.dialect.name == "sqlite":
+        for statement in SQLITE_FTS:
+            conn.exec_driver_sql(statement)
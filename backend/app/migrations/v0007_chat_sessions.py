@@ -0,0 +1,28 @@
+"""Server-side chat conversations: sessions with a rolling summary, and their recent messages."""
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, Text, ForeignKey, Index
+
+# The tables as they shipped (users only as the foreign key target)
+metadata = MetaData()
+Table("users", metadata, Column("id", Integer, primary_key=True))
+chat_sessions = Table(
+    "chat_sessions", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("summary", Text, nullable=True),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    Index("ix_chat_sessions_user_updated", "user_id", "updated_at"),
+)
+chat_messages = Table(
+    "chat_messages", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("session_id", Integer, ForeignKey("chat_sessions.id"), nullable=False),
+    Column("role", String, nullable=False),
+    Column("content", Text, nullable=False),
+    Column("created_at", DateTime),
+    Index("ix_chat_messages_session", "session_id", "id"),
+)
+
+def upgrade(conn):
+    chat_sessions.create(conn, checkfirst=True)
+    chat_messages.create(conn, checkfirst=True)
@@ -1,5 +1,5 @@
 
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Float
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Float, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -13,6 +13,12 @@ class DoctorSlot(Base):
     is_booked = Column(Boolean, default=False)
     doctor = relationship("Doctor", backref="slots")
 
+    __table_args__ = (
+        # A doctor's open slots in time order; booked slots (most of them, eventually) stay out of the index
+        Index("ix_doctor_slots_open_by_doctor", "doctor_id", "start_time",
+              postgresql_where=(is_booked == False), sqlite_where=(is_booked == False)),
+    )
+
 class Appointment(Base):
     __tablename__ = "appointments"
     id = Column(Integer, primary_key=True, index=True)
@@ -27,9 +33,22 @@ class Appointment(Base):
     amount = Column(Float, default=0.0)
     commission = Column(Float, default=0.0)
     payout = Column(Float, default=0.0)
+    paid_at = Column(DateTime, nullable=True) # buckets doctor earnings by day
 
     patient = relationship("User")
     doctor = relationship("Doctor")
     slot = relationship("DoctorSlot", backref="appointment", uselist=False)
     # NEW: Link to review
     review = relationship("Review", back_populates="appointment", uselist=False)
+
+    # Built by app/migrations/v0002_appointment_indexes.py
+    __table_args__ = (
+        # Doctor views: requests, confirmed list, earnings
+        Index("ix_appointments_doctor_status_payment", "doctor_id", "status", "payment_status"),
+        # Patient history (/appointments/my)
+        Index("ix_appointments_patient_id", "patient_id"),
+        # The general consultation queue: only the handful of paid, unclaimed rows, already in claim order
+        Index("ix_appointments_general_queue", "start_time", "id",
+              postgresql_where=(doctor_id.is_(None) & slot_id.is_(None) & (status == "pending") & (payment_status == "paid")),
+              sqlite_where=(doctor_id.is_(None) & slot_id.is_(None) & (status == "pending") & (payment_status == "paid"))),
+    )
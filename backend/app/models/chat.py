@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
+from datetime import datetime
+from app.core.database import Base
+
+class ChatSession(Base):
+    """
+    One conversation with the triage assistant. Only the last few turns are kept word for word
+    (chat_messages); older ones are folded into `summary` by app/services/chat_sessions.py.
+    """
+    __tablename__ = "chat_sessions"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    summary = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # "My conversations", most recent first
+        Index("ix_chat_sessions_user_updated", "user_id", "updated_at"),
+    )
+
+class ChatMessage(Base):
+    __tablename__ = "chat_messages"
+    id = Column(Integer, primary_key=True)
+    session_id = Column(Integer, ForeignKey("chat_sessions.id"), nullable=False)
+    role = Column(String, nullable=False) # 'user' or 'model'
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_chat_messages_session", "session_id", "id"),
+    )
@@ -1,8 +1,14 @@
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
+from app.core import config
 from app.core.database import Base
 
+# What free-text search matches on PostgreSQL. The query must repeat this expression verbatim for the
+# planner to use ix_doctors_search, and so must the copy in app/migrations/v0006_doctor_search.py that built it
+# (SQLite uses the doctors_fts table instead, see app/services/doctor_search.py)
+SEARCH_DOCUMENT = "to_tsvector('simple', coalesce(full_name, '') || ' ' || coalesce(specialty, '') || ' ' || coalesce(bio, ''))"
+
 class Doctor(Base):
     __tablename__ = "doctors"
 
@@ -17,6 +23,10 @@ class Doctor(Base):
     hourly_rate = Column(Float, default=0.0)
     rating = Column(Float, default=5.0)
     review_count = Column(Integer, default=0)
+    # Maintained with review_count by app/services/doctor_ratings.py; rating is their rounded average
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bayesian average. Unreviewed doctors start at the prior mean, however the row is inserted
+    ranking_score = Column(Float, nullable=False, default=config.RANKING_PRIOR_MEAN, server_default=str(config.RANKING_PRIOR_MEAN))
     years_experience = Column(Integer, default=1) # <--- NEW FIELD
     
     is_available = Column(Boolean, default=False)
@@ -25,3 +35,13 @@ class Doctor(Base):
     documents_url = Column(String, nullable=True) 
 
     user = relationship("User")
+
+    __table_args__ = (
+        # Doctor listings, best first (shipped by app/migrations/v0005_doctor_ratings.py)
+        Index("ix_doctors_verified_ranking", ranking_score.desc(), id,
+              postgresql_where=(is_verified == True), sqlite_where=(is_verified == True)),
+        # Directory search filtered by specialty (shipped by app/migrations/v0006_doctor_search.py)
+        Index("ix_doctors_verified_specialty_ranking", specialty, ranking_score.desc(), id,
+              postgresql_where=(is_verified == True), sqlite_where=(is_verified == True)),
+        Index("ix_doctors_search", text(SEARCH_DOCUMENT), postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, Float, Date, ForeignKey
+from app.core.database import Base
+
+class PlatformStats(Base):
+    """
+    Running totals behind the admin dashboard, kept current by app/services/platform_stats.py.
+    Spread over a few shard rows so concurrent bookings and payments don't all queue on one row lock;
+    the dashboard sums them.
+    """
+    __tablename__ = "platform_stats"
+    shard = Column(Integer, primary_key=True, autoincrement=False)
+    total_users = Column(Integer, nullable=False, default=0)
+    total_doctors = Column(Integer, nullable=False, default=0)
+    pending_verifications = Column(Integer, nullable=False, default=0)
+    total_revenue = Column(Float, nullable=False, default=0.0)
+    active_appointments = Column(Integer, nullable=False, default=0)
+
+class DoctorStats(Base):
+    """A doctor's running totals (app/services/doctor_stats.py), so the dashboard doesn't rescan their history."""
+    __tablename__ = "doctor_stats"
+    doctor_id = Column(Integer, ForeignKey("doctors.id"), primary_key=True)
+    earnings = Column(Float, nullable=False, default=0.0) # payout of paid appointments
+    paid_appointments = Column(Integer, nullable=False, default=0)
+    completed_appointments = Column(Integer, nullable=False, default=0)
+
+class DoctorEarningsDay(Base):
+    """Earnings per doctor per UTC day of payment. Weekly and monthly views add these up."""
+    __tablename__ = "doctor_earnings_daily"
+    doctor_id = Column(Integer, ForeignKey("doctors.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    earnings = Column(Float, nullable=False, default=0.0)
+    paid_appointments = Column(Integer, nullable=False, default=0)
@@ -23,7 +23,7 @@ class AppointmentResponse(BaseModel):
     doctor_name: str
     status: str
     payment_status: str
-    start_time: datetime
+    start_time: Optional[datetime] = None # None only for rows written without a time
     notes: Optional[str] = None
     amount: float = 0.0
     has_review: bool = False # <--- NEW FIELD
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, Optional, Sequence, Tuple
+from fastapi.concurrency import run_in_threadpool
+
+Turn = Tuple[str, str] # (role, text), role 'user' or 'model', oldest first
+
+class AIProvider(ABC):
+    """
+    Anything that can turn a prompt into text. Keeps SDK imports out of module import time.
+    `history` is the conversation before `prompt`; `system` is the standing instruction, which providers
+    pass as a system instruction of the model instead of as text of the conversation.
+    """
+    name = "base"
+
+    @abstractmethod
+    async def generate(self, prompt: str, history: Sequence[Turn] = (), system: Optional[str] = None) -> str:
+        """The whole answer."""
+
+    async def stream(self, prompt: str, history: Sequence[Turn] = (), system: Optional[str] = None) -> AsyncIterator[str]:
+        """Text chunks as the model writes them. Providers that can't stream yield the whole answer once."""
+        yield await self.generate(prompt, history, system)
+
+class GeminiProvider(AIProvider):
+    def __init__(self, api_key: str, model_name: str = "gemini-2.0-flash"):
+        self.name = f"gemini/{model_name}"
+        self.api_key = api_key
+        self.model_name = model_name
+        self._models: Dict[Optional[str], object] = {} # system instruction -> GenerativeModel
+        self._lock = threading.Lock()
+
+    def _load_model(self, system: Optional[str]):
+        # The SDK drags in gRPC/protobuf (most of our boot time), so import it on first use only
+        with self._lock:
+            if system not in self._models:
+                import google.generativeai as genai
+                genai.configure(api_key=self.api_key)
+                self._models[system] = genai.GenerativeModel(self.model_name, system_instruction=system)
+        return self._models[system]
+
+    async def _get_model(self, system: Optional[str]):
+        model = self._models.get(system)
+        if model is None:
+            # First call pays the SDK import; keep it off the event loop
+            model = await run_in_threadpool(self._load_model, system)
+        return model
+
+    @staticmethod
+    def _contents(prompt: str, history: Sequence[Turn]):
+        if not history:
+            return prompt
+        return [{"role": role, "parts": [text]} for role, text in history] + [{"role": "user", "parts": [prompt]}]
+
+    async def generate(self, prompt: str, history: Sequence[Turn] = (), system: Optional[str] = None) -> str:
+        model = await self._get_model(system)
+        response = await model.generate_content_async(self._contents(prompt, history))
+        return response.text
+
+    async def stream(self, prompt: str, history: Sequence[Turn] = (), system: Optional[str] = None) -> AsyncIterator[str]:
+        model = await self._get_model(system)
+        response = await model.generate_content_async(self._contents(prompt, history), stream=True)
+        async for chunk in response:
+            if chunk.parts: # the closing chunk can carry only the finish reason
+                yield chunk.text
+
+class OpenAICompatibleProvider(AIProvider):
+    """Chat Completions API: OpenAI itself, or anything speaking it (Azure, OpenRouter, vLLM, Ollama) via base_url."""
+
+    def __init__(self, api_key: str, model_name: str = "gpt-4o-mini", base_url: Optional[str] = None):
+        self.name = f"openai/{model_name}"
+        self.api_key = api_key
+        self.model_name = model_name
+        self.base_url = base_url
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _load_client(self):
+        with self._lock:
+            if self._client is None:
+                from openai import AsyncOpenAI
+                # Retries and timeouts are ai_resilience's job; the SDK's own would stack on top of them
+                self._client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+        return self._client
+
+    async def _get_client(self):
+        return self._client or await run_in_threadpool(self._load_client)
+
+    @staticmethod
+    def _messages(prompt: str, history: Sequence[Turn], system: Optional[str]) -> list:
+        messages = [{"role": "system", "content": system}] if system else []
+        messages += [{"role": "assistant" if role == "model" else "user", "content": text} for role, text in history]
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    async def generate(self, prompt: str, history: Sequence[Turn] = (), system: Optional[str] = None) -> str:
+        client = await self._get_client()
+        response = await client.chat.completions.create(model=self.model_name, messages=self._messages(prompt, history, system))
+        return response.choices[0].message.content or ""
+
+    async def stream(self, prompt: str, history: Sequence[Turn] = (), system: Optional[str] = None) -> AsyncIterator[str]:
+        client = await self._get_client()
+        response = await client.chat.completions.create(model=self.model_name, messages=self._messages(prompt, history, system), stream=True)
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+STUB_ANSWER = (
+    "This is the local stub assistant, not a real assessment. **Likely Causes:** Unknown. "
+    "**Recommended Action:** See Doctor. **Immediate Relief:** Rest and stay hydrated."
+)
+
+class StubProvider(AIProvider):
+    """Canned answer after a fixed delay: local development and demos without any API key."""
+
+    def __init__(self, latency_ms: float = 300.0):
+        self.name = "stub"
+        self.latency_ms = latency_ms
+
+    async def generate(self, prompt: str, history: Sequence[Turn] = (), system: Optional[str] = None) -> str:
+        await asyncio.sleep(self.latency_ms / 1000)
+        return STUB_ANSWER
+
+    async def stream(self, prompt: str, history: Sequence[Turn] = (), system: Optional[str] = None) -> AsyncIterator[str]:
+        words = STUB_ANSWER.split(" ")
+        for i, word in enumerate(words):
+            await asyncio.sleep(self.latency_ms / 1000 / len(words))
+            yield word if i == len(words) - 1 else word + " "
+
+_override: Optional[AIProvider] = None
+
+def set_provider(provider: Optional[AIProvider]) -> None:
+    """Send every chat to this provider, bypassing the router's configured ones (benchmarks, local stubs). None undoes it."""
+    global _override
+    _override = provider
+
+def get_override() -> Optional[AIProvider]:
+    return _override
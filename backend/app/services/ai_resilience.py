@@ -0,0 +1,321 @@
+"""
+Timeouts, retries, hedging and a circuit breaker around an AI provider.
+
+wrap(provider) returns a ResilientProvider with the same interface, so callers don't change:
+- every call has a deadline (AI_DEADLINE_SECONDS) and each attempt a timeout (AI_TIMEOUT_SECONDS),
+  so a slow region can't hold a request forever;
+- rate limits, 5xx and timeouts are retried with full-jitter backoff, while the deadline allows;
+- with AI_HEDGE_ENABLED, an answer still missing after the recent p95 gets a second, identical call
+  and the first to finish wins (within AI_HEDGE_BUDGET of the calls);
+- AI_BREAKER_FAILURES failed calls in a row open the breaker: calls fail at once with CircuitOpenError
+  for AI_BREAKER_COOLDOWN_SECONDS, then a single trial call closes it again or keeps it open.
+Errors the provider answers with on purpose (bad request, blocked content) are neither retried nor
+held against it.
+
+A stream is retried only until its first chunk: after that, part of the answer is already out.
+"""
+import asyncio
+import random
+import time
+import weakref
+from collections import Counter, deque
+from typing import AsyncIterator, Optional, Sequence
+from app.core import config, metrics
+from app.services.ai_providers import AIProvider, Turn
+
+class CircuitOpenError(RuntimeError):
+    """The provider failed too often recently; the call was not attempted."""
+
+# Exception class names of the SDKs (google.api_core, openai, httpx, grpc) that mean "try again"
+_RETRYABLE_NAMES = {
+    "ServiceUnavailable", "TooManyRequests", "ResourceExhausted", "InternalServerError", "DeadlineExceeded",
+    "GatewayTimeout", "BadGateway", "Aborted", "ConnectError", "ConnectTimeout", "ReadTimeout", "ReadError",
+    "RemoteProtocolError", "PoolTimeout", "APIConnectionError", "APITimeoutError",
+}
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    response = getattr(error, "response", None)
+    code = getattr(error, "code", None)
+    if not isinstance(code, int):
+        code = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if isinstance(code, int):
+        return code == 429 or code >= 500
+    return type(error).__name__ in _RETRYABLE_NAMES
+
+def backoff(attempt: int) -> float:
+    """Seconds before retry number attempt+1: full jitter, so retries of many requests don't arrive together."""
+    cap = min(config.AI_RETRY_MAX_MS, config.AI_RETRY_BASE_MS * 2 ** attempt)
+    return random.uniform(0, cap) / 1000
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failures: int, cooldown: float):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self._trial_running = False
+
+    def before_call(self) -> None:
+        """Raises CircuitOpenError unless a call may go out now."""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.cooldown:
+                raise CircuitOpenError("AI provider circuit is open")
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self._trial_running:
+                raise CircuitOpenError("AI provider circuit is half-open, trial call running")
+            self._trial_running = True
+
+    def succeeded(self) -> None:
+        self.consecutive_failures = 0
+        self.state = self.CLOSED
+        self._trial_running = False
+
+    def failed(self) -> None:
+        self.consecutive_failures += 1
+        self._trial_running = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failures:
+            if self.state != self.OPEN:
+                self.opens += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def abandoned(self) -> None:
+        """The call ended without a verdict (the client left): let the next one be the trial."""
+        self._trial_running = False
+
+class LatencyWindow:
+    """The last few latencies, for a p95 that follows the provider's current mood (the histograms never forget)."""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._cached: Optional[float] = None
+        self._cached_q: Optional[float] = None
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self._cached = None
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> float:
+        if self._cached is None or self._cached_q != q:
+            ordered = sorted(self._samples)
+            self._cached = ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+            self._cached_q = q
+        return self._cached
+
+# Model calls take seconds, not milliseconds
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0, 45.0)
+
+class ResilientProvider(AIProvider):
+    def __init__(self, inner: AIProvider):
+        self.inner = inner
+        self.name = inner.name
+        self.breaker = CircuitBreaker(config.AI_BREAKER_FAILURES, config.AI_BREAKER_COOLDOWN_SECONDS)
+        self.latency = metrics.Histogram(LATENCY_BUCKETS) # successful generate(), hedges included
+        self.first_chunk = metrics.Histogram(LATENCY_BUCKETS) # successful stream(), until the first chunk
+        self.recent = LatencyWindow()
+        self.counts = Counter()
+        self.errors = Counter() # exception class -> attempts that raised it
+
+    # --- bookkeeping ---
+
+    def _attempt_failed(self, error: BaseException) -> bool:
+        """Counts a failed attempt; True if it may be retried."""
+        self.errors[type(error).__name__] += 1
+        if isinstance(error, TimeoutError):
+            self.counts["timeouts"] += 1
+        return is_retryable(error)
+
+    def _call_failed(self, retryable: bool) -> None:
+        self.counts["failed"] += 1
+        if retryable:
+            self.breaker.failed()
+        else:
+            # The provider is up, it just said no
+            self.breaker.succeeded()
+
+    def _timeout(self, deadline: float) -> float:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("AI call deadline exceeded")
+        return min(config.AI_TIMEOUT_SECONDS, remaining)
+
+    async def _retry_pause(self, attempt: int, deadline: float) -> bool:
+        """Sleeps before the next attempt; False if there is no time or permission left for one."""
+        if attempt >= config.AI_MAX_RETRIES:
+            return False
+        delay = backoff(attempt)
+        if time.monotonic() + delay >= deadline:
+            return False
+        self.counts["retries"] += 1
+        await asyncio.sleep(delay)
+        # Other calls may have opened the breaker meanwhile; stop adding load then
+        return self.breaker.state != CircuitBreaker.OPEN
+
+    # --- hedging ---
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not config.AI_HEDGE_ENABLED or len(self.recent) < config.AI_HEDGE_MIN_SAMPLES:
+            return None
+        if self.counts["hedged"] >= config.AI_HEDGE_BUDGET * max(1, self.counts["calls"]):
+            return None
+        return self.recent.quantile(config.AI_HEDGE_QUANTILE)
+
+    async def _hedged(self, call, delay: float):
+        tasks = [asyncio.ensure_future(call())]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.counts["hedged"] += 1
+                tasks.append(asyncio.ensure_future(call()))
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            self.counts["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # The loser, or both when the attempt timed out
+            for task in tasks:
+                task.cancel()
+
+    # --- calls ---
+
+    def _deadline(self, deadline: Optional[float]) -> float:
+        own = time.monotonic() + config.AI_DEADLINE_SECONDS
+        return own if deadline is None else min(own, deadline)
+
+    async def generate(self, prompt: str, history: Sequence[Turn] = (), system: Optional[str] = None, *,
+                       deadline: Optional[float] = None) -> str:
+        """deadline: time.monotonic() by which to give up, if sooner than AI_DEADLINE_SECONDS (the router splits its own)."""
+        self.counts["calls"] += 1
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.counts["rejected"] += 1
+            raise
+        call = lambda: self.inner.generate(prompt, history, system)
+        deadline = self._deadline(deadline)
+        started = time.monotonic()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    timeout = self._timeout(deadline)
+                    delay = self._hedge_delay()
+                    attempt_call = (lambda: self._hedged(call, delay)) if delay is not None and delay < timeout else call
+                    result = await asyncio.wait_for(attempt_call(), timeout)
+                    break
+                except Exception as e:
+                    retryable = self._attempt_failed(e)
+                    if not (retryable and await self._retry_pause(attempt, deadline)):
+                        self._call_failed(retryable)
+                        raise
+                    attempt += 1
+        except asyncio.CancelledError:
+            self.breaker.abandoned()
+            raise
+        elapsed = time.monotonic() - started
+        self.breaker.succeeded()
+        self.counts["succeeded"] += 1
+        self.latency.observe(elapsed)
+        self.recent.add(elapsed)
+        return result
+
+    async def stream(self, prompt: str, history: Sequence[Turn] = (), system: Optional[str] = None, *,
+                     deadline: Optional[float] = None) -> AsyncIterator[str]:
+        self.counts["calls"] += 1
+        self.counts["streams"] += 1
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.counts["rejected"] += 1
+            raise
+        deadline = self._deadline(deadline)
+        attempt = 0
+        chunks = None
+        verdict = False
+        try:
+            # Until the first chunk: retry like generate()
+            while True:
+                started = time.monotonic()
+                chunks = self.inner.stream(prompt, history, system).__aiter__()
+                try:
+                    first = await asyncio.wait_for(chunks.__anext__(), self._timeout(deadline))
+                    break
+                except StopAsyncIteration:
+                    first = None
+                    break
+                except Exception as e:
+                    await chunks.aclose()
+                    retryable = self._attempt_failed(e)
+                    if not (retryable and await self._retry_pause(attempt, deadline)):
+                        self._call_failed(retryable)
+                        verdict = True
+                        raise
+                    attempt += 1
+            self.first_chunk.observe(time.monotonic() - started)
+
+            # The rest: no retries, but no chunk may be late and the deadline still holds
+            if first is not None:
+                yield first
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("AI stream deadline exceeded")
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), min(config.AI_STREAM_IDLE_SECONDS, remaining))
+                    except StopAsyncIteration:
+                        break
+                    yield chunk
+        except (Exception, asyncio.CancelledError, GeneratorExit) as e:
+            if not verdict:
+                if isinstance(e, Exception):
+                    self._call_failed(self._attempt_failed(e))
+                else:
+                    self.breaker.abandoned() # consumer went away mid-answer
+            raise
+        finally:
+            if chunks is not None:
+                await chunks.aclose()
+        self.breaker.succeeded()
+        self.counts["succeeded"] += 1
+
+    def stats(self) -> dict:
+        return {
+            "provider": self.name,
+            "circuit": self.breaker.state,
+            "circuit_opens": self.breaker.opens,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            **{key: self.counts[key] for key in ("calls", "streams", "succeeded", "failed", "rejected", "retries", "timeouts", "hedged", "hedge_wins")},
+            "errors": dict(self.errors),
+            "hedge_after_seconds": round(self._hedge_delay() or 0.0, 3),
+            "latency_seconds": self.latency.snapshot(),
+            "first_chunk_seconds": self.first_chunk.snapshot(),
+        }
+
+# One wrapper (and so one breaker and one set of metrics) per provider object
+_wrapped: "weakref.WeakKeyDictionary[AIProvider, ResilientProvider]" = weakref.WeakKeyDictionary()
+
+def wrap(provider: AIProvider) -> ResilientProvider:
+    if isinstance(provider, ResilientProvider):
+        return provider
+    resilient = _wrapped.get(provider)
+    if resilient is None:
+        resilient = _wrapped[provider] = ResilientProvider(provider)
+    return resilient
+
+metrics.register("ai_providers", lambda: {w.name: w.stats() for w in list(_wrapped.values())})
@@ -0,0 +1,276 @@
+"""
+Picks the model that answers a triage chat.
+
+Each provider in AI_PROVIDERS with credentials contributes one route (provider + model) per plan tier:
+free users go to the small models, premium users to the large ones first and the small ones after.
+Within a tier the routes are ranked per call:
+- routes whose circuit is open (ai_resilience) go last, and so do routes whose provider is at
+  AI_PROVIDER_MAX_CONCURRENCY calls in flight;
+- then by speed: a moving average of recent latency (whole answers and first chunks kept apart).
+  Routes within AI_ROUTER_LATENCY_SLACK of the fastest count as equally fast, and the cheapest of them wins.
+  A route not measured yet counts as fast, so it gets tried;
+- AI_ROUTER_EXPLORE of the calls take a random healthy route instead, to keep the averages current.
+
+The call goes down the ranking until one route answers, sharing one AI_DEADLINE_SECONDS between them.
+A stream commits to a route at its first chunk; after that a failure ends the answer.
+Each route's model has its own ResilientProvider, so its latency histograms and breaker show up under
+the "ai_providers" metrics; "ai_router" has the ranking, in-flight calls and failovers.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+from app.core import config, metrics
+from app.services import ai_providers, ai_resilience
+from app.services.ai_providers import AIProvider, Turn
+from app.services.ai_resilience import CircuitBreaker, ResilientProvider
+
+logger = logging.getLogger(__name__)
+
+FREE, PREMIUM = "free", "premium"
+
+# USD per million output tokens (list prices), only compared with each other.
+# Models missing here count as the most expensive, so a known cheap route still wins a tie.
+MODEL_COSTS = {
+    "gemini-2.0-flash": 0.4,
+    "gemini-2.5-flash": 2.5,
+    "gemini-2.5-pro": 10.0,
+    "gpt-4o-mini": 0.6,
+    "gpt-4o": 10.0,
+    "stub": 0.0,
+}
+
+# Weight of the newest sample in the latency averages
+_EWMA_ALPHA = 0.2
+
+class NoProviderError(RuntimeError):
+    """No provider is configured (no API keys and no 'stub' in AI_PROVIDERS)."""
+
+@dataclass
+class Route:
+    provider: str # 'gemini' / 'openai' / 'stub': concurrency is limited per provider
+    model: str
+    client: ResilientProvider
+    cost: float
+    latency: Dict[str, float] = field(default_factory=dict) # 'answer' / 'first_chunk' -> moving average, seconds
+    counts: Counter = field(default_factory=Counter)
+
+    @property
+    def name(self) -> str:
+        return self.client.name
+
+    def observe(self, kind: str, seconds: float) -> None:
+        previous = self.latency.get(kind)
+        self.latency[kind] = seconds if previous is None else previous + _EWMA_ALPHA * (seconds - previous)
+
+    def circuit_open(self) -> bool:
+        breaker = self.client.breaker
+        return breaker.state == CircuitBreaker.OPEN and time.monotonic() - breaker.opened_at < breaker.cooldown
+
+def _route(provider: str, model: str, inner: AIProvider) -> Route:
+    return Route(provider=provider, model=model, client=ai_resilience.wrap(inner), cost=MODEL_COSTS.get(model, max(MODEL_COSTS.values())))
+
+def _build_tiers() -> Dict[str, List[List[Route]]]:
+    """tier -> groups of routes, tried group by group (a premium chat only falls back to free models when all premium ones failed)."""
+    free, premium = [], []
+    for name in config.AI_PROVIDERS:
+        if name == "gemini" and config.GEMINI_API_KEY:
+            free.append(_route(name, config.GEMINI_MODEL_FREE, ai_providers.GeminiProvider(config.GEMINI_API_KEY, config.GEMINI_MODEL_FREE)))
+            premium.append(_route(name, config.GEMINI_MODEL_PREMIUM, ai_providers.GeminiProvider(config.GEMINI_API_KEY, config.GEMINI_MODEL_PREMIUM)))
+        elif name == "openai" and config.OPENAI_API_KEY:
+            for models, model in ((free, config.OPENAI_MODEL_FREE), (premium, config.OPENAI_MODEL_PREMIUM)):
+                models.append(_route(name, model, ai_providers.OpenAICompatibleProvider(config.OPENAI_API_KEY, model, config.OPENAI_BASE_URL)))
+        elif name == "stub":
+            stub = _route(name, "stub", ai_providers.StubProvider(config.AI_STUB_LATENCY_MS))
+            free.append(stub)
+            premium.append(stub)
+        elif name not in ("gemini", "openai"):
+            logger.warning("Unknown AI provider %r in AI_PROVIDERS", name)
+    if not free:
+        return {}
+    return {FREE: [free], PREMIUM: [premium, free]}
+
+def configured() -> bool:
+    """Whether any provider has what it needs. Cheap: builds nothing."""
+    return any(
+        (name == "gemini" and config.GEMINI_API_KEY) or (name == "openai" and config.OPENAI_API_KEY) or name == "stub"
+        for name in config.AI_PROVIDERS
+    )
+
+class Router:
+    def __init__(self):
+        self._tiers: Optional[Dict[str, List[List[Route]]]] = None
+        self._override: Dict[int, Route] = {} # id(provider) -> its route, for ai_providers.set_provider()
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight: Counter = Counter()
+        self.counts = Counter()
+
+    def reset(self) -> None:
+        """Rebuild the routes from config on next use (after changing settings at runtime)."""
+        self._tiers = None
+
+    def _groups(self, tier: str) -> List[List[Route]]:
+        override = ai_providers.get_override()
+        if override is not None:
+            route = self._override.get(id(override))
+            if route is None or route.client.inner is not override:
+                route = self._override[id(override)] = _route(override.name, getattr(override, "model_name", override.name), override)
+            return [[route]]
+        if self._tiers is None:
+            self._tiers = _build_tiers()
+        return self._tiers.get(tier) or self._tiers.get(FREE) or []
+
+    def _saturated(self, route: Route) -> bool:
+        return self._in_flight[route.provider] >= config.AI_PROVIDER_MAX_CONCURRENCY
+
+    def _rank(self, routes: List[Route], kind: str, explore: bool = True) -> List[Route]:
+        usable = [r for r in routes if not r.circuit_open() and not self._saturated(r)]
+        known = [r.latency[kind] for r in usable if kind in r.latency]
+        fast_enough = min(known) * (1 + config.AI_ROUTER_LATENCY_SLACK) if known else 0.0
+
+        def key(route: Route):
+            latency = route.latency.get(kind, 0.0)
+            quick = latency <= fast_enough
+            return (route.circuit_open(), self._saturated(route), not quick, route.cost if quick else latency)
+
+        ranked = sorted(routes, key=key)
+        if explore and len(usable) > 1 and random.random() < config.AI_ROUTER_EXPLORE:
+            self.counts["explored"] += 1
+            first = random.choice(usable)
+            ranked = [first] + [r for r in ranked if r is not first]
+        return ranked
+
+    def plan(self, tier: str, kind: str, explore: bool = True) -> List[Route]:
+        """Every route of the tier, best first."""
+        plan = []
+        for group in self._groups(tier):
+            plan += [route for route in self._rank(group, kind, explore) if route not in plan]
+        return plan
+
+    async def _acquire(self, route: Route, timeout: float) -> None:
+        limit = self._limits.get(route.provider)
+        if limit is None:
+            limit = self._limits[route.provider] = asyncio.Semaphore(config.AI_PROVIDER_MAX_CONCURRENCY)
+        if limit.locked():
+            # Only waits when every route of the tier was full
+            await asyncio.wait_for(limit.acquire(), timeout)
+        else:
+            # No suspension between plan() and here, so concurrent calls see this one in flight
+            await limit.acquire()
+        self._in_flight[route.provider] += 1
+
+    def _release(self, route: Route) -> None:
+        self._in_flight[route.provider] -= 1
+        self._limits[route.provider].release()
+
+    @staticmethod
+    def _share(deadline: float, routes_left: int) -> float:
+        """This route's deadline: an even share of the time left, but at least one attempt's timeout; the last route gets it all."""
+        remaining = deadline - time.monotonic()
+        if routes_left <= 1:
+            return deadline
+        return time.monotonic() + min(remaining, max(remaining / routes_left, config.AI_TIMEOUT_SECONDS))
+
+    def _failed(self, route: Route, error: Exception, more: bool) -> None:
+        route.counts["failed"] += 1
+        if more:
+            self.counts["failovers"] += 1
+            logger.warning("AI route %s failed (%s: %s), trying the next one", route.name, type(error).__name__, error)
+
+    async def generate(self, prompt: str, history: Sequence[Turn] = (), system: Optional[str] = None, tier: str = FREE) -> str:
+        routes = self.plan(tier, "answer")
+        if not routes:
+            raise NoProviderError("No AI provider configured")
+        deadline = time.monotonic() + config.AI_DEADLINE_SECONDS
+        error: Exception = TimeoutError("AI call deadline exceeded")
+        for i, route in enumerate(routes):
+            if time.monotonic() >= deadline:
+                break
+            started = time.monotonic()
+            try:
+                until = self._share(deadline, len(routes) - i)
+                await self._acquire(route, until - time.monotonic())
+                try:
+                    answer = await route.client.generate(prompt, history, system, deadline=until)
+                finally:
+                    self._release(route)
+            except Exception as e:
+                error = e
+                self._failed(route, e, more=i < len(routes) - 1)
+                continue
+            route.observe("answer", time.monotonic() - started)
+            route.counts["answered"] += 1
+            return answer
+        self.counts["exhausted"] += 1
+        raise error
+
+    async def stream(self, prompt: str, history: Sequence[Turn] = (), system: Optional[str] = None, tier: str = FREE) -> AsyncIterator[str]:
+        routes = self.plan(tier, "first_chunk")
+        if not routes:
+            raise NoProviderError("No AI provider configured")
+        deadline = time.monotonic() + config.AI_DEADLINE_SECONDS
+        error: Exception = TimeoutError("AI call deadline exceeded")
+        for i, route in enumerate(routes):
+            if time.monotonic() >= deadline:
+                break
+            started = time.monotonic()
+            until = self._share(deadline, len(routes) - i)
+            try:
+                await self._acquire(route, until - time.monotonic())
+            except Exception as e:
+                error = e
+                self._failed(route, e, more=i < len(routes) - 1)
+                continue
+            chunks = route.client.stream(prompt, history, system, deadline=until).__aiter__()
+            try:
+                try:
+                    first = await chunks.__anext__()
+                except StopAsyncIteration:
+                    first = None
+                except Exception as e:
+                    error = e
+                    self._failed(route, e, more=i < len(routes) - 1)
+                    continue
+                route.observe("first_chunk", time.monotonic() - started)
+                route.counts["answered"] += 1
+                # Committed: part of the answer is out, so from here a failure ends it
+                if first is not None:
+                    yield first
+                    async for chunk in chunks:
+                        yield chunk
+                return
+            finally:
+                await chunks.aclose()
+                self._release(route)
+        self.counts["exhausted"] += 1
+        raise error
+
+    def stats(self) -> dict:
+        tiers = {}
+        for tier in (FREE, PREMIUM):
+            tiers[tier] = [
+                {
+                    "route": route.name,
+                    "cost": route.cost,
+                    "circuit": route.client.breaker.state,
+                    "answer_latency_s": round(route.latency.get("answer", 0.0), 3),
+                    "first_chunk_latency_s": round(route.latency.get("first_chunk", 0.0), 3),
+                    "answered": route.counts["answered"],
+                    "failed": route.counts["failed"],
+                }
+                for route in self.plan(tier, "answer", explore=False)
+            ]
+        return {
+            "routes": tiers,
+            "in_flight": {provider: n for provider, n in self._in_flight.items()},
+            "max_concurrency": config.AI_PROVIDER_MAX_CONCURRENCY,
+            "failovers": self.counts["failovers"],
+            "exhausted": self.counts["exhausted"],
+            "explored": self.counts["explored"],
+        }
+
+router = Router()
+metrics.register("ai_router", router.stats)
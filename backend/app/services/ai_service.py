@@ -1,24 +1,17 @@
-import os
-import google.generativeai as genai
-from dotenv import load_dotenv
+import logging
+from typing import AsyncIterator, Optional, Sequence
+from app.core import config
+from app.services import ai_providers, ai_resilience
+from app.services.ai_router import router, configured, NoProviderError, FREE
+from app.services.triage_cache import cache as triage_cache
 
-# Load environment variables
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-# Configure the SDK
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+if not configured():
+    logger.warning("No AI provider configured: set GEMINI_API_KEY or OPENAI_API_KEY in .env (AI_PROVIDERS=%s).", ",".join(config.AI_PROVIDERS))
 
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-else:
-    print("WARNING: GEMINI_API_KEY not found in .env file.")
-
-# Initialize the model
-# CHANGED: using 'gemini-1.5-flash-latest' which is often more stable for resolution
-# If this still fails, we will switch to 'gemini-pro'
-model = genai.GenerativeModel('gemini-2.0-flash')
-
-# ... (imports and model setup remain the same)
+# The models are built lazily by ai_router/ai_providers on the first chat request,
+# so workers that never serve chat never import the SDKs.
 
 SYSTEM_INSTRUCTION = """
 You are MedIQ, an efficient medical triage assistant. 
@@ -38,24 +31,66 @@ User: "I have a throbbing headache and light sensitivity."
 AI: "That sounds like a migraine. **Recommended Action:** Rest in a dark, quiet room. If it persists for >24 hours, consult a doctor."
 """
 
-# ... (rest of the file remains the same)
+NOT_CONFIGURED_MESSAGE = "System Error: AI Service is not configured properly."
+UNAVAILABLE_MESSAGE = "I'm having trouble connecting to the medical database right now. Please try again in a moment."
+
+class AIServiceError(Exception):
+    """The answer could not be (fully) produced. str(error) is safe to show to the user."""
+
+def _log_failure(e: Exception) -> None:
+    if isinstance(e, ai_resilience.CircuitOpenError):
+        logger.warning("AI provider skipped: %s", e) # no traceback per request while it's down
+    else:
+        # Log the actual error
+        logger.exception("AI provider error: %s", e)
+
+def _error(e: Exception) -> AIServiceError:
+    if isinstance(e, NoProviderError):
+        return AIServiceError(NOT_CONFIGURED_MESSAGE)
+    _log_failure(e)
+    return AIServiceError(UNAVAILABLE_MESSAGE)
+
+def cached_response(user_text: str, tier: str = FREE) -> Optional[str]:
+    """
+    A stored answer to this (or, with TRIAGE_CACHE_SEMANTIC, a very similar) message. Never for emergencies.
+    The cache holds free-tier answers only: premium chats always get their own, larger model.
+    """
+    return triage_cache.get(user_text) if tier == FREE else None
 
-async def get_medical_response(user_text: str) -> str:
+async def answer(user_text: str, history: Sequence[ai_providers.Turn] = (), tier: str = FREE) -> str:
     """
-    Sends the user's symptoms to Gemini and returns the triage advice.
+    Sends the user's symptoms (and the conversation so far) to the model of their plan's tier
+    (see ai_router) and returns the triage advice. Raises AIServiceError when there is no answer.
     """
-    if not GEMINI_API_KEY:
-        return "System Error: AI Service is not configured properly."
+    try:
+        # The persona goes once, as the model's system instruction
+        response = await router.generate(user_text, history, system=SYSTEM_INSTRUCTION, tier=tier)
+    except Exception as e:
+        raise _error(e) from e
+    # Only opening messages are cached: a follow-up means something else in another conversation
+    if not history and tier == FREE:
+        triage_cache.put(user_text, response)
+    return response
+
+async def get_medical_response(user_text: str, history: Sequence[ai_providers.Turn] = (), tier: str = FREE) -> str:
+    """answer(), with failures turned into an apology the user can read."""
+    try:
+        return await answer(user_text, history, tier)
+    except AIServiceError as e:
+        return str(e)
 
+async def stream_medical_response(user_text: str, history: Sequence[ai_providers.Turn] = (), tier: str = FREE) -> AsyncIterator[str]:
+    """
+    answer(), chunk by chunk as the model writes it.
+    Failures raise AIServiceError instead of becoming the answer: part of it may already be out.
+    """
+    parts = []
     try:
-        # Construct the prompt with the persona and user input
-        prompt = f"{SYSTEM_INSTRUCTION}\n\nUser Input: {user_text}"
-        
-        # Async generation for non-blocking I/O
-        response = await model.generate_content_async(prompt)
-        
-        return response.text
+        async for chunk in router.stream(user_text, history, system=SYSTEM_INSTRUCTION, tier=tier):
+            parts.append(chunk)
+            yield chunk
     except Exception as e:
-        # Log the actual error
-        print(f"Gemini API Error: {e}")
-        return "I'm having trouble connecting to the medical database right now. Please try again in a moment."
\ No newline at end of file
+        raise _error(e) from e
+    # Stored once complete: a stream cut off halfway (error or client gone) never gets here
+    if not history and tier == FREE:
+        triage_cache.put(user_text, "".join(parts))
@@ -0,0 +1,118 @@
+"""
+Server-side chat conversations, so clients send only the new message.
+
+The model gets the system instruction (as a model-level instruction, see ai_providers), then the
+session summary, then the latest turns word for word, then the new message. The word-for-word part
+is capped at CHAT_HISTORY_TOKEN_BUDGET: after each exchange the oldest messages past the budget are
+condensed into the summary and deleted. A session costs about the same per request on turn 30 as on
+turn 3, and keeps only a handful of rows.
+
+Condensing is extractive (the patient's own words, and the recommendation each answer gave), not a
+model call: it runs inside the save transaction and adds no latency or cost to the chat.
+"""
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core import config
+from app.models.chat import ChatSession, ChatMessage
+from app.services.ai_providers import Turn
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English; close enough for a budget
+    return len(text) // 4 + 1
+
+@dataclass
+class Conversation:
+    session_id: int
+    summary: Optional[str] = None
+    turns: List[Turn] = field(default_factory=list)
+
+    def history(self) -> List[Turn]:
+        """What the model is sent before the new message."""
+        if not self.summary:
+            return list(self.turns)
+        # Gemini wants the conversation to open with the user, so the summary is a user turn
+        return [("user", f"Summary of our conversation so far:\n{self.summary}"), ("model", "Understood.")] + self.turns
+
+async def load(db: AsyncSession, user_id: int, session_id: int) -> Optional[Conversation]:
+    """The user's conversation, or None if it doesn't exist or belongs to someone else."""
+    chat = await db.get(ChatSession, session_id)
+    if chat is None or chat.user_id != user_id:
+        return None
+    rows = await db.execute(
+        select(ChatMessage.role, ChatMessage.content).where(ChatMessage.session_id == session_id).order_by(ChatMessage.id)
+    )
+    return Conversation(session_id=chat.id, summary=chat.summary, turns=[(role, content) for role, content in rows])
+
+# --- CONDENSING ---
+
+_RECOMMENDATION = re.compile(r"Recommended Action:?\**:?\s*([^*\n]+)", re.IGNORECASE)
+_FIRST_SENTENCE = re.compile(r"^(.+?[.!?])(?:\s|$)")
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 3].rstrip() + "..."
+
+def _gist(answer: str) -> str:
+    # Later turns need what was advised, not how it was worded
+    plain = " ".join(answer.replace("**", "").split())
+    match = _RECOMMENDATION.search(answer) or _FIRST_SENTENCE.search(plain)
+    return match.group(1).strip() if match else plain
+
+def condense(summary: Optional[str], turns: List[Turn]) -> str:
+    """The summary with `turns` appended as one line each, oldest lines dropped to fit CHAT_SUMMARY_TOKEN_BUDGET."""
+    lines = summary.splitlines() if summary else []
+    for role, text in turns:
+        lines.append(f"Patient: {_clip(text, 240)}" if role == "user" else f"MedIQ: {_clip(_gist(text), 160)}")
+    total = sum(estimate_tokens(line) for line in lines)
+    while len(lines) > 1 and total > config.CHAT_SUMMARY_TOKEN_BUDGET:
+        total -= estimate_tokens(lines.pop(0))
+    return "\n".join(lines)
+
+# --- WRITES (in the caller's transaction) ---
+
+async def save_exchange(db: AsyncSession, user_id: int, session_id: Optional[int], message: str, answer: str) -> int:
+    """
+    Appends the message and its answer to the conversation (a new one when session_id is None, or when it
+    was deleted meanwhile) and folds whatever no longer fits the budget into the summary. Returns the session id.
+    """
+    now = datetime.utcnow()
+    # Locked: two tabs chatting in one session must not fold the same messages twice
+    chat = await db.get(ChatSession, session_id, with_for_update=True) if session_id is not None else None
+    if chat is None or chat.user_id != user_id:
+        chat = ChatSession(user_id=user_id, created_at=now)
+        db.add(chat)
+        await db.flush()
+    chat.updated_at = now
+    db.add_all([
+        ChatMessage(session_id=chat.id, role="user", content=message, created_at=now),
+        ChatMessage(session_id=chat.id, role="model", content=answer, created_at=now),
+    ])
+    await db.flush()
+
+    rows = (await db.execute(
+        select(ChatMessage.id, ChatMessage.role, ChatMessage.content).where(ChatMessage.session_id == chat.id).order_by(ChatMessage.id)
+    )).all()
+    total = sum(estimate_tokens(row.content) for row in rows)
+    folded = 0
+    while folded < len(rows) and total > config.CHAT_HISTORY_TOKEN_BUDGET:
+        total -= estimate_tokens(rows[folded].content)
+        folded += 1
+    # Whole exchanges only: an answer without the message it answers confuses the model
+    if folded < len(rows) and rows[folded].role == "model":
+        folded += 1
+    if folded:
+        chat.summary = condense(chat.summary, [(row.role, row.content) for row in rows[:folded]])
+        await db.execute(delete(ChatMessage).where(ChatMessage.session_id == chat.id, ChatMessage.id <= rows[folded - 1].id))
+    return chat.id
+
+async def delete_session(db: AsyncSession, user_id: int, session_id: int) -> bool:
+    chat = await db.get(ChatSession, session_id)
+    if chat is None or chat.user_id != user_id:
+        return False
+    await db.execute(delete(ChatMessage).where(ChatMessage.session_id == session_id))
+    await db.delete(chat)
+    return True
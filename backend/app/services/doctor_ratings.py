@@ -0,0 +1,54 @@
+"""
+Doctor ratings, kept as a running sum and count on the doctor row.
+
+A new review adds to both in one UPDATE, in the same transaction as the review insert, and the
+displayed rating and the Bayesian ranking_score are derived in that same statement. Concurrent
+reviews serialize on the doctor row, so none is lost and nothing reads a stale average.
+recompute() rebuilds the columns from the reviews table, for repair.
+"""
+from sqlalchemy import select, func, update, case, cast, literal, Numeric
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core import config
+from app.models.doctor import Doctor
+from app.models.review import Review
+
+# What a doctor shows before their first review (the column default)
+UNRATED = 5.0
+
+def _derived(rating_sum, review_count) -> dict:
+    """SET clause for the four columns, from SQL expressions for the new sum and count."""
+    prior = config.RANKING_PRIOR_WEIGHT
+    return {
+        "rating_sum": rating_sum,
+        "review_count": review_count,
+        # PostgreSQL only rounds NUMERIC to a number of decimals
+        "rating": case((review_count == 0, UNRATED), else_=func.round(cast(rating_sum * 1.0 / func.nullif(review_count, 0), Numeric), 1)),
+        "ranking_score": (literal(prior * config.RANKING_PRIOR_MEAN) + rating_sum) / (literal(prior) + review_count),
+    }
+
+async def add_review(db: AsyncSession, doctor_id: int, rating: int) -> None:
+    """Runs in the caller's transaction. SET expressions read the pre-update row, so this is one atomic increment."""
+    await db.execute(
+        update(Doctor)
+        .where(Doctor.id == doctor_id)
+        .values(**_derived(Doctor.rating_sum + rating, Doctor.review_count + 1))
+    )
+
+def recompute(conn: Connection, *where) -> None:
+    """Rebuilds the rating columns from the reviews for every doctor (or those matching `where`): two set-based UPDATEs."""
+    if conn.dialect.name == "postgresql":
+        # Blocks new reviews until we commit; in-flight ones commit first and are counted
+        conn.exec_driver_sql("LOCK TABLE reviews IN SHARE MODE")
+    conn.execute(update(Doctor).where(*where).values(rating_sum=0, review_count=0, rating=UNRATED, ranking_score=config.RANKING_PRIOR_MEAN))
+    totals = (
+        select(Review.doctor_id, func.sum(Review.rating).label("rating_sum"), func.count().label("review_count"))
+        .where(Review.doctor_id.is_not(None))
+        .group_by(Review.doctor_id)
+        .subquery()
+    )
+    conn.execute(
+        update(Doctor)
+        .where(Doctor.id == totals.c.doctor_id, *where)
+        .values(**_derived(totals.c.rating_sum, totals.c.review_count))
+    )
@@ -0,0 +1,38 @@
+"""
+Doctor directory search: structured filters, free text over name, specialty and bio, and a few
+sort orders, paged by keyset (app/core/pagination.py).
+
+Free text has an index per dialect: a GIN expression index over a tsvector on PostgreSQL
+(ix_doctors_search on the Doctor model) and an FTS5 table kept in sync by triggers on SQLite
+(created by app/migrations/v0006_doctor_search.py). Every word must match, as a prefix, so "card" already finds cardiologists.
+"""
+import re
+from sqlalchemy import Integer, func, literal_column, text
+from app.models.doctor import Doctor, SEARCH_DOCUMENT
+
+# sort name -> (column, descending, cursor type). Ties go to the lowest id, like the listing indexes.
+# "rating" is the Bayesian ranking_score, so one 5-star review doesn't outrank two hundred 4.8s.
+SORTS = {
+    "rating": (Doctor.ranking_score, True, float),
+    "price_asc": (Doctor.hourly_rate, False, float),
+    "price_desc": (Doctor.hourly_rate, True, float),
+    "experience": (Doctor.years_experience, True, int),
+}
+
+MAX_TERMS = 8
+_WORD = re.compile(r"[^\W_]+") # letters and digits only, so nothing reaches the query syntax of either engine
+
+def terms(q: str) -> list:
+    return _WORD.findall(q.lower())[:MAX_TERMS]
+
+def text_filter(dialect: str, words: list):
+    """WHERE clause matching doctors whose name, specialty or bio has a word starting with each of `words`."""
+    if dialect == "postgresql":
+        # Literal config (not a bind parameter) so the expression matches the indexed one
+        query = func.to_tsquery(literal_column("'simple'"), " & ".join(f"{word}:*" for word in words))
+        return literal_column(SEARCH_DOCUMENT).op("@@")(query)
+    fts = text("SELECT rowid FROM doctors_fts WHERE doctors_fts MATCH :fts").bindparams(
+        fts=" ".join(f'"{word}"*' for word in words)
+    ).columns(rowid=Integer)
+    return Doctor.id.in_(fts)
+
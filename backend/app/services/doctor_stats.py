@@ -0,0 +1,114 @@
+"""
+Per-doctor earnings totals and daily earnings buckets, maintained as appointments get paid and completed.
+
+Like platform_stats, every delta is written in the transaction that causes it, and recompute()
+rebuilds both tables from the appointments (migration, drift repair, seed scripts).
+A doctor's totals live in one row, and the dashboard's weekly/monthly series add up at most a few
+hundred daily rows. Neither touches the appointments table.
+"""
+from datetime import date, datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy import select, func, delete, insert, case
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.stats import DoctorStats, DoctorEarningsDay
+from app.models.appointment import Appointment
+
+PERIODS = ("day", "week", "month")
+
+# (status, payment_status)
+AppointmentState = Tuple[str, str]
+
+def _upsert(dialect: str, model, values: dict, keys: tuple):
+    """INSERT the values, or add them to the existing row. Same syntax on PostgreSQL and SQLite."""
+    stmt = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(model).values(**values)
+    return stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={name: getattr(model, name) + stmt.excluded[name] for name in values if name not in keys},
+    )
+
+async def record(db: AsyncSession, appt: Appointment, before: Optional[AppointmentState]) -> None:
+    """
+    Books what `appt` moving from `before` (None = not this doctor's until now) to its current state
+    means for its doctor. Runs in the caller's transaction.
+    """
+    if appt.doctor_id is None:
+        return # an unclaimed general consultation; counted when a doctor claims it
+    was_paid = before is not None and before[1] == "paid"
+    was_completed = before is not None and before[0] == "completed"
+    paid = int(appt.payment_status == "paid") - int(was_paid)
+    completed = int(appt.status == "completed") - int(was_completed)
+    if not paid and not completed:
+        return
+    dialect = db.bind.dialect.name
+    await db.execute(_upsert(dialect, DoctorStats, {
+        "doctor_id": appt.doctor_id,
+        "earnings": paid * (appt.payout or 0.0),
+        "paid_appointments": paid,
+        "completed_appointments": completed,
+    }, keys=("doctor_id",)))
+    if paid:
+        await db.execute(_upsert(dialect, DoctorEarningsDay, {
+            "doctor_id": appt.doctor_id,
+            "day": (appt.paid_at or appt.start_time).date(),
+            "earnings": paid * (appt.payout or 0.0),
+            "paid_appointments": paid,
+        }, keys=("doctor_id", "day")))
+
+def period_start(day: date, period: str) -> date:
+    if period == "week":
+        return day - timedelta(days=day.weekday()) # Monday
+    if period == "month":
+        return day.replace(day=1)
+    return day
+
+def _step_back(start: date, period: str) -> date:
+    if period == "month":
+        return (start - timedelta(days=1)).replace(day=1)
+    return start - timedelta(days=7 if period == "week" else 1)
+
+async def earnings_series(db: AsyncSession, doctor_id: int, period: str, buckets: int, today: Optional[date] = None) -> list:
+    """The last `buckets` days/weeks/months (oldest first, empty ones included), from the daily rows only."""
+    starts = [period_start(today or datetime.utcnow().date(), period)]
+    for _ in range(buckets - 1):
+        starts.append(_step_back(starts[-1], period))
+    starts.reverse()
+    totals = {start: {"start": start, "earnings": 0.0, "paid_appointments": 0} for start in starts}
+    rows = await db.execute(
+        select(DoctorEarningsDay.day, DoctorEarningsDay.earnings, DoctorEarningsDay.paid_appointments)
+        .where(DoctorEarningsDay.doctor_id == doctor_id, DoctorEarningsDay.day >= starts[0])
+    )
+    for day, earnings, paid in rows:
+        bucket = totals.get(period_start(day, period))
+        if bucket is not None:
+            bucket["earnings"] += earnings
+            bucket["paid_appointments"] += paid
+    return list(totals.values())
+
+def recompute(conn: Connection) -> None:
+    """Rebuilds both tables from the appointments: two grouped INSERT ... SELECTs."""
+    if conn.dialect.name == "postgresql":
+        # Same reasoning as platform_stats.recompute: in-flight writers finish first, later ones wait
+        conn.exec_driver_sql("LOCK TABLE doctor_stats, doctor_earnings_daily IN EXCLUSIVE MODE")
+    paid = Appointment.payment_status == "paid"
+    conn.execute(delete(DoctorStats))
+    conn.execute(insert(DoctorStats).from_select(
+        ["doctor_id", "earnings", "paid_appointments", "completed_appointments"],
+        select(
+            Appointment.doctor_id,
+            func.coalesce(func.sum(case((paid, Appointment.payout), else_=0.0)), 0.0),
+            func.count(case((paid, 1))),
+            func.count(case((Appointment.status == "completed", 1))),
+        ).where(Appointment.doctor_id.is_not(None)).group_by(Appointment.doctor_id),
+    ))
+    conn.execute(delete(DoctorEarningsDay))
+    # A date on PostgreSQL, 'YYYY-MM-DD' (how SQLAlchemy stores Date) on SQLite.
+    # Rows written outside the API may lack paid_at; like the v0004 backfill, fall back to start_time.
+    day = func.date(func.coalesce(Appointment.paid_at, Appointment.start_time))
+    conn.execute(insert(DoctorEarningsDay).from_select(
+        ["doctor_id", "day", "earnings", "paid_appointments"],
+        select(Appointment.doctor_id, day, func.coalesce(func.sum(Appointment.payout), 0.0), func.count())
+        .where(Appointment.doctor_id.is_not(None), paid)
+        .group_by(Appointment.doctor_id, day),
+    ))
@@ -1,43 +1,82 @@
-import cloudinary
-import cloudinary.uploader
+import logging
 import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Optional
 from fastapi import UploadFile, HTTPException
+from fastapi.concurrency import run_in_threadpool
 
-# Configure Cloudinary using the keys from your .env file
-# It automatically reads CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY, etc.
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET"),
-    secure=True
-)
+logger = logging.getLogger(__name__)
+
+class MediaStorage(ABC):
+    """Where uploaded files end up. Keeps SDK imports out of module import time."""
+
+    @abstractmethod
+    def upload(self, content: bytes, folder: str) -> str:
+        """Stores the file and returns its public URL."""
+
+class CloudinaryStorage(MediaStorage):
+    def __init__(self):
+        self._uploader = None
+        self._lock = threading.Lock()
+
+    def _load_uploader(self):
+        with self._lock:
+            if self._uploader is None:
+                import cloudinary
+                import cloudinary.uploader
+                # Configure Cloudinary using the keys from your .env file
+                # It automatically reads CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY, etc.
+                cloudinary.config(
+                    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+                    api_key=os.getenv("CLOUDINARY_API_KEY"),
+                    api_secret=os.getenv("CLOUDINARY_API_SECRET"),
+                    secure=True
+                )
+                self._uploader = cloudinary.uploader
+        return self._uploader
+
+    def upload(self, content: bytes, folder: str) -> str:
+        # 'folder' ensures we keep MDQ+ files separate from your other projects
+        response = self._load_uploader().upload(
+            content,
+            folder=folder,
+            resource_type="auto" # Auto-detects image vs pdf vs video
+        )
+        return response.get("secure_url")
+
+_storage: Optional[MediaStorage] = None
+
+def set_storage(storage: Optional[MediaStorage]) -> None:
+    """Swap the active storage (benchmarks, local stubs). None resets to Cloudinary."""
+    global _storage
+    _storage = storage
+
+def get_storage() -> MediaStorage:
+    global _storage
+    if _storage is None:
+        _storage = CloudinaryStorage()
+    return _storage
 
 async def upload_image(file: UploadFile, folder: str = "mdq_plus/general") -> str:
     """
     Uploads a file to Cloudinary and returns the secure URL.
-    
+
     Args:
         file: The file object from FastAPI
         folder: The sub-folder in Cloudinary (e.g., 'mdq_plus/doctors')
-    
+
     Returns:
         str: The URL of the uploaded image
     """
     try:
         # 1. Read file content
         content = await file.read()
-        
+
         # 2. Upload to Cloudinary
-        # 'folder' ensures we keep MDQ+ files separate from your other projects
-        response = cloudinary.uploader.upload(
-            content, 
-            folder=folder,
-            resource_type="auto" # Auto-detects image vs pdf vs video
-        )
-        
-        # 3. Return the HTTPS URL
-        return response.get("secure_url")
+        # The SDK is blocking HTTP, so it runs in the threadpool instead of stalling the event loop
+        return await run_in_threadpool(get_storage().upload, content, folder)
 
     except Exception as e:
-        print(f"❌ Upload Error: {e}")
-        raise HTTPException(status_code=500, detail="Image upload failed")
\ No newline at end of file
+        logger.exception("Upload Error: %s", e)
+        raise HTTPException(status_code=500, detail="Image upload failed")
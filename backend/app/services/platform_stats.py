@@ -0,0 +1,84 @@
+"""
+Admin dashboard totals, maintained incrementally so reading them costs the same at any history size.
+
+Writes that change a total call bump() with the delta inside their own transaction, so the counters
+commit or roll back together with the change. recompute() rebuilds everything from the source tables
+in one aggregate query: the migration uses it to fill the table, and admins can run it to repair drift
+after seed scripts or hand edits that bypass the API.
+"""
+import random
+from typing import Optional, Tuple
+from sqlalchemy import select, func, update, delete, insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.stats import PlatformStats
+from app.models.user import User
+from app.models.doctor import Doctor
+from app.models.appointment import Appointment
+
+# Row locks are per shard: with 16, two concurrent writers collide 1 time in 16
+SHARDS = 16
+ACTIVE_STATUSES = ("pending", "confirmed")
+COUNTERS = ("total_users", "total_doctors", "pending_verifications", "total_revenue", "active_appointments")
+
+# (status, payment_status, amount); None = the appointment doesn't exist (before creation)
+AppointmentState = Optional[Tuple[str, str, float]]
+
+def _appointment_totals(state: AppointmentState) -> dict:
+    if state is None:
+        return {"active_appointments": 0, "total_revenue": 0.0}
+    status, payment_status, amount = state
+    return {
+        "active_appointments": int(status in ACTIVE_STATUSES),
+        "total_revenue": (amount or 0.0) if payment_status == "paid" else 0.0,
+    }
+
+def appointment_delta(before: AppointmentState, after: AppointmentState) -> dict:
+    """What an appointment moving from `before` to `after` does to the dashboard totals."""
+    old, new = _appointment_totals(before), _appointment_totals(after)
+    return {key: new[key] - old[key] for key in new}
+
+def user_delta(role: str, count: int = 1) -> dict:
+    # "total_users" on the dashboard means patients
+    if role == "patient":
+        return {"total_users": count}
+    if role == "doctor":
+        return {"total_doctors": count}
+    return {}
+
+async def bump(db: AsyncSession, **deltas) -> None:
+    """Adds the deltas to a random shard. Runs in the caller's transaction; the caller commits."""
+    deltas = {key: value for key, value in deltas.items() if value}
+    if not deltas:
+        return
+    await db.execute(
+        update(PlatformStats)
+        .where(PlatformStats.shard == random.randrange(SHARDS))
+        .values({getattr(PlatformStats, key): getattr(PlatformStats, key) + value for key, value in deltas.items()})
+    )
+
+async def read(db: AsyncSession) -> dict:
+    row = (await db.execute(select(*(func.coalesce(func.sum(getattr(PlatformStats, key)), 0).label(key) for key in COUNTERS)))).one()
+    return row._asdict()
+
+def recompute(conn: Connection) -> dict:
+    """Rebuilds the shards from the source tables: one aggregate round trip, then a rewrite of SHARDS rows."""
+    def count(model, *where):
+        return select(func.count()).select_from(model).where(*where).scalar_subquery()
+
+    if conn.dialect.name == "postgresql":
+        # Writers that already bumped finish first (so the aggregate sees them); later ones wait and land on the new rows
+        conn.exec_driver_sql("LOCK TABLE platform_stats IN EXCLUSIVE MODE")
+    totals = conn.execute(select(
+        count(User, User.role == "patient").label("total_users"),
+        count(User, User.role == "doctor").label("total_doctors"),
+        count(Doctor, Doctor.is_verified == False).label("pending_verifications"),
+        select(func.coalesce(func.sum(Appointment.amount), 0.0)).where(Appointment.payment_status == "paid").scalar_subquery().label("total_revenue"),
+        count(Appointment, Appointment.status.in_(ACTIVE_STATUSES)).label("active_appointments"),
+    )).one()._asdict()
+    conn.execute(delete(PlatformStats))
+    # Shard 0 carries the totals, the rest start at zero and absorb future deltas
+    conn.execute(insert(PlatformStats), [
+        {"shard": shard, **(totals if shard == 0 else {key: 0 for key in COUNTERS})} for shard in range(SHARDS)
+    ])
+    return totals
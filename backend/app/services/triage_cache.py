@@ -0,0 +1,237 @@
+"""
+Cache of triage answers in front of the model, per worker.
+
+Two layers:
+- exact: the message after normalize() (case, punctuation and spacing ignored);
+- similar (optional, TRIAGE_CACHE_SEMANTIC): a hashed embedding of the message's terms and adjacent term
+  pairs, with each negation attached to the term it negates, so "headache but no fever" and "fever but no
+  headache" share nothing. Looked up through an inverted index over its non-zero dimensions and accepted
+  at TRIAGE_CACHE_SIMILARITY cosine.
+  Computed locally in plain Python: no model, no network, microseconds per message.
+
+Messages that mention an emergency always go to the model and are never stored, so a red flag
+can't be answered with advice written for a milder message.
+"""
+import hashlib
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from itertools import islice
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+from app.core import config, metrics
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+def normalize(text: str) -> str:
+    return _NON_WORD.sub(" ", text.lower().replace("'", "")).strip()
+
+# Matched as whole words in normalized text (so "can't" is written "cant"); a trailing * matches any ending
+EMERGENCY_TERMS = (
+    "chest pain", "chest tightness", "heart attack", "cant breathe", "cannot breathe", "difficulty breathing",
+    "shortness of breath", "choking", "unconscious", "fainted", "passed out", "seizure*", "stroke",
+    "slurred speech", "face drooping", "numbness on one side", "severe bleeding", "bleeding heavily",
+    "vomiting blood", "coughing blood", "overdos*", "poison*", "anaphyla*", "suicid*", "kill myself",
+    "end my life", "self harm",
+)
+_EMERGENCY = re.compile(r"\b(?:" + "|".join(
+    re.escape(term[:-1]) + r"\w*" if term.endswith("*") else re.escape(term) + r"\b" for term in EMERGENCY_TERMS
+) + ")")
+
+def is_emergency(normalized: str) -> bool:
+    return _EMERGENCY.search(normalized) is not None
+
+# Words that don't change the triage. Negations stay: "no fever" is not "fever".
+_STOPWORDS = frozenset(
+    "a an the i im ive me my mine we our you your it its is am are was were be been being have has had do does did "
+    "and or but so of to in on at for with from by about since as this that these those there here very really "
+    "just also some any feel feeling felt get getting got please help hi hello doctor doc what should can could".split()
+)
+
+def _stem(word: str) -> str:
+    # Crude on purpose: only has to map "headaches"/"coughing"/"swelled" onto the same bucket as the base word
+    for suffix in ("ing", "ed", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix) and not word.endswith("ss"):
+            return word[: -len(suffix)]
+    return word
+
+# A negation belongs to the symptom after it ("no fever" is one feature, not "no" + "fever"),
+# and carries across "or"/"nor" ("no fever or cough" negates both)
+_NEGATIONS = frozenset("no not without never none nor dont doesnt didnt havent hasnt hadnt isnt arent wasnt werent".split())
+_NEGATION_LISTS = frozenset(("or", "nor"))
+
+def _terms(normalized: str) -> List[str]:
+    terms, pending, scope = [], False, False
+    for word in normalized.split():
+        if word in _NEGATIONS:
+            pending = True
+        elif word in _NEGATION_LISTS and scope:
+            pending = True
+        elif word not in _STOPWORDS:
+            terms.append("not_" + _stem(word) if pending else _stem(word))
+            scope, pending = pending, False
+        # Other stopwords keep a pending negation ("dont have a fever"), but end a list of negated terms
+        elif not pending:
+            scope = False
+    return terms
+
+def features(normalized: str) -> List[str]:
+    """Terms (negations attached) plus adjacent term pairs, so word order counts too."""
+    terms = _terms(normalized)
+    return terms + [f"{a} {b}" for a, b in zip(terms, terms[1:])]
+
+def embed(normalized: str) -> Dict[int, float]:
+    """Sparse unit vector: feature counts hashed into TRIAGE_CACHE_DIMENSIONS buckets."""
+    vector: Dict[int, float] = {}
+    for feature in features(normalized):
+        dim = zlib.crc32(feature.encode()) % config.TRIAGE_CACHE_DIMENSIONS
+        vector[dim] = vector.get(dim, 0.0) + 1.0
+    norm = sum(v * v for v in vector.values()) ** 0.5
+    return {dim: v / norm for dim, v in vector.items()} if norm else {}
+
+def _cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(b) < len(a):
+        a, b = b, a
+    return sum(v * b.get(dim, 0.0) for dim, v in a.items())
+
+@dataclass
+class Entry:
+    response: str
+    vector: Dict[int, float]
+    created: float
+    hits: int = 0
+
+class TriageCache:
+    """
+    LRU with a TTL per entry; expired entries are dropped when looked up or pushed out by newer ones.
+    Every access takes the lock (the metrics endpoint reads from a thread).
+    """
+
+    # A common word can sit in thousands of entries; scoring is capped so a miss stays cheap
+    MAX_CANDIDATES = 500
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Entry]" = OrderedDict() # normalized message -> entry, oldest use first
+        self._index: Dict[int, Set[str]] = {} # embedding dimension -> entries with a weight there
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+
+    def get(self, message: str) -> Optional[str]:
+        """The stored answer for this message or one like it; None on a miss or an emergency."""
+        if not config.TRIAGE_CACHE_ENABLED:
+            return None
+        normalized = normalize(message)
+        if not normalized:
+            return None
+        if is_emergency(normalized):
+            with self._lock:
+                self.bypassed += 1
+            return None
+        vector = embed(normalized) if config.TRIAGE_CACHE_SEMANTIC else None
+        with self._lock:
+            entry = self._live(normalized)
+            if entry is not None:
+                self.exact_hits += 1
+            elif vector:
+                entry = self._nearest(vector)
+                if entry is not None:
+                    self.similar_hits += 1
+            if entry is None:
+                self.misses += 1
+                return None
+            entry.hits += 1
+            return entry.response
+
+    def put(self, message: str, response: str) -> None:
+        if not config.TRIAGE_CACHE_ENABLED:
+            return
+        normalized = normalize(message)
+        if not normalized or not response.strip() or is_emergency(normalized):
+            return
+        entry = Entry(response=response, vector=embed(normalized), created=time.monotonic())
+        with self._lock:
+            self._remove(normalized)
+            self._entries[normalized] = entry
+            for dim in entry.vector:
+                self._index.setdefault(dim, set()).add(normalized)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+
+    # --- called with the lock held ---
+
+    def _live(self, key: str) -> Optional[Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.created > self.ttl:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _nearest(self, vector: Dict[int, float]) -> Optional[Entry]:
+        # Rarest dimensions first: they narrow the candidates fastest
+        candidates: Set[str] = set()
+        for dim in sorted(vector, key=lambda d: len(self._index.get(d, ()))):
+            candidates.update(islice(self._index.get(dim, ()), self.MAX_CANDIDATES - len(candidates)))
+            if len(candidates) >= self.MAX_CANDIDATES:
+                break
+        best_key, best_score = None, config.TRIAGE_CACHE_SIMILARITY
+        oldest = time.monotonic() - self.ttl
+        for key in candidates:
+            entry = self._entries[key]
+            if entry.created < oldest:
+                continue # dropped when next looked up exactly, or by the LRU
+            score = _cosine(vector, entry.vector)
+            if score >= best_score:
+                best_key, best_score = key, score
+        return self._live(best_key) if best_key else None
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for dim in entry.vector:
+            keys = self._index.get(dim)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[dim]
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits
+            total = hits + self.misses
+            # Messages are health data: the busiest entries are listed by hash, not by text
+            top = sorted(self._entries.items(), key=lambda item: item[1].hits, reverse=True)[:5]
+            return {
+                "enabled": config.TRIAGE_CACHE_ENABLED,
+                "semantic": config.TRIAGE_CACHE_SEMANTIC,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_ratio": round(hits / total, 4) if total else 0.0,
+                "emergency_bypassed": self.bypassed,
+                "evictions": self.evictions,
+                "top_entries": [{"key": hashlib.sha256(key.encode()).hexdigest()[:12], "hits": e.hits} for key, e in top if e.hits],
+            }
+
+cache = TriageCache(maxsize=config.TRIAGE_CACHE_MAX_ENTRIES, ttl=config.TRIAGE_CACHE_TTL_SECONDS)
+metrics.register("triage_cache", cache.stats)
@@ -0,0 +1,129 @@
+"""
+The AI client wrapper (app/services/ai_resilience.py) against the stub model misbehaving on purpose.
+No server or database: the wrapper is called directly, the same way ai_service calls it.
+
+Scenarios (each with a fresh wrapper, so breaker and latency window start empty):
+  flaky   - 20% of calls fail with a 503: the raw provider vs the wrapper's retries
+  tail    - 5% of calls take 10x as long: p99 without and with hedging
+  hang    - every call takes 10x longer than the timeout: the deadline bounds the wait
+  outage  - the provider is down, then back: the breaker fails fast, then closes after the cooldown
+
+Usage (from backend/):
+    python benchmarks/bench_ai_resilience.py --calls 400 --latency-ms 100
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from common import percentile
+import stubs
+from app.core import config
+from app.services import ai_resilience
+
+async def drive(provider, calls: int, concurrency: int) -> dict:
+    latencies, failures = [], 0
+    queue = asyncio.Queue()
+    for _ in range(calls):
+        queue.put_nowait(None)
+
+    async def worker():
+        nonlocal failures
+        while not queue.empty():
+            queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                await provider.generate("I have a headache")
+            except Exception:
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    ms = lambda q: round(percentile(latencies, q) * 1000, 1)
+    return {"calls": calls, "failed": failures, "success_rate": round(1 - failures / calls, 4), "p50_ms": ms(0.5), "p95_ms": ms(0.95), "p99_ms": ms(0.99), "max_ms": ms(1.0)}
+
+def stats(resilient) -> dict:
+    data = resilient.stats()
+    return {key: data[key] for key in ("circuit", "circuit_opens", "retries", "timeouts", "rejected", "hedged", "hedge_wins")}
+
+async def flaky(args) -> dict:
+    raw = stubs.StubAIProvider(args.latency_ms, error_rate=0.2)
+    resilient = ai_resilience.ResilientProvider(stubs.StubAIProvider(args.latency_ms, error_rate=0.2))
+    return {
+        "raw": await drive(raw, args.calls, args.concurrency),
+        "resilient": {**await drive(resilient, args.calls, args.concurrency), **stats(resilient)},
+    }
+
+async def tail(args) -> dict:
+    report = {}
+    for hedge in (False, True):
+        config.AI_HEDGE_ENABLED = hedge
+        resilient = ai_resilience.ResilientProvider(stubs.StubAIProvider(args.latency_ms, slow_rate=0.05))
+        report["hedged" if hedge else "plain"] = {**await drive(resilient, args.calls, args.concurrency), **stats(resilient)}
+    config.AI_HEDGE_ENABLED = False
+    return report
+
+async def hang(args) -> dict:
+    config.AI_TIMEOUT_SECONDS = args.latency_ms / 1000
+    config.AI_DEADLINE_SECONDS = 3 * args.latency_ms / 1000
+    resilient = ai_resilience.ResilientProvider(stubs.StubAIProvider(args.latency_ms, slow_rate=1.0))
+    report = {**await drive(resilient, args.concurrency, args.concurrency), **stats(resilient)}
+    report["deadline_ms"] = config.AI_DEADLINE_SECONDS * 1000
+    return report
+
+async def outage(args) -> dict:
+    config.AI_BREAKER_COOLDOWN_SECONDS = 0.5
+    stub = stubs.StubAIProvider(args.latency_ms, error_rate=1.0)
+    resilient = ai_resilience.ResilientProvider(stub)
+    down = await drive(resilient, args.calls, args.concurrency)
+    down_attempts = stub.calls
+    stub.error_rate = 0.0
+    await asyncio.sleep(config.AI_BREAKER_COOLDOWN_SECONDS)
+    # Half-open lets exactly one trial call through; the rest of the traffic waits for its verdict
+    trial = await drive(resilient, 1, 1)
+    back = await drive(resilient, args.calls // 4, args.concurrency)
+    return {"down": {**down, "attempts_reaching_provider": down_attempts}, "trial": trial, "recovered": back, **stats(resilient)}
+
+async def run(args) -> dict:
+    config.AI_RETRY_BASE_MS = max(1, int(args.latency_ms / 4))
+    defaults = (config.AI_TIMEOUT_SECONDS, config.AI_DEADLINE_SECONDS)
+    report = {}
+    for name, scenario in (("flaky", flaky), ("tail", tail), ("hang", hang), ("outage", outage)):
+        config.AI_TIMEOUT_SECONDS, config.AI_DEADLINE_SECONDS = defaults
+        report[name] = await scenario(args)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=400, help="calls per run")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="stub model latency")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+
+    flaky_report, tail_report, hang_report, outage_report = report["flaky"], report["tail"], report["hang"], report["outage"]
+    print(f"🔁 Flaky provider: {flaky_report['raw']['success_rate']:.1%} answered raw, {flaky_report['resilient']['success_rate']:.1%} with retries")
+    print(f"🐇 Slow tail: p99 {tail_report['plain']['p99_ms']} ms plain, {tail_report['hedged']['p99_ms']} ms hedged "
+          f"({tail_report['hedged']['hedged']} hedges)")
+    print(f"⏱️  Hung provider: every call gave up by {hang_report['max_ms']} ms (deadline {hang_report['deadline_ms']:.0f} ms)")
+    print(f"🔌 Outage: {outage_report['down']['attempts_reaching_provider']} of {outage_report['down']['calls']} calls reached the provider, "
+          f"p50 {outage_report['down']['p50_ms']} ms; after recovery {outage_report['recovered']['success_rate']:.0%} answered")
+
+    problems = []
+    if flaky_report["resilient"]["success_rate"] < 0.97:
+        problems.append("retries should hide a 20% error rate")
+    if tail_report["hedged"]["p99_ms"] >= tail_report["plain"]["p99_ms"]:
+        problems.append("hedging should cut the p99")
+    if hang_report["max_ms"] > hang_report["deadline_ms"] * 1.2:
+        problems.append("no call may outlive the deadline")
+    if outage_report["down"]["attempts_reaching_provider"] > outage_report["down"]["calls"] / 4 or outage_report["recovered"]["success_rate"] < 1:
+        problems.append("the breaker should shed load while down and close once the provider is back")
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Fires many parallel POST /appointments/book requests at ONE slot.
+
+Exactly one booking must succeed; every other request should get a fast 409.
+Reports throughput, latency and the status-code breakdown.
+
+Usage (from backend/, database migrated):
+    python benchmarks/bench_booking_concurrency.py --requests 300
+    python benchmarks/bench_booking_concurrency.py --base-url http://localhost:8000
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from common import make_client, close_app, auth_header, create_users, create_doctors, new_session, percentile, run_id
+from sqlalchemy import insert
+from app.models.appointment import DoctorSlot
+
+def setup(n_patients: int):
+    prefix = run_id()
+    db = new_session()
+    try:
+        [(doctor_id, _)] = create_doctors(db, 1, f"bookdoc-{prefix}")
+        slot_id = db.execute(insert(DoctorSlot).returning(DoctorSlot.id), {"doctor_id": doctor_id, "start_time": datetime.utcnow() + timedelta(days=1), "is_booked": False}).scalar()
+        patients = create_users(db, n_patients, f"bookpat-{prefix}")
+        db.commit()
+    finally:
+        db.close()
+    return slot_id, [email for _, email in patients]
+
+async def run(args):
+    slot_id, emails = setup(args.requests)
+    headers = [auth_header(email) for email in emails]
+
+    async with make_client(args.base_url) as client:
+        latencies, statuses = [], Counter()
+
+        async def book(h):
+            start = time.perf_counter()
+            response = await client.post("/api/v1/appointments/book", json={"slot_id": slot_id}, headers=h)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(book(h) for h in headers))
+        elapsed = time.perf_counter() - start
+    await close_app()
+
+    return {
+        "requests": args.requests,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(args.requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "status_counts": dict(statuses),
+        "bookings_succeeded": statuses[201],
+        "conflicts": statuses[409],
+        "errors": sum(n for code, n in statuses.items() if code >= 500),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--base-url", default=None)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    if report["bookings_succeeded"] != 1 or report["errors"]:
+        print("❌ Expected exactly one booking and no server errors.")
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
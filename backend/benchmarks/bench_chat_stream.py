@@ -0,0 +1,138 @@
+"""
+Time to first byte of a chat answer: POST /chat/analyze (the whole answer at once) against
+POST /chat/analyze/stream (Server-Sent Events), with the model replaced by a stub that streams
+(see stubs.py: first token after --first-token-ms, the whole answer after --ai-latency-ms).
+
+TTFB is when the first piece of the answer reaches the client: the response body for /analyze,
+the first 'delta' event for the stream. Afterwards every user's daily_chat_count must equal the
+chats that completed, since the stream only counts a chat once it finished.
+
+The ASGI test transport buffers whole responses, so this always runs against uvicorn.
+Usage (from backend/, database migrated):
+    python benchmarks/bench_chat_stream.py --requests 200 --concurrency 20
+    python benchmarks/bench_chat_stream.py --base-url http://127.0.0.1:8000   # a running stub_app (start it with TRIAGE_CACHE_ENABLED=0)
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+
+import common
+from common import auth_header, create_users, new_session, percentile, run_id
+import httpx
+from sqlalchemy import select, func
+from app.models.user import User
+
+API = "/api/v1/chat"
+MESSAGE = "I have had a headache and mild fever since yesterday."
+CHATS_PER_USER = 20 # under the 30/hour burst limit
+
+def setup(n_users: int, prefix: str) -> list:
+    db = new_session()
+    try:
+        users = create_users(db, n_users, prefix, plan="premium")
+        db.commit()
+    finally:
+        db.close()
+    return [auth_header(email) for _, email in users]
+
+def counted_chats(prefix: str) -> int:
+    db = new_session()
+    try:
+        return db.scalar(select(func.coalesce(func.sum(User.daily_chat_count), 0)).filter(User.first_name == prefix))
+    finally:
+        db.close()
+
+async def blocking_chat(client, headers):
+    start = time.perf_counter()
+    response = await client.post(f"{API}/analyze", json={"message": MESSAGE}, headers=headers)
+    elapsed = time.perf_counter() - start
+    ok = response.status_code == 200 and bool(response.json()["response"])
+    return response.status_code, ok, elapsed, elapsed
+
+async def streaming_chat(client, headers):
+    start = time.perf_counter()
+    first = None
+    event = None
+    ok = False
+    async with client.stream("POST", f"{API}/analyze/stream", json={"message": MESSAGE}, headers=headers) as response:
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: "):
+                if event == "delta" and first is None:
+                    first = time.perf_counter() - start
+                elif event == "done":
+                    ok = bool(json.loads(line[6:])["response"])
+    elapsed = time.perf_counter() - start
+    return response.status_code, ok, first if first is not None else elapsed, elapsed
+
+async def run_mode(base_url, chat, all_headers, n_requests, concurrency) -> dict:
+    ttfb, total, statuses = [], [], Counter()
+    completed = 0
+    jobs = iter([all_headers[i % len(all_headers)] for i in range(n_requests)])
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        async def worker():
+            nonlocal completed
+            for headers in jobs:
+                status, ok, first, elapsed = await chat(client, headers)
+                statuses[status] += 1
+                if ok:
+                    completed += 1
+                    ttfb.append(first)
+                    total.append(elapsed)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    ms = lambda values, q: round(percentile(values, q) * 1000, 1)
+    return {
+        "requests": n_requests,
+        "completed": completed,
+        "status_counts": dict(statuses),
+        "elapsed_s": round(elapsed, 2),
+        "ttfb_p50_ms": ms(ttfb, 0.50), "ttfb_p95_ms": ms(ttfb, 0.95), "ttfb_p99_ms": ms(ttfb, 0.99),
+        "total_p50_ms": ms(total, 0.50), "total_p95_ms": ms(total, 0.95),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="chats per endpoint")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--ai-latency-ms", type=float, default=2000.0, help="stub model: time for the whole answer")
+    parser.add_argument("--first-token-ms", type=float, default=300.0, help="stub model: time to the first token")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--base-url", default=None, help="an already running stub_app (its own stub latencies apply)")
+    args = parser.parse_args()
+
+    server, base_url = None, args.base_url
+    if not base_url:
+        # Every chat sends the same message: without this all but the first would be triage cache hits
+        env = {"STUB_AI_LATENCY_MS": str(args.ai_latency_ms), "STUB_AI_FIRST_TOKEN_MS": str(args.first_token_ms), "TRIAGE_CACHE_ENABLED": "0"}
+        server, base_url = common.spawn_stub_server(args.workers, args.port, env)
+
+    report = {}
+    try:
+        for name, chat in (("analyze", blocking_chat), ("analyze_stream", streaming_chat)):
+            prefix = f"chat-{run_id()}"
+            n_users = -(-args.requests // CHATS_PER_USER)
+            report[name] = asyncio.run(run_mode(base_url, chat, setup(n_users, prefix), args.requests, args.concurrency))
+            report[name]["counted"] = counted_chats(prefix)
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print(json.dumps(report, indent=2))
+    speedup = report["analyze"]["ttfb_p50_ms"] / max(report["analyze_stream"]["ttfb_p50_ms"], 0.001)
+    print(f"⚡ Streaming p50 time to first byte: {report['analyze_stream']['ttfb_p50_ms']} ms vs {report['analyze']['ttfb_p50_ms']} ms ({speedup:.1f}x sooner)")
+    if any(r["counted"] != r["completed"] or r["completed"] != r["requests"] for r in report.values()):
+        print("❌ Every chat should complete and be counted exactly once.")
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
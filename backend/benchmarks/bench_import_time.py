@@ -0,0 +1,82 @@
+"""
+Import-time report for the API worker (`python -X importtime -c "import app.main"`).
+
+Prints the slowest modules and fails (exit 1) when:
+  * app.main's cumulative import time exceeds the budget in import_budget.json, or
+  * a module listed as forbidden (heavy SDKs that must load lazily) is imported at boot.
+
+Usage (from backend/):
+    python benchmarks/bench_import_time.py            # report + budget check
+    python benchmarks/bench_import_time.py --runs 5   # take the median of 5 runs
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_budget.json")
+
+def measure_once() -> dict:
+    env = dict(os.environ)
+    # Importing the app never connects, but database.py refuses to load without a URL
+    env.setdefault("DATABASE_URL", "sqlite:///./importtime.db")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True, text=True, env=env, cwd=os.getcwd(),
+    )
+    if proc.returncode != 0:
+        sys.exit(proc.stderr[-2000:])
+
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        # "import time:      5090 |       7943 |     grpc._cython.cygrpc"
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        modules[name.strip()] = {"self_us": int(self_us), "cumulative_us": int(cumulative_us)}
+    return modules
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", action="store_true", help="print machine-readable output only")
+    args = parser.parse_args()
+
+    with open(BUDGET_FILE) as f:
+        budget = json.load(f)
+
+    runs = [measure_once() for _ in range(args.runs)]
+    total_ms = statistics.median(run["app.main"]["cumulative_us"] for run in runs) / 1000
+    last = runs[-1]
+    slowest = sorted(last.items(), key=lambda item: item[1]["self_us"], reverse=True)[:args.top]
+    forbidden = [name for name in budget["forbidden_modules"] if name in last]
+
+    report = {
+        "app_main_ms": round(total_ms, 1),
+        "budget_ms": budget["app_main_ms"],
+        "modules_imported": len(last),
+        "forbidden_imported": forbidden,
+        "slowest_self_us": {name: data["self_us"] for name, data in slowest},
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"app.main import: {report['app_main_ms']} ms (budget {budget['app_main_ms']} ms), {len(last)} modules")
+        print("Slowest modules (self time):")
+        for name, us in report["slowest_self_us"].items():
+            print(f"  {us / 1000:>8.1f} ms  {name}")
+
+    failed = False
+    if forbidden:
+        print(f"❌ Imported at boot but must be lazy: {', '.join(forbidden)}")
+        failed = True
+    if total_ms > budget["app_main_ms"]:
+        print("❌ Import time is over budget.")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
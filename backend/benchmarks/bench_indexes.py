@@ -0,0 +1,202 @@
+"""
+EXPLAIN-based check of the appointment indexes (app/migrations/v0002_appointment_indexes.py).
+
+Seeds a synthetic dataset (1M appointments by default) straight in SQL, then runs the
+app's hot queries twice: with the v0002 indexes dropped and with them rebuilt.
+Prints plan summary and median execution time for each, as JSON.
+
+Point DATABASE_URL at a SCRATCH database: it inserts a lot of rows and drops/recreates indexes.
+
+Usage (from backend/, database migrated):
+    python benchmarks/bench_indexes.py --appointments 1000000
+    python benchmarks/bench_indexes.py --skip-seed         # reuse rows from an earlier run
+"""
+import argparse
+import json
+import statistics
+import time
+
+import common  # also puts backend/ on sys.path
+from sqlalchemy import select, func, text, tuple_
+from app.core.database import engine
+from app.core.migrations import create_index
+from app.migrations.v0002_appointment_indexes import INDEXES
+from app.models.appointment import Appointment, DoctorSlot
+from app.api.v1.appointments import general_queue_filter, appointment_time
+
+BENCH_NOTE = "bench-index"
+
+# Timestamps: base + i minutes, spelled per dialect
+MINUTES = {
+    "postgresql": "timestamp '2024-01-01' + s.i * interval '1 minute'",
+    "sqlite": "datetime('2024-01-01', '+' || s.i || ' minutes')",
+}
+
+def series(n: int) -> str:
+    # Portable row generator (PostgreSQL and SQLite both speak recursive CTEs)
+    return f"WITH RECURSIVE s(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM s WHERE i < {int(n)})"
+
+def first_new_id(conn, table: str, inserted: int) -> int:
+    # One INSERT ... SELECT takes consecutive ids, and MAX(id) is ours. (MAX(id) + 1 beforehand isn't:
+    # a rolled-back insert still advances a PostgreSQL sequence.)
+    return conn.execute(text(f"SELECT MAX(id) FROM {table}")).scalar() - inserted + 1
+
+def no_statement_timeout(conn) -> None:
+    # The engine caps statements for API traffic (DB_STATEMENT_TIMEOUT_MS); bulk seeding and index builds need longer
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql("SET statement_timeout = 0")
+
+def seed(conn, n_appointments: int, n_patients: int, n_doctors: int) -> None:
+    """Deterministic synthetic data: ~60% slotted appointments, the rest general consultations."""
+    ts = MINUTES[conn.dialect.name]
+    no_statement_timeout(conn)
+    tag = common.run_id()
+    conn.execute(text(f"""
+        {series(n_patients + n_doctors)}
+        INSERT INTO users (email, first_name, last_name, hashed_password, dob, role, plan, is_active, is_banned, daily_chat_count, burst_chat_count)
+        SELECT 'idx-{tag}-' || s.i || '@bench.local', 'Bench', 'User', '!', '1990-01-01',
+               CASE WHEN s.i <= {n_doctors} THEN 'doctor' ELSE 'patient' END, 'free', true, false, 0, 0
+        FROM s
+    """))
+    user_start = first_new_id(conn, "users", n_patients + n_doctors)
+    conn.execute(text(f"""
+        {series(n_doctors)}
+        INSERT INTO doctors (user_id, full_name, specialty, hourly_rate, rating, review_count, years_experience, is_available, is_verified, license_number)
+        SELECT {user_start} + s.i - 1, 'Dr Bench ' || s.i, 'General Practitioner', 5000, 4.5, 0, 5, true, true, 'IDX-{tag}-' || s.i
+        FROM s
+    """))
+    doctor_start = first_new_id(conn, "doctors", n_doctors)
+    n_slotted = n_appointments * 6 // 10
+    # Every slotted appointment has a booked slot, plus one open slot in five on top
+    conn.execute(text(f"""
+        {series(n_slotted + n_slotted // 5)}
+        INSERT INTO doctor_slots (doctor_id, start_time, is_booked)
+        SELECT {doctor_start} + (s.i % {n_doctors}), {ts}, s.i <= {n_slotted}
+        FROM s
+    """))
+    slot_start = first_new_id(conn, "doctor_slots", n_slotted + n_slotted // 5)
+    patient_start = user_start + n_doctors
+    conn.execute(text(f"""
+        {series(n_appointments)}
+        INSERT INTO appointments (patient_id, doctor_id, slot_id, start_time, status, payment_status, notes, amount, commission, payout)
+        SELECT {patient_start} + (((s.i % {n_patients}) * 7919) % {n_patients}),
+               CASE WHEN s.i <= {n_slotted} THEN {doctor_start} + (s.i % {n_doctors})
+                    WHEN s.i % 500 = 0 THEN NULL
+                    ELSE {doctor_start} + (((s.i % {n_doctors}) * 31) % {n_doctors}) END,
+               CASE WHEN s.i <= {n_slotted} THEN {slot_start} + s.i - 1 ELSE NULL END,
+               {ts},
+               CASE WHEN s.i % 500 = 0 THEN 'pending'
+                    WHEN s.i % 50 = 1 THEN 'pending'
+                    WHEN s.i % 10 = 2 THEN 'cancelled'
+                    WHEN s.i % 10 = 3 THEN 'confirmed'
+                    ELSE 'completed' END,
+               CASE WHEN s.i % 50 = 1 AND s.i % 100 = 1 THEN 'unpaid' ELSE 'paid' END,
+               '{BENCH_NOTE}', 5000, 1500, 3500
+        FROM s
+    """))
+
+def hot_queries(conn):
+    """The statements behind the doctor and patient views, with representative parameters."""
+    doctor_id = conn.execute(select(func.min(Appointment.doctor_id)).filter(Appointment.notes == BENCH_NOTE)).scalar()
+    patient_id = conn.execute(select(func.min(Appointment.patient_id)).filter(Appointment.notes == BENCH_NOTE)).scalar()
+    cursor_row = conn.execute(
+        select(appointment_time, Appointment.id).select_from(Appointment).outerjoin(DoctorSlot, Appointment.slot_id == DoctorSlot.id)
+        .filter(Appointment.patient_id == patient_id).order_by(appointment_time.desc(), Appointment.id.desc()).offset(5).limit(1)
+    ).first()
+    my_page = (
+        select(Appointment.id).outerjoin(DoctorSlot, Appointment.slot_id == DoctorSlot.id)
+        .filter(Appointment.patient_id == patient_id).order_by(appointment_time.desc(), Appointment.id.desc()).limit(51)
+    )
+    return {
+        "doctor_requests": select(Appointment.id).join(DoctorSlot, Appointment.slot_id == DoctorSlot.id)
+            .filter(Appointment.doctor_id == doctor_id, Appointment.status == "pending", Appointment.payment_status == "paid"),
+        "doctor_confirmed": select(Appointment.id)
+            .filter(Appointment.doctor_id == doctor_id, Appointment.status == "confirmed"),
+        "doctor_earnings": select(func.sum(Appointment.payout))
+            .filter(Appointment.doctor_id == doctor_id, Appointment.payment_status == "paid"),
+        "general_queue_claim_next": select(Appointment.id).where(*general_queue_filter())
+            .order_by(Appointment.start_time, Appointment.id).limit(1),
+        "patient_history_first_page": my_page,
+        "patient_history_next_page": my_page.filter(tuple_(appointment_time, Appointment.id) < tuple_(*cursor_row)),
+        "doctor_open_slots": select(DoctorSlot.id)
+            .filter(DoctorSlot.doctor_id == doctor_id, DoctorSlot.is_booked == False).order_by(DoctorSlot.start_time),
+    }
+
+def literal_sql(conn, stmt) -> str:
+    return str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+
+def plan_nodes(node: dict, out: list) -> list:
+    label = node["Node Type"]
+    if node.get("Index Name"):
+        label += f" using {node['Index Name']}"
+    out.append(label)
+    for child in node.get("Plans", []):
+        plan_nodes(child, out)
+    return out
+
+def explain(conn, sql: str, runs: int) -> dict:
+    if conn.dialect.name == "postgresql":
+        times, plan = [], None
+        for _ in range(runs):
+            [[result]] = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}").fetchall()
+            times.append(result[0]["Execution Time"])
+            plan = result[0]["Plan"]
+        return {"median_ms": round(statistics.median(times), 3), "plan": plan_nodes(plan, []),
+                "buffers": plan.get("Shared Hit Blocks", 0) + plan.get("Shared Read Blocks", 0)}
+    # SQLite: no ANALYZE output, so time the statement itself
+    plan = [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()]
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        conn.exec_driver_sql(sql).fetchall()
+        times.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": round(statistics.median(times), 3), "plan": plan}
+
+def measure(conn, runs: int) -> dict:
+    conn.exec_driver_sql("ANALYZE")
+    return {name: explain(conn, literal_sql(conn, stmt), runs) for name, stmt in hot_queries(conn).items()}
+
+def v0002_indexes():
+    return [index for table in (Appointment.__table__, DoctorSlot.__table__) for index in table.indexes if index.name in INDEXES]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--appointments", type=int, default=1_000_000)
+    parser.add_argument("--patients", type=int, default=50_000)
+    parser.add_argument("--doctors", type=int, default=2_000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+
+    if not args.skip_seed:
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            seed(conn, args.appointments, args.patients, args.doctors)
+        print(f"Seeded {args.appointments} appointments in {time.perf_counter() - started:.1f}s")
+
+    report = {"dialect": engine.dialect.name, "appointments": None, "queries": {}}
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        no_statement_timeout(conn)
+        report["appointments"] = conn.execute(select(func.count()).select_from(Appointment)).scalar()
+        for index in v0002_indexes():
+            index.drop(conn, checkfirst=True)
+        without = measure(conn, args.runs)
+        for index in v0002_indexes():
+            create_index(conn, index)
+        with_indexes = measure(conn, args.runs)
+
+    for name in without:
+        before, after = without[name], with_indexes[name]
+        report["queries"][name] = {
+            "without_ms": before["median_ms"],
+            "with_ms": after["median_ms"],
+            "speedup": round(before["median_ms"] / after["median_ms"], 1) if after["median_ms"] else None,
+            "buffers_without": before.get("buffers"),
+            "buffers_with": after.get("buffers"),
+            "plan_without": before["plan"],
+            "plan_with": after["plan"],
+        }
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Measures what server-side prepared statements save on the API's hot queries.
+
+Runs each query N times on one connection with prepare_threshold=None (what we use
+behind a transaction pooler) and with prepare_threshold=1, then reports mean latency
+and the planner time Postgres reports for a single execution.
+
+Usage (from backend/, against a direct Postgres connection, NOT a transaction pooler):
+    python benchmarks/bench_prepared_statements.py --iterations 2000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+# Ensure the script can see the 'app' package
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import StaticPool
+from app.core.database import SQLALCHEMY_DATABASE_URL
+from app.models import user, doctor, appointment, content, review, audit
+from app.models.user import User
+from app.models.doctor import Doctor
+from app.models.appointment import DoctorSlot
+
+# Same statements the handlers build (deps.get_current_user, get_doctor_slots, read_doctors)
+HOT_QUERIES = {
+    "user_by_email": (select(User).filter(User.email == "bench@example.com"), {}),
+    "doctor_slots": (select(DoctorSlot).filter(DoctorSlot.doctor_id == 1, DoctorSlot.is_booked == False).order_by(DoctorSlot.start_time), {}),
+    "verified_doctors": (select(Doctor).filter(Doctor.is_verified == True).offset(0).limit(100), {}),
+}
+
+def psycopg_url() -> str:
+    url = make_url(SQLALCHEMY_DATABASE_URL)
+    if url.get_backend_name() != "postgresql":
+        sys.exit("This benchmark needs a PostgreSQL DATABASE_URL.")
+    return url.set(drivername="postgresql+psycopg").render_as_string(hide_password=False)
+
+def time_queries(url: str, prepare_threshold, iterations: int) -> dict:
+    engine = create_engine(url, poolclass=StaticPool, connect_args={"prepare_threshold": prepare_threshold})
+    results = {}
+    with engine.connect() as conn:
+        for name, (stmt, params) in HOT_QUERIES.items():
+            for _ in range(20): # warm-up (also crosses the prepare threshold)
+                conn.execute(stmt, params).all()
+            start = time.perf_counter()
+            for _ in range(iterations):
+                conn.execute(stmt, params).all()
+            results[name] = (time.perf_counter() - start) / iterations * 1e6
+    engine.dispose()
+    return results
+
+def planning_times(url: str) -> dict:
+    engine = create_engine(url, poolclass=StaticPool, connect_args={"prepare_threshold": None})
+    results = {}
+    with engine.connect() as conn:
+        for name, (stmt, params) in HOT_QUERIES.items():
+            compiled = stmt.compile(engine, compile_kwargs={"literal_binds": True})
+            plan = conn.execute(text(f"EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) {compiled}")).scalar()
+            results[name] = plan[0]["Planning Time"] * 1000 # ms -> µs
+    engine.dispose()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--json", action="store_true", help="print machine-readable output only")
+    args = parser.parse_args()
+
+    url = psycopg_url()
+    unprepared = time_queries(url, None, args.iterations)
+    prepared = time_queries(url, 1, args.iterations)
+    planning = planning_times(url)
+
+    report = {
+        name: {
+            "unprepared_us": round(unprepared[name], 1),
+            "prepared_us": round(prepared[name], 1),
+            "saved_us": round(unprepared[name] - prepared[name], 1),
+            "planning_us": round(planning[name], 1),
+        }
+        for name in HOT_QUERIES
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'query':<18}{'unprepared µs':>15}{'prepared µs':>13}{'saved µs':>10}{'plan µs':>10}")
+    for name, row in report.items():
+        print(f"{name:<18}{row['unprepared_us']:>15}{row['prepared_us']:>13}{row['saved_us']:>10}{row['planning_us']:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+N doctors drain a queue of paid general consultations at the same time.
+
+Modes:
+  next  - every doctor loops PUT /doctor/queue/claim-next until the queue is empty (404)
+  head  - the old pattern: GET /doctor/queue, then claim the first row by id (409 on a lost race)
+
+Reports claims/sec, latency, wasted attempts, and checks every row went to exactly one doctor.
+claim-next hands out any waiting consultation, so the general queue must be empty before the run.
+
+Usage (from backend/, database migrated):
+    python benchmarks/bench_queue_claim.py --doctors 20 --appointments 500
+    python benchmarks/bench_queue_claim.py --mode head
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from common import make_client, close_app, auth_header, create_users, create_doctors, new_session, percentile, run_id
+from sqlalchemy import insert, select, func
+from app.models.appointment import Appointment
+from app.api.v1.appointments import general_queue_filter
+
+QUEUE = "/api/v1/appointments/doctor/queue"
+
+def waiting_in_queue() -> int:
+    db = new_session()
+    try:
+        return db.scalar(select(func.count()).select_from(Appointment).filter(*general_queue_filter()))
+    finally:
+        db.close()
+
+def setup(n_doctors: int, n_appointments: int):
+    prefix = run_id()
+    db = new_session()
+    try:
+        doctors = create_doctors(db, n_doctors, f"gp-{prefix}")
+        [(patient_id, _)] = create_users(db, 1, f"queuepat-{prefix}")
+        start = datetime.utcnow() - timedelta(hours=1)
+        rows = [
+            dict(patient_id=patient_id, doctor_id=None, slot_id=None, start_time=start + timedelta(seconds=i),
+                 status="pending", payment_status="paid", notes="bench", amount=4000.0, commission=2250.0, payout=1750.0)
+            for i in range(n_appointments)
+        ]
+        db.execute(insert(Appointment), rows)
+        db.commit()
+    finally:
+        db.close()
+    return patient_id, [email for _, email in doctors]
+
+def owners_per_row(patient_id: int) -> Counter:
+    db = new_session()
+    try:
+        rows = db.execute(select(Appointment.doctor_id, func.count()).filter(Appointment.patient_id == patient_id).group_by(Appointment.doctor_id)).all()
+    finally:
+        db.close()
+    return Counter({doctor_id: n for doctor_id, n in rows})
+
+def own_ids(patient_id: int, ids: list) -> set:
+    """The ids among `ids` that are this run's consultations."""
+    db = new_session()
+    try:
+        return set(db.scalars(select(Appointment.id).filter(Appointment.patient_id == patient_id, Appointment.id.in_(set(ids)))))
+    finally:
+        db.close()
+
+async def run(args):
+    waiting = waiting_in_queue()
+    if waiting:
+        raise SystemExit(f"❌ The general queue already has {waiting} waiting consultation(s) the doctors would claim too. Run on a database with an empty queue.")
+    patient_id, emails = setup(args.doctors, args.appointments)
+    latencies, statuses, claimed_ids = [], Counter(), []
+
+    async with make_client(args.base_url) as client:
+
+        async def attempt(h):
+            start = time.perf_counter()
+            if args.mode == "next":
+                response = await client.put(f"{QUEUE}/claim-next", headers=h)
+            else:
+                queue = (await client.get(QUEUE, headers=h)).json()
+                if not queue:
+                    return False
+                response = await client.put(f"{QUEUE}/{queue[0]['id']}/claim", headers=h)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] += 1
+            if response.status_code == 200:
+                claimed_ids.append(response.json()["id"])
+            return response.status_code != 404
+
+        async def doctor(email):
+            h = auth_header(email)
+            while await attempt(h):
+                pass
+
+        start = time.perf_counter()
+        await asyncio.gather(*(doctor(email) for email in emails))
+        elapsed = time.perf_counter() - start
+    await close_app()
+
+    owners = owners_per_row(patient_id)
+    # Only this run's rows count; anything else claimed was queued by someone else meanwhile
+    own = own_ids(patient_id, claimed_ids)
+    claimed = [appt_id for appt_id in claimed_ids if appt_id in own]
+    return {
+        "mode": args.mode,
+        "doctors": args.doctors,
+        "appointments": args.appointments,
+        "elapsed_s": round(elapsed, 3),
+        "claims_per_sec": round(len(claimed) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "status_counts": dict(statuses),
+        "claimed": len(claimed),
+        "duplicate_claims": len(claimed) - len(own),
+        "foreign_claims": len(claimed_ids) - len(claimed),
+        "lost_races": statuses[409],
+        "left_unclaimed": owners.get(None, 0),
+        "errors": sum(n for code, n in statuses.items() if code >= 500),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--doctors", type=int, default=20)
+    parser.add_argument("--appointments", type=int, default=500)
+    parser.add_argument("--mode", choices=["next", "head"], default="next")
+    parser.add_argument("--base-url", default=None)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    if report["claimed"] != args.appointments or report["duplicate_claims"] or report["left_unclaimed"] or report["errors"]:
+        print("❌ Every consultation should be claimed by exactly one doctor.")
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Shared helpers for the benchmark scripts. Run the scripts from backend/ so 'app' is importable."""
+import math
+import os
+import subprocess
+import sys
+import time
+import uuid
+from datetime import date
+
+# Ensure the scripts can see the 'app' package
+sys.path.append(os.getcwd())
+
+import httpx
+from sqlalchemy import insert
+from app.core.database import SessionLocal, async_engine
+from app.core.security import create_access_token
+from app.models import user, doctor, appointment, content, review, audit
+from app.models.user import User
+from app.models.doctor import Doctor
+
+# Placeholder hash: benchmark users log in with minted tokens, never with a password
+NO_PASSWORD = "!"
+
+def run_id() -> str:
+    return uuid.uuid4().hex[:8]
+
+def make_client(base_url: str = None) -> httpx.AsyncClient:
+    """In-process ASGI client by default; pass --base-url to hit a running server instead."""
+    if base_url:
+        return httpx.AsyncClient(base_url=base_url, timeout=60)
+    from app.main import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+async def close_app():
+    """Dispose the app's async pool; aiosqlite connection threads otherwise keep the process alive."""
+    await async_engine.dispose()
+
+def auth_header(email: str) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+def create_users(db, count: int, prefix: str, role: str = "patient", plan: str = "free",
+                 hashed_password: str = NO_PASSWORD, domain: str = "bench.local") -> list:
+    """Bulk-inserts users and returns their (id, email) pairs. Logging in needs a domain EmailStr accepts (not .local)."""
+    rows = [
+        dict(email=f"{prefix}-{i}@{domain}", first_name=prefix, last_name=str(i), hashed_password=hashed_password,
+             dob=date(1990, 1, 1), role=role, plan=plan, is_active=True, is_banned=False,
+             daily_chat_count=0, burst_chat_count=0)
+        for i in range(count)
+    ]
+    result = db.execute(insert(User).returning(User.id, User.email), rows)
+    return [(row.id, row.email) for row in result]
+
+def create_doctors(db, count: int, prefix: str, hourly_rate: float = 5000.0) -> list:
+    """Creates verified doctors with user accounts. Returns (doctor_id, email) pairs."""
+    users = create_users(db, count, prefix, role="doctor")
+    rows = [
+        dict(user_id=user_id, full_name=f"Dr {prefix} {i}", specialty="General Practitioner", hourly_rate=hourly_rate,
+             rating=5.0, review_count=0, years_experience=5, is_available=True, is_verified=True,
+             license_number=f"{prefix}-{i}")
+        for i, (user_id, _) in enumerate(users)
+    ]
+    result = db.execute(insert(Doctor).returning(Doctor.id), rows)
+    return [(doctor_id, email) for doctor_id, (_, email) in zip(result.scalars(), users)]
+
+def spawn_stub_server(workers: int, port: int, env: dict = None, on_start=None, **popen_kwargs):
+    """
+    Starts stub_app (external services stubbed) under uvicorn and waits until it answers. Returns (process, base_url).
+    on_start(process) runs before the wait, e.g. to start draining a piped stderr.
+    """
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "stub_app:app", "--app-dir", "benchmarks", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        env=dict(os.environ, **(env or {})), **popen_kwargs,
+    )
+    if on_start:
+        on_start(proc)
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            if httpx.get(base_url + "/", timeout=1).status_code == 200:
+                return proc, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    sys.exit("❌ Server did not start")
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+def new_session():
+    return SessionLocal()
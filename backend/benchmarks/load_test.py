@@ -0,0 +1,384 @@
+"""
+Mixed-traffic load test for the v1 API, with Gemini and Cloudinary stubbed (see stubs.py).
+
+Virtual users loop over a weighted mix of real client flows: login, doctor listing and
+detail, slot browsing, booking + payment, patient history, doctors polling their queue,
+chat, reviews and health tips. Each endpoint gets p50/p95/p99 latency, throughput, status
+codes and DB queries per request (read from the app's own `app.request` records).
+
+Results are written as JSON to benchmarks/results/ (with the git commit), so runs can be compared.
+
+Modes (from backend/, database migrated; any DB works, a seed_synthetic.py one is most realistic):
+    python benchmarks/load_test.py --users 50 --duration 60        # app in-process (ASGI transport)
+    python benchmarks/load_test.py --serve 4 --users 200           # spawn uvicorn with 4 workers
+    python benchmarks/load_test.py --base-url http://host:8000     # existing server; no DB query counts
+    python benchmarks/load_test.py --compare old.json new.json     # diff two result files
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+import common
+from common import auth_header, create_users, create_doctors, new_session, percentile, run_id
+import httpx
+from sqlalchemy import insert
+from app.core.security import get_password_hash
+from app.models.appointment import Appointment, DoctorSlot
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+LOAD_PASSWORD = "load-test-password"
+LOAD_EMAIL_DOMAIN = "loadtest.mediq"
+API = "/api/v1"
+
+# --- FIXTURES ---
+
+class Fixtures:
+    """Actors and rows the scenarios draw from. Created fresh per run, next to whatever data is already there."""
+
+    def __init__(self, patients: int, doctors: int, slots_per_doctor: int, reviews_per_patient: int, queue: int):
+        tag = run_id()
+        hashed = get_password_hash(LOAD_PASSWORD) # one bcrypt for everybody
+        start = datetime.utcnow()
+        db = new_session()
+        try:
+            patient_rows = create_users(db, patients, f"lt-{tag}-p", plan="premium", hashed_password=hashed, domain=LOAD_EMAIL_DOMAIN)
+            doctor_rows = create_doctors(db, doctors, f"lt-{tag}-d")
+            slot_rows = [
+                {"doctor_id": doctor_id, "start_time": start + timedelta(days=1 + i // 8, hours=i % 8), "is_booked": False}
+                for doctor_id, _ in doctor_rows for i in range(slots_per_doctor)
+            ]
+            self.open_slots = list(db.execute(insert(DoctorSlot).returning(DoctorSlot.id), slot_rows).scalars()) if slot_rows else []
+            # Completed visits waiting for a review, and paid GP consultations waiting in the queue
+            done = [
+                dict(patient_id=patient_id, doctor_id=doctor_rows[(n + k) % doctors][0], start_time=start - timedelta(days=k + 1),
+                     status="completed", payment_status="paid", amount=4000.0, commission=2250.0, payout=1750.0)
+                for n, (patient_id, _) in enumerate(patient_rows) for k in range(reviews_per_patient)
+            ]
+            emails = dict(patient_rows)
+            self.reviewable = [
+                (emails[row.patient_id], row.id)
+                for row in db.execute(insert(Appointment).returning(Appointment.id, Appointment.patient_id), done)
+            ] if done else []
+            if queue:
+                db.execute(insert(Appointment), [
+                    dict(patient_id=patient_rows[i % patients][0], doctor_id=None, slot_id=None, start_time=start,
+                         status="pending", payment_status="paid", amount=4000.0, commission=2250.0, payout=1750.0)
+                    for i in range(queue)
+                ])
+            db.commit()
+        finally:
+            db.close()
+        self.patient_emails = [email for _, email in patient_rows]
+        self.doctor_ids = [doctor_id for doctor_id, _ in doctor_rows]
+        self.doctor_emails = [email for _, email in doctor_rows]
+        self.patient_headers = [auth_header(email) for email in self.patient_emails]
+        self.doctor_headers = [auth_header(email) for email in self.doctor_emails]
+        self.headers_by_email = dict(zip(self.patient_emails, self.patient_headers))
+        random.Random(0).shuffle(self.open_slots)
+        random.Random(1).shuffle(self.reviewable)
+
+# --- CLIENT-SIDE RECORDING ---
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.transport_errors = Counter()
+
+    async def call(self, client, endpoint: str, method: str, url: str, **kwargs):
+        """`endpoint` is the route template ("GET /api/v1/doctors/{doctor_id}"), matching the server's records."""
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.transport_errors[endpoint] += 1
+            return None
+        self.latencies[endpoint].append(time.perf_counter() - start)
+        self.statuses[endpoint][response.status_code] += 1
+        return response
+
+# --- SCENARIOS ---
+# Each one is a single user action; some actions make more than one request.
+
+async def login(ctx, rnd):
+    await ctx.rec.call(ctx.client, f"POST {API}/auth/login", "POST", f"{API}/auth/login",
+                       json={"email": rnd.choice(ctx.fx.patient_emails), "password": LOAD_PASSWORD})
+
+async def list_doctors(ctx, rnd):
+    await ctx.rec.call(ctx.client, f"GET {API}/doctors/", "GET", f"{API}/doctors/")
+
+async def doctor_detail(ctx, rnd):
+    await ctx.rec.call(ctx.client, f"GET {API}/doctors/{{doctor_id}}", "GET", f"{API}/doctors/{rnd.choice(ctx.fx.doctor_ids)}")
+
+async def browse_slots(ctx, rnd):
+    await ctx.rec.call(ctx.client, f"GET {API}/appointments/doctors/{{doctor_id}}/slots", "GET",
+                       f"{API}/appointments/doctors/{rnd.choice(ctx.fx.doctor_ids)}/slots")
+
+async def book_and_pay(ctx, rnd):
+    if not ctx.fx.open_slots:
+        return
+    headers = rnd.choice(ctx.fx.patient_headers)
+    response = await ctx.rec.call(ctx.client, f"POST {API}/appointments/book", "POST", f"{API}/appointments/book",
+                                  json={"slot_id": ctx.fx.open_slots.pop()}, headers=headers)
+    if response is not None and response.status_code == 201:
+        await ctx.rec.call(ctx.client, f"PUT {API}/appointments/{{appt_id}}/pay", "PUT",
+                           f"{API}/appointments/{response.json()['id']}/pay", headers=headers)
+
+async def my_appointments(ctx, rnd):
+    await ctx.rec.call(ctx.client, f"GET {API}/appointments/my", "GET", f"{API}/appointments/my", headers=rnd.choice(ctx.fx.patient_headers))
+
+async def doctor_poll(ctx, rnd):
+    headers = rnd.choice(ctx.fx.doctor_headers)
+    await ctx.rec.call(ctx.client, f"GET {API}/appointments/doctor/queue", "GET", f"{API}/appointments/doctor/queue", headers=headers)
+    await ctx.rec.call(ctx.client, f"GET {API}/appointments/doctor/requests", "GET", f"{API}/appointments/doctor/requests", headers=headers)
+
+async def chat(ctx, rnd):
+    await ctx.rec.call(ctx.client, f"POST {API}/chat/analyze", "POST", f"{API}/chat/analyze",
+                       json={"message": "I have had a headache and mild fever since yesterday."}, headers=rnd.choice(ctx.fx.patient_headers))
+
+async def review(ctx, rnd):
+    if not ctx.fx.reviewable:
+        return
+    email, appt_id = ctx.fx.reviewable.pop()
+    await ctx.rec.call(ctx.client, f"POST {API}/reviews/", "POST", f"{API}/reviews/",
+                       json={"appointment_id": appt_id, "rating": rnd.randint(3, 5), "comment": "load test"}, headers=ctx.fx.headers_by_email[email])
+
+async def health_tips(ctx, rnd):
+    await ctx.rec.call(ctx.client, f"GET {API}/content/tips", "GET", f"{API}/content/tips")
+
+# Relative weights: browsing dominates, writes and chat are the minority (like the app's real traffic)
+MIX = [
+    (list_doctors, 18), (doctor_detail, 10), (browse_slots, 18), (doctor_poll, 15), (my_appointments, 10),
+    (health_tips, 8), (book_and_pay, 8), (login, 5), (chat, 5), (review, 3),
+]
+
+class Context:
+    def __init__(self, client, fixtures, recorder):
+        self.client = client
+        self.fx = fixtures
+        self.rec = recorder
+
+async def virtual_user(ctx, seed: int, deadline: float, think_ms: float):
+    rnd = random.Random(seed)
+    scenarios = [scenario for scenario, _ in MIX]
+    cum = list(itertools.accumulate(weight for _, weight in MIX))
+    while time.perf_counter() < deadline:
+        await rnd.choices(scenarios, cum_weights=cum)[0](ctx, rnd)
+        if think_ms:
+            await asyncio.sleep(rnd.expovariate(1 / think_ms) / 1000)
+
+# --- SERVER-SIDE RECORDS (db_queries per request) ---
+
+class ServerRecords:
+    """Collects the middleware's `app.request` records: in-process via a handler, or from a spawned server's JSON logs."""
+
+    def __init__(self):
+        self.by_endpoint = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def add(self, data: dict) -> None:
+        with self._lock:
+            self.by_endpoint[f"{data['method']} {data['route']}"].append(data)
+
+    def attach_in_process(self) -> None:
+        from app.core import config
+        config.LOG_REQUEST_SAMPLE_RATE = 1.0 # every request, not a sample
+        records = self
+
+        class Capture(logging.Handler):
+            def emit(self, record):
+                records.add(record.__dict__)
+
+        request_logger = logging.getLogger("app.request")
+        request_logger.setLevel(logging.INFO)
+        request_logger.propagate = False # keep them off stderr
+        request_logger.addHandler(Capture())
+
+    def follow(self, stream) -> None:
+        def reader():
+            for line in stream:
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    continue
+                if data.get("logger") == "app.request":
+                    self.add(data)
+        threading.Thread(target=reader, daemon=True).start()
+
+def spawn_server(workers: int, port: int, ai_latency_ms: float, records: ServerRecords):
+    env = dict(LOG_FORMAT="json", LOG_REQUEST_SAMPLE_RATE="1.0", LOG_LEVELS="app.request=INFO", STUB_AI_LATENCY_MS=str(ai_latency_ms))
+    return common.spawn_stub_server(workers, port, env, on_start=lambda proc: records.follow(proc.stderr),
+                                    stderr=subprocess.PIPE, text=True)
+
+# --- REPORT ---
+
+def summarize(recorder: Recorder, records: ServerRecords, elapsed: float) -> dict:
+    endpoints = {}
+    for endpoint in sorted(set(recorder.latencies) | set(recorder.transport_errors)):
+        latencies = recorder.latencies[endpoint]
+        statuses = recorder.statuses[endpoint]
+        server = records.by_endpoint.get(endpoint, [])
+        queries = [r["db_queries"] for r in server]
+        endpoints[endpoint] = {
+            "requests": len(latencies),
+            "throughput_rps": round(len(latencies) / elapsed, 2),
+            "latency_ms": {
+                "p50": round(percentile(latencies, 0.50) * 1000, 1),
+                "p95": round(percentile(latencies, 0.95) * 1000, 1),
+                "p99": round(percentile(latencies, 0.99) * 1000, 1),
+                "mean": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0.0,
+                "max": round(max(latencies) * 1000, 1) if latencies else 0.0,
+            },
+            "status_counts": {str(code): n for code, n in sorted(statuses.items())},
+            "server_errors": sum(n for code, n in statuses.items() if code >= 500),
+            "transport_errors": recorder.transport_errors[endpoint],
+            "db_queries": {
+                "mean": round(sum(queries) / len(queries), 2),
+                "p95": percentile(queries, 0.95),
+                "max": max(queries),
+            } if queries else None,
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    return {
+        "total_requests": total,
+        "throughput_rps": round(total / elapsed, 1),
+        "server_errors": sum(e["server_errors"] for e in endpoints.values()),
+        "endpoints": endpoints,
+    }
+
+def git_info() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {"commit": git("rev-parse", "--short", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+def print_table(summary: dict) -> None:
+    print(f"{'endpoint':<52} {'reqs':>6} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'q/req':>6} {'5xx':>4}")
+    for endpoint, e in summary["endpoints"].items():
+        q = e["db_queries"]["mean"] if e["db_queries"] else "-"
+        lat = e["latency_ms"]
+        print(f"{endpoint:<52} {e['requests']:>6} {e['throughput_rps']:>7} {lat['p50']:>8} {lat['p95']:>8} {lat['p99']:>8} {q:>6} {e['server_errors']:>4}")
+    print(f"Total: {summary['total_requests']} requests, {summary['throughput_rps']} rps, {summary['server_errors']} server errors")
+
+def compare(base_path: str, new_path: str) -> None:
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"base {base['meta']['git']['commit']}  ->  new {new['meta']['git']['commit']}")
+    print(f"{'endpoint':<52} {'p50 ms':>16} {'p99 ms':>16} {'rps':>14} {'q/req':>12}")
+
+    def pair(a, b):
+        return f"{a}->{b}"
+
+    for endpoint in sorted(set(base["summary"]["endpoints"]) | set(new["summary"]["endpoints"])):
+        a, b = base["summary"]["endpoints"].get(endpoint), new["summary"]["endpoints"].get(endpoint)
+        if not a or not b:
+            print(f"{endpoint:<52} {'only in ' + ('new' if b else 'base'):>16}")
+            continue
+        qa = a["db_queries"]["mean"] if a["db_queries"] else "-"
+        qb = b["db_queries"]["mean"] if b["db_queries"] else "-"
+        print(f"{endpoint:<52} {pair(a['latency_ms']['p50'], b['latency_ms']['p50']):>16} {pair(a['latency_ms']['p99'], b['latency_ms']['p99']):>16} "
+              f"{pair(a['throughput_rps'], b['throughput_rps']):>14} {pair(qa, qb):>12}")
+
+# --- MAIN ---
+
+async def run(args, records: ServerRecords, base_url):
+    fixtures = Fixtures(args.patients, args.doctors, args.slots_per_doctor, args.reviews_per_patient, args.queue)
+    recorder = Recorder()
+    async with common.make_client(base_url) as client:
+        ctx = Context(client, fixtures, recorder)
+        if args.warmup:
+            await asyncio.gather(*(virtual_user(ctx, 10_000 + i, time.perf_counter() + args.warmup, args.think_ms) for i in range(args.users)))
+            recorder.__init__()
+            records.by_endpoint.clear()
+        started = time.perf_counter()
+        await asyncio.gather(*(virtual_user(ctx, args.seed + i, started + args.duration, args.think_ms) for i in range(args.users)))
+        elapsed = time.perf_counter() - started
+    if not base_url:
+        await common.close_app()
+    # Give a spawned server's log pipe a moment to drain
+    await asyncio.sleep(0.5 if args.serve else 0)
+    return summarize(recorder, records, elapsed)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds of unmeasured load first")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean pause between a user's actions")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--doctors", type=int, default=20)
+    parser.add_argument("--slots-per-doctor", type=int, default=100)
+    parser.add_argument("--reviews-per-patient", type=int, default=3)
+    parser.add_argument("--queue", type=int, default=20, help="paid general consultations waiting in the queue")
+    parser.add_argument("--ai-latency-ms", type=float, default=800.0, help="stubbed model latency")
+    parser.add_argument("--serve", type=int, default=0, metavar="WORKERS", help="spawn uvicorn with this many workers")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--base-url", default=None, help="benchmark an already running server")
+    parser.add_argument("--output", default=None, help="result file (default: benchmarks/results/load-<time>-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="diff two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    records = ServerRecords()
+    server, base_url = None, args.base_url
+    if args.serve:
+        server, base_url = spawn_server(args.serve, args.port, args.ai_latency_ms, records)
+    elif not base_url:
+        import stubs
+        stubs.install(args.ai_latency_ms)
+        records.attach_in_process()
+        logging.getLogger("httpx").setLevel(logging.WARNING) # one line per request otherwise
+
+    try:
+        summary = asyncio.run(run(args, records, base_url))
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+
+    from app.core.database import engine
+    git = git_info()
+    result = {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "git": git,
+            "mode": "uvicorn" if args.serve else "external" if args.base_url else "in-process",
+            "database": engine.dialect.name,
+            "python": platform.python_version(),
+            "args": {k: v for k, v in vars(args).items() if k != "compare"},
+        },
+        "summary": summary,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"load-{datetime.utcnow():%Y%m%d-%H%M%S}-{git['commit'] or 'nogit'}.json")
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+
+    print_table(summary)
+    print(f"📄 Results written to {output}")
+    if summary["server_errors"]:
+        print("❌ Server errors during the run.")
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""
+The API with external services stubbed, for benchmarks against a real server:
+    uvicorn stub_app:app --app-dir benchmarks --workers 4     (from backend/)
+STUB_AI_LATENCY_MS sets the fake model latency, STUB_AI_FIRST_TOKEN_MS when a stream's first token arrives,
+STUB_AI_ERROR_RATE / STUB_AI_SLOW_RATE the share of calls that fail with a 503 / take ten times as long.
+"""
+import os
+
+import common  # also puts backend/ on sys.path
+import stubs
+
+stubs.install(
+    float(os.getenv("STUB_AI_LATENCY_MS", "800")),
+    float(os.getenv("STUB_AI_FIRST_TOKEN_MS", "250")),
+    ai_error_rate=float(os.getenv("STUB_AI_ERROR_RATE", "0")),
+    ai_slow_rate=float(os.getenv("STUB_AI_SLOW_RATE", "0")),
+)
+
+from app.main import app  # noqa: E402
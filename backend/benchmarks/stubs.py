@@ -0,0 +1,67 @@
+"""Stand-ins for the external services, so benchmarks measure our code and not Gemini or Cloudinary."""
+import asyncio
+import random
+
+from app.services import ai_providers, media_service
+
+CANNED_TRIAGE = (
+    "That sounds like a tension headache. **Recommended Action:** Self-care. "
+    "**Immediate Relief:** Hydrate and rest in a quiet room. See a doctor if it lasts more than 48 hours."
+)
+
+class StubOverloaded(Exception):
+    """What the stub raises for an injected failure: a 503, like an overloaded model region."""
+    code = 503
+
+class StubAIProvider(ai_providers.AIProvider):
+    """
+    Answers after a fixed delay with a little jitter, like a model call would.
+    Streaming spends the same total time: the first token after first_token_ms, the rest evenly spaced.
+    For the resilience paths it can misbehave: error_rate of the calls fail with a 503 (after a
+    tenth of the latency), slow_rate of them take slow_factor times as long.
+    """
+    name = "stub"
+
+    def __init__(self, latency_ms: float = 800.0, jitter: float = 0.2, first_token_ms: float = 250.0,
+                 error_rate: float = 0.0, slow_rate: float = 0.0, slow_factor: float = 10.0):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.first_token_ms = min(first_token_ms, latency_ms)
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_factor = slow_factor
+        self.calls = 0
+
+    def _scale(self) -> float:
+        slow = self.slow_factor if random.random() < self.slow_rate else 1.0
+        return slow * random.uniform(1 - self.jitter, 1 + self.jitter) / 1000
+
+    async def _maybe_fail(self) -> None:
+        self.calls += 1
+        if random.random() < self.error_rate:
+            await asyncio.sleep(self.latency_ms / 10000)
+            raise StubOverloaded("stub model overloaded")
+
+    async def generate(self, prompt: str, history=(), system=None) -> str:
+        await self._maybe_fail()
+        await asyncio.sleep(self.latency_ms * self._scale())
+        return CANNED_TRIAGE
+
+    async def stream(self, prompt: str, history=(), system=None):
+        await self._maybe_fail()
+        scale = self._scale()
+        words = CANNED_TRIAGE.split(" ")
+        await asyncio.sleep(self.first_token_ms * scale)
+        gap = (self.latency_ms - self.first_token_ms) * scale / max(1, len(words) - 1)
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(gap)
+            yield word if i == len(words) - 1 else word + " "
+
+class StubStorage(media_service.MediaStorage):
+    def upload(self, content: bytes, folder: str) -> str:
+        return f"https://stub.invalid/{folder}/{len(content)}.bin"
+
+def install(ai_latency_ms: float = 800.0, ai_first_token_ms: float = 250.0, ai_error_rate: float = 0.0, ai_slow_rate: float = 0.0) -> None:
+    ai_providers.set_provider(StubAIProvider(ai_latency_ms, first_token_ms=ai_first_token_ms, error_rate=ai_error_rate, slow_rate=ai_slow_rate))
+    media_service.set_storage(StubStorage())
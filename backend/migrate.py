@@ -0,0 +1,30 @@
+import argparse
+import sys
+import os
+
+# Ensure the script can see the 'app' package
+sys.path.append(os.getcwd())
+
+from app.core.database import engine
+from app.core.migrations import pending, run_migrations
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply database migrations. Run once per deploy, before starting the workers.")
+    parser.add_argument("--status", action="store_true", help="list pending migrations without applying them")
+    args = parser.parse_args()
+
+    if args.status:
+        todo = pending(engine)
+        print(f"{len(todo)} pending migration(s).")
+        for version, module in todo:
+            print(f"  {version}: {(module.__doc__ or '').strip()}")
+        return
+
+    applied = run_migrations(engine)
+    if applied:
+        print(f"✅ Applied {len(applied)} migration(s): {', '.join(applied)}")
+    else:
+        print("✅ Database schema is up to date.")
+
+if __name__ == "__main__":
+    main()
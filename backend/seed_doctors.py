@@ -5,18 +5,18 @@ from datetime import date
 # Ensure the script can see the 'app' package
 sys.path.append(os.getcwd())
 
-from app.core.database import SessionLocal, engine, Base
-# Import ALL models so the Base knows what tables to build
-from app.models import user, doctor, appointment, content, review, audit
+from app.core.database import SessionLocal, engine
+from app.core.migrations import run_migrations
 from app.models.doctor import Doctor
 from app.models.user import User
 from app.core.security import get_password_hash
+from app.services import platform_stats, doctor_stats
 
 def seed_doctors():
     # --- THE FIX: CREATE TABLES IF MISSING ---
     print("🏗️  Checking database schema...")
-    Base.metadata.create_all(bind=engine)
-    print("✅  Tables verified/created.")
+    run_migrations(engine)
+    print("✅  Schema migrated.")
     # -----------------------------------------
 
     db = SessionLocal()
@@ -144,6 +144,10 @@ def seed_doctors():
 
     db.commit()
     print("✅ Successfully seeded 5 doctors into Cloud Database.")
+    # Direct inserts skip the API's counters; rebuild the admin dashboard totals
+    with engine.begin() as conn:
+        platform_stats.recompute(conn)
+        doctor_stats.recompute(conn)
     db.close()
 
 if __name__ == "__main__":
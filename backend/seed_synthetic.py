@@ -0,0 +1,490 @@
+"""
+Production-scale synthetic data for performance work.
+
+Defaults match the sizing we plan for: 50k doctors, 1M patients, 5M slots, 10M appointments,
+1M reviews and 100k health tips. Use --scale to shrink (or grow) every volume at once.
+
+The output is deterministic for a given --seed and --anchor, and each table draws from its own
+random stream, so changing one volume doesn't reshuffle the others. Rows are appended with
+explicit ids after whatever is already in the database. PostgreSQL is loaded with COPY,
+anything else with batched multi-row inserts.
+
+Distributions, roughly:
+  * doctor popularity is heavy-tailed (Pareto): a small share of doctors gets most bookings,
+    and a few patients build up long histories the same way
+  * specialties, cities and plans are weighted (GPs ~35%, Lagos ~30%, premium ~12%)
+  * hourly rates are log-normal around 4,000 NGN in 500 steps
+  * slots span the last year plus the next 30 days, 08:00-17:30; past slots are mostly booked
+  * appointment status and payment follow time: past visits are mostly completed and paid,
+    future ones confirmed or pending; a small set of paid general consultations waits in the queue
+  * reviews come from completed appointments, ratings skewed high with a per-doctor quality offset
+
+All synthetic users share the password below, so load tests can log in as any of them.
+
+Usage (from backend/, database migrated with `python migrate.py`):
+    python seed_synthetic.py --scale 0.01                 # ~100k appointments, seconds
+    python seed_synthetic.py                              # full size
+    python seed_synthetic.py --seed 7 --anchor 2026-01-01 # reproduce an exact dataset
+"""
+import argparse
+import csv
+import io
+import itertools
+import math
+import os
+import random
+import sys
+import time
+from array import array
+from datetime import date, datetime, timedelta
+
+# Ensure the script can see the 'app' package
+sys.path.append(os.getcwd())
+
+from sqlalchemy import func, select, text
+from app.core.database import engine
+from app.core.security import get_password_hash
+from app.models.user import User
+from app.models.doctor import Doctor
+from app.models.appointment import Appointment, DoctorSlot
+from app.models.review import Review
+from app.models.content import HealthTip
+from app.services import platform_stats, doctor_stats, doctor_ratings
+
+SYNTHETIC_PASSWORD = "password123"
+EMAIL_DOMAIN = "synthetic.mediq"
+
+DEFAULT_VOLUMES = {
+    "doctors": 50_000,
+    "patients": 1_000_000,
+    "slots": 5_000_000,
+    "appointments": 10_000_000,
+    "reviews": 1_000_000,
+    "tips": 100_000,
+}
+
+SPECIALTIES = [
+    ("General Practitioner", 35), ("Pediatrician", 10), ("Gynecologist", 8), ("Cardiologist", 6),
+    ("Dermatologist", 6), ("Psychiatrist", 6), ("Endocrinologist", 5), ("Orthopedic Surgeon", 5),
+    ("Ophthalmologist", 5), ("ENT Specialist", 4), ("Neurologist", 4), ("Oncologist", 3), ("Dentist", 3),
+]
+CITIES = [
+    ("Lagos", 30), ("Abuja", 15), ("Port Harcourt", 10), ("Ibadan", 10), ("Kano", 8), ("Benin City", 6),
+    ("Enugu", 6), ("Kaduna", 5), ("Jos", 4), ("Abeokuta", 3), ("Owerri", 3),
+]
+FIRST_NAMES = [
+    "Adaeze", "Chinedu", "Ngozi", "Emeka", "Funmilayo", "Tunde", "Aisha", "Ibrahim", "Yetunde", "Oluwaseun",
+    "Zainab", "Segun", "Chiamaka", "Uche", "Halima", "Babatunde", "Kemi", "Obinna", "Fatima", "Damilola",
+    "Ifeoma", "Musa", "Bisi", "Kelechi", "Amina", "Femi", "Nkechi", "Sani", "Tolu", "Eze",
+]
+LAST_NAMES = [
+    "Okafor", "Adeyemi", "Bello", "Nwosu", "Ogunleye", "Abubakar", "Eze", "Balogun", "Okeke", "Ibrahim",
+    "Adebayo", "Chukwu", "Lawal", "Olawale", "Danjuma", "Obi", "Afolabi", "Nnamdi", "Yusuf", "Oyelaran",
+]
+TIP_CATEGORIES = [
+    ("Prevention", 20), ("Wellness", 18), ("Nutrition", 15), ("Mental Health", 12), ("Cardiology", 8),
+    ("Medication", 8), ("Immunity", 7), ("Maternal Health", 7), ("Fitness", 5),
+]
+TIP_TITLES = [
+    "{n} Signs of {thing}", "Managing {thing}", "{thing}: What You Should Know", "A Beginner's Guide to {thing}",
+    "Myths About {thing}", "When to See a Doctor About {thing}", "{n} Habits That Help With {thing}",
+]
+TIP_THINGS = [
+    "Dehydration", "High Blood Pressure", "Diabetes", "Malaria", "Typhoid", "Sleep Problems", "Stress",
+    "Back Pain", "Migraines", "Allergies", "Anaemia", "Asthma", "Healthy Eating", "Pregnancy Nutrition",
+    "Childhood Vaccines", "Eye Strain", "Heart Health", "Antibiotic Use", "Hand Hygiene", "Weight Loss",
+]
+TIP_SENTENCES = [
+    "Drink enough water through the day, more in hot weather.",
+    "Regular check-ups catch most problems while they are still easy to treat.",
+    "Finish every course of medication exactly as prescribed.",
+    "A balanced plate is half vegetables, a quarter protein and a quarter whole grains.",
+    "Thirty minutes of brisk walking most days lowers blood pressure.",
+    "Sleep seven to nine hours and keep a regular schedule.",
+    "Sleeping under a treated net is still the best protection against malaria.",
+    "Wash your hands with soap for at least twenty seconds.",
+    "Limit salt, sugar and heavily processed food.",
+    "Talk to someone you trust when stress starts to affect your sleep or appetite.",
+    "Seek care quickly for chest pain, difficulty breathing or sudden weakness.",
+    "Keep a list of your medicines and allergies on your phone.",
+]
+REVIEW_COMMENTS = {
+    5: ["Excellent care, very thorough.", "Listened patiently and explained everything.", "Highly recommend.", None],
+    4: ["Good consultation, a bit of a wait.", "Helpful advice.", None],
+    3: ["It was okay.", "Consultation felt rushed.", None],
+    2: ["Doctor joined late.", "Did not really answer my questions.", None],
+    1: ["Very disappointing.", "Call dropped and never resumed.", None],
+}
+
+# Appointment status codes kept in compact arrays between passes
+PENDING, CONFIRMED, COMPLETED, CANCELLED = range(4)
+STATUS_NAMES = ("pending", "confirmed", "completed", "cancelled")
+
+# Pareto weights have an unbounded tail; capping keeps the busiest doctor/patient busy but not absurd
+MAX_POPULARITY = 60.0
+
+GP_PAYOUT = 1750.0
+GP_PRICE = {True: 2500.0, False: 4000.0} # premium => discounted general consultation
+COMMISSION_RATE = 0.30
+# Patients pay right after booking (a fixed offset, so the random streams stay as they were)
+PAYMENT_DELAY = timedelta(minutes=5)
+
+def weighted(options):
+    values = [value for value, _ in options]
+    cum = list(itertools.accumulate(weight for _, weight in options))
+    return values, cum
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+class BulkWriter:
+    """COPY on PostgreSQL (psycopg 3 or psycopg2), batched executemany elsewhere. One transaction per table."""
+
+    def __init__(self, batch_size: int):
+        self.batch_size = batch_size
+
+    def write(self, table, columns, rows) -> int:
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                # The engine caps statements for API traffic; a 10M-row COPY needs longer
+                conn.exec_driver_sql("SET LOCAL statement_timeout = 0")
+                count = self._copy(conn, table.name, columns, rows)
+            else:
+                count = self._insert(conn, table, columns, rows)
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        print(f"   ✅ {table.name}: {count:,} rows in {elapsed:.1f}s ({count / elapsed:,.0f} rows/s)")
+        return count
+
+    def _copy(self, conn, table_name, columns, rows) -> int:
+        sql = f"COPY {table_name} ({', '.join(columns)}) FROM STDIN"
+        count = 0
+        cursor = conn.connection.driver_connection.cursor()
+        try:
+            if hasattr(cursor, "copy"): # psycopg 3
+                with cursor.copy(sql) as copy:
+                    for row in rows:
+                        copy.write_row(row)
+                        count += 1
+            else: # psycopg2: CSV through a buffer, one batch at a time
+                for batch in batched(rows, self.batch_size):
+                    buffer = io.StringIO()
+                    csv.writer(buffer).writerows(batch)
+                    buffer.seek(0)
+                    cursor.copy_expert(f"{sql} WITH (FORMAT csv)", buffer)
+                    count += len(batch)
+        finally:
+            cursor.close()
+        return count
+
+    def _insert(self, conn, table, columns, rows) -> int:
+        count = 0
+        for batch in batched(rows, self.batch_size):
+            conn.execute(table.insert(), [dict(zip(columns, row)) for row in batch])
+            count += len(batch)
+        return count
+
+class SyntheticDataset:
+    def __init__(self, volumes: dict, seed: int, anchor: datetime, writer: BulkWriter):
+        self.v = volumes
+        self.seed = seed
+        self.anchor = anchor
+        self.writer = writer
+        self.window_start = anchor - timedelta(days=365)
+        self.window_days = 365 + 30
+
+    def rng(self, name: str) -> random.Random:
+        # One stream per table: resizing the tips doesn't reshuffle the appointments
+        return random.Random(f"{self.seed}:{name}")
+
+    def next_ids(self):
+        with engine.connect() as conn:
+            def next_id(model):
+                return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+            self.user_start = next_id(User)
+            self.doctor_start = next_id(Doctor)
+            self.slot_start = next_id(DoctorSlot)
+            self.appt_start = next_id(Appointment)
+            self.review_start = next_id(Review)
+            self.tip_start = next_id(HealthTip)
+        self.patient_start = self.user_start + self.v["doctors"]
+
+    # --- USERS ---
+    def users(self):
+        rnd = self.rng("users")
+        cities, city_cum = weighted(CITIES)
+        password = get_password_hash(SYNTHETIC_PASSWORD) # hashed once, shared by every row
+        self.premium = bytearray(self.v["patients"])
+        total = self.v["doctors"] + self.v["patients"]
+        for i in range(total):
+            user_id = self.user_start + i
+            is_doctor = i < self.v["doctors"]
+            age = 18 + min(int(rnd.expovariate(1 / 14)), 70) if not is_doctor else rnd.randint(28, 65)
+            dob = date(self.anchor.year - age, rnd.randint(1, 12), rnd.randint(1, 28))
+            plan, expiry = "free", None
+            if not is_doctor and rnd.random() < 0.12:
+                plan, expiry = "premium", self.anchor + timedelta(days=rnd.randint(1, 365))
+                self.premium[i - self.v["doctors"]] = 1
+            yield (
+                user_id, f"{'doctor' if is_doctor else 'patient'}{user_id}@{EMAIL_DOMAIN}",
+                rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES), password, dob,
+                f"{rnd.choices(cities, cum_weights=city_cum)[0]}, Nigeria",
+                "doctor" if is_doctor else "patient", True, rnd.random() < 0.002, plan, expiry, 0, 0,
+            )
+
+    USER_COLUMNS = ("id", "email", "first_name", "last_name", "hashed_password", "dob", "location", "role",
+                    "is_active", "is_banned", "plan", "subscription_expiry", "daily_chat_count", "burst_chat_count")
+
+    # --- DOCTORS ---
+    def doctors(self):
+        rnd = self.rng("doctors")
+        specialties, specialty_cum = weighted(SPECIALTIES)
+        n = self.v["doctors"]
+        self.hourly_rate = array("d")
+        self.quality = array("d")
+        popularity = []
+        gp_indexes, gp_popularity = [], []
+        for i in range(n):
+            specialty = rnd.choices(specialties, cum_weights=specialty_cum)[0]
+            rate = min(20000.0, max(1500.0, round(rnd.lognormvariate(math.log(4000), 0.35) / 500) * 500))
+            weight = min(rnd.paretovariate(1.16), MAX_POPULARITY)
+            self.hourly_rate.append(rate)
+            self.quality.append(rnd.gauss(0, 0.4))
+            popularity.append(weight)
+            if specialty == "General Practitioner":
+                gp_indexes.append(i)
+                gp_popularity.append(weight)
+            first, last = rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES)
+            doctor_id = self.doctor_start + i
+            yield (
+                doctor_id, self.user_start + i, f"Dr. {first} {last}", specialty,
+                f"{specialty} with a focus on preventive care and clear explanations.",
+                f"https://i.pravatar.cc/150?u=syn{doctor_id}", rate, 5.0, 0,
+                min(40, 1 + int(rnd.expovariate(1 / 8))), rnd.random() < 0.75, f"SYN-{doctor_id}", rnd.random() < 0.92,
+            )
+        self.doctor_cum = list(itertools.accumulate(popularity))
+        # Guarantee somebody can take general consultations even in tiny runs
+        self.gp_indexes = gp_indexes or [0]
+        self.gp_cum = list(itertools.accumulate(gp_popularity or [1.0]))
+
+    DOCTOR_COLUMNS = ("id", "user_id", "full_name", "specialty", "bio", "image_url", "hourly_rate", "rating",
+                      "review_count", "years_experience", "is_available", "license_number", "is_verified")
+
+    # --- SLOTS (plus the status of the appointment booked into each one) ---
+    def plan_slots(self):
+        """Slots are generated before anything is written, so each slot's booked flag can follow its appointment."""
+        rnd = self.rng("slots")
+        n = self.v["slots"]
+        doctor_range = range(self.v["doctors"])
+        anchor_ts = self.anchor.timestamp()
+        start_ts = self.window_start.timestamp()
+        self.slot_doctor = array("i")
+        self.slot_ts = array("d")
+        self.slot_status = bytearray() # 255 = nobody booked it
+        booked = 0
+        for chunk in batched(range(n), 10_000):
+            for doctor_index in rnd.choices(doctor_range, cum_weights=self.doctor_cum, k=len(chunk)):
+                day = rnd.randrange(self.window_days)
+                ts = start_ts + day * 86400 + (8 * 3600) + rnd.randrange(20) * 1800
+                past = ts < anchor_ts
+                if booked < self.v["appointments"] and rnd.random() < (0.85 if past else 0.35):
+                    roll = rnd.random()
+                    if past:
+                        status = COMPLETED if roll < 0.80 else CANCELLED if roll < 0.93 else CONFIRMED if roll < 0.95 else PENDING
+                    else:
+                        status = CONFIRMED if roll < 0.55 else PENDING if roll < 0.93 else CANCELLED
+                    booked += 1
+                else:
+                    status = 255
+                self.slot_doctor.append(doctor_index)
+                self.slot_ts.append(ts)
+                self.slot_status.append(status)
+        self.slotted = booked
+
+    def slots(self):
+        for i in range(len(self.slot_doctor)):
+            # Cancelling frees the slot again, exactly as the API does
+            is_booked = self.slot_status[i] not in (255, CANCELLED)
+            yield (self.slot_start + i, self.doctor_start + self.slot_doctor[i], datetime.fromtimestamp(self.slot_ts[i]), is_booked)
+
+    SLOT_COLUMNS = ("id", "doctor_id", "start_time", "is_booked")
+
+    # --- APPOINTMENTS (reviews are sampled on the way through) ---
+    def appointments(self):
+        rnd = self.rng("appointments")
+        review_rnd = self.rng("review-sample")
+        n_patients = self.v["patients"]
+        patient_range = range(n_patients)
+        patient_cum = list(itertools.accumulate(min(rnd.paretovariate(1.5), MAX_POPULARITY) for _ in patient_range))
+        anchor_ts = self.anchor.timestamp()
+        start_ts = self.window_start.timestamp()
+        # Reservoir of completed appointments that get a review
+        self.review_appt, self.review_doctor, self.review_patient, self.review_ts = array("q"), array("i"), array("q"), array("d")
+        seen_completed = 0
+        target_reviews = self.v["reviews"]
+
+        def sample_review(appt_id, doctor_index, patient_id, ts):
+            nonlocal seen_completed
+            seen_completed += 1
+            if len(self.review_appt) < target_reviews:
+                self.review_appt.append(appt_id); self.review_doctor.append(doctor_index)
+                self.review_patient.append(patient_id); self.review_ts.append(ts)
+            else:
+                j = review_rnd.randrange(seen_completed)
+                if j < target_reviews:
+                    self.review_appt[j], self.review_doctor[j], self.review_patient[j], self.review_ts[j] = appt_id, doctor_index, patient_id, ts
+
+        appt_id = self.appt_start
+        patients = iter(())
+
+        def next_patient():
+            nonlocal patients
+            try:
+                return next(patients)
+            except StopIteration:
+                patients = iter(rnd.choices(patient_range, cum_weights=patient_cum, k=10_000))
+                return next(patients)
+
+        # 1. One appointment per booked slot
+        for i, status in enumerate(self.slot_status):
+            if status == 255:
+                continue
+            doctor_index = self.slot_doctor[i]
+            patient_index = next_patient()
+            slot_ts = self.slot_ts[i]
+            if status in (COMPLETED, CONFIRMED):
+                payment = "paid"
+            elif status == CANCELLED:
+                payment = "paid" if rnd.random() < 0.4 else "unpaid"
+            else:
+                payment = "paid" if slot_ts >= anchor_ts and rnd.random() < 0.6 else "unpaid"
+            amount = self.hourly_rate[doctor_index]
+            booked_at = datetime.fromtimestamp(min(slot_ts, anchor_ts) - rnd.uniform(3600, 14 * 86400))
+            patient_id = self.patient_start + patient_index
+            if status == COMPLETED:
+                sample_review(appt_id, doctor_index, patient_id, slot_ts)
+            yield (appt_id, patient_id, self.doctor_start + doctor_index, self.slot_start + i, booked_at,
+                   STATUS_NAMES[status], payment, None, amount, amount * COMMISSION_RATE, amount * (1 - COMMISSION_RATE),
+                   booked_at + PAYMENT_DELAY if payment == "paid" else None)
+            appt_id += 1
+
+        # 2. General consultations fill the rest; the newest few paid ones are still waiting in the queue
+        for _ in range(self.v["appointments"] - self.slotted):
+            ts = start_ts + rnd.random() * (anchor_ts - start_ts)
+            patient_index = next_patient()
+            patient_id = self.patient_start + patient_index
+            recent = anchor_ts - ts < 2 * 86400
+            roll = rnd.random()
+            doctor_index = self.gp_indexes[rnd.choices(range(len(self.gp_indexes)), cum_weights=self.gp_cum)[0]]
+            if recent:
+                status, payment = (PENDING, "paid") if roll < 0.3 else (CONFIRMED, "paid") if roll < 0.8 else (PENDING, "unpaid")
+            else:
+                status, payment = (COMPLETED, "paid") if roll < 0.82 else (CANCELLED, "paid") if roll < 0.92 else (CONFIRMED, "paid") if roll < 0.95 else (PENDING, "unpaid")
+            claimed = status in (CONFIRMED, COMPLETED) or (status == CANCELLED and rnd.random() < 0.5)
+            price = GP_PRICE[bool(self.premium[patient_index])]
+            if status == COMPLETED:
+                sample_review(appt_id, doctor_index, patient_id, ts)
+            yield (appt_id, patient_id, self.doctor_start + doctor_index if claimed else None, None, datetime.fromtimestamp(ts),
+                   STATUS_NAMES[status], payment, "Synthetic general consultation", price, price - GP_PAYOUT, GP_PAYOUT,
+                   datetime.fromtimestamp(ts) + PAYMENT_DELAY if payment == "paid" else None)
+            appt_id += 1
+
+    APPOINTMENT_COLUMNS = ("id", "patient_id", "doctor_id", "slot_id", "start_time", "status", "payment_status",
+                           "notes", "amount", "commission", "payout", "paid_at")
+
+    # --- REVIEWS ---
+    def reviews(self):
+        rnd = self.rng("reviews")
+        order = sorted(range(len(self.review_appt)), key=self.review_appt.__getitem__)
+        for k, i in enumerate(order):
+            doctor_index = self.review_doctor[i]
+            rating = min(5, max(1, round(rnd.gauss(4.3 + self.quality[doctor_index], 0.9))))
+            created = datetime.fromtimestamp(self.review_ts[i] + rnd.uniform(3600, 3 * 86400))
+            yield (self.review_start + k, self.review_appt[i], self.doctor_start + doctor_index, self.review_patient[i],
+                   rating, rnd.choice(REVIEW_COMMENTS[rating]), created)
+
+    REVIEW_COLUMNS = ("id", "appointment_id", "doctor_id", "patient_id", "rating", "comment", "created_at")
+
+    def update_doctor_ratings(self):
+        """Doctors are written before their reviews exist, so the aggregates land in a second pass."""
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                conn.exec_driver_sql("SET LOCAL statement_timeout = 0")
+            doctor_ratings.recompute(conn, Doctor.id >= self.doctor_start)
+        print(f"   ✅ doctors: ratings for {self.v['doctors']:,} doctors in {time.perf_counter() - started:.1f}s")
+
+    # --- HEALTH TIPS ---
+    def tips(self):
+        rnd = self.rng("tips")
+        categories, category_cum = weighted(TIP_CATEGORIES)
+        for i in range(self.v["tips"]):
+            tip_id = self.tip_start + i
+            title = rnd.choice(TIP_TITLES).format(n=rnd.randint(3, 12), thing=rnd.choice(TIP_THINGS))
+            body = " ".join(rnd.sample(TIP_SENTENCES, rnd.randint(3, 7)))
+            created = self.anchor - timedelta(days=rnd.uniform(0, 3 * 365))
+            yield (tip_id, title, rnd.choices(categories, cum_weights=category_cum)[0], f"{rnd.randint(2, 8)} min",
+                   f"https://i.pravatar.cc/150?u=tip{tip_id}", body, created)
+
+    TIP_COLUMNS = ("id", "title", "category", "read_time", "image_url", "content", "created_at")
+
+    def sync_sequences(self):
+        # Rows were written with explicit ids; move PostgreSQL's sequences past them
+        if engine.dialect.name != "postgresql":
+            return
+        with engine.begin() as conn:
+            for table in ("users", "doctors", "doctor_slots", "appointments", "reviews", "health_tips"):
+                conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"))
+
+    def run(self):
+        self.next_ids()
+        w = self.writer
+        print("👥 Users...")
+        w.write(User.__table__, self.USER_COLUMNS, self.users())
+        print("🩺 Doctors...")
+        w.write(Doctor.__table__, self.DOCTOR_COLUMNS, self.doctors())
+        print("📅 Slots...")
+        self.plan_slots()
+        w.write(DoctorSlot.__table__, self.SLOT_COLUMNS, self.slots())
+        print(f"📋 Appointments ({self.slotted:,} in slots, the rest general consultations)...")
+        w.write(Appointment.__table__, self.APPOINTMENT_COLUMNS, self.appointments())
+        print("⭐ Reviews...")
+        w.write(Review.__table__, self.REVIEW_COLUMNS, self.reviews())
+        self.update_doctor_ratings()
+        print("📰 Health tips...")
+        w.write(HealthTip.__table__, self.TIP_COLUMNS, self.tips())
+        self.sync_sequences()
+        print("📊 Dashboard totals...")
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                conn.exec_driver_sql("SET LOCAL statement_timeout = 0")
+            platform_stats.recompute(conn)
+            doctor_stats.recompute(conn)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every default volume, e.g. 0.01")
+    for name, default in DEFAULT_VOLUMES.items():
+        parser.add_argument(f"--{name}", type=int, default=None, help=f"default {default:,} x scale")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--anchor", type=date.fromisoformat, default=None,
+                        help="the dataset's 'today' (YYYY-MM-DD); defaults to the real today")
+    parser.add_argument("--batch-size", type=int, default=20_000)
+    args = parser.parse_args()
+
+    volumes = {
+        name: getattr(args, name) if getattr(args, name) is not None else max(1, int(default * args.scale))
+        for name, default in DEFAULT_VOLUMES.items()
+    }
+    anchor_day = args.anchor or datetime.utcnow().date()
+    anchor = datetime(anchor_day.year, anchor_day.month, anchor_day.day)
+
+    print(f"🌱 Synthetic dataset (seed {args.seed}, anchor {anchor_day}): " + ", ".join(f"{n:,} {name}" for name, n in volumes.items()))
+    started = time.perf_counter()
+    SyntheticDataset(volumes, args.seed, anchor, BulkWriter(args.batch_size)).run()
+    print(f"✅ Done in {time.perf_counter() - started:.1f}s. Every synthetic user's password is '{SYNTHETIC_PASSWORD}'.")
+
+if __name__ == "__main__":
+    main()
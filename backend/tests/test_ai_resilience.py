@@ -0,0 +1,131 @@
+import asyncio
+import time
+import pytest
+from app.core import config
+from app.services import ai_providers
+from app.services.ai_resilience import CircuitBreaker, CircuitOpenError, ResilientProvider
+
+class Overloaded(Exception):
+    code = 503
+
+class Rejected(Exception):
+    code = 400
+
+class FakeProvider(ai_providers.AIProvider):
+    """Plays back `script`, one item per call: an exception to raise, "hang" to block until cancelled, or the answer."""
+    name = "fake"
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate(self, prompt, history=(), system=None):
+        self.calls += 1
+        step = self.script.pop(0) if self.script else "ok"
+        if isinstance(step, Exception):
+            raise step
+        if step == "hang":
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+        return step
+
+@pytest.fixture(autouse=True)
+def settings(monkeypatch):
+    monkeypatch.setattr(config, "AI_MAX_RETRIES", 0)
+    monkeypatch.setattr(config, "AI_RETRY_BASE_MS", 1)
+    monkeypatch.setattr(config, "AI_BREAKER_FAILURES", 3)
+    monkeypatch.setattr(config, "AI_BREAKER_COOLDOWN_SECONDS", 30.0)
+    monkeypatch.setattr(config, "AI_HEDGE_ENABLED", False)
+
+def call(provider: ResilientProvider) -> str:
+    return asyncio.run(provider.generate("headache"))
+
+def cool_down(breaker: CircuitBreaker) -> None:
+    # As if the cooldown had passed, without waiting for it
+    breaker.opened_at = time.monotonic() - breaker.cooldown - 1
+
+def test_breaker_opens_after_retryable_failures():
+    fake = FakeProvider(*(Overloaded() for _ in range(3)))
+    provider = ResilientProvider(fake)
+    for _ in range(3):
+        with pytest.raises(Overloaded):
+            call(provider)
+    assert provider.breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        call(provider)
+    assert fake.calls == 3 # the rejected call never reached the provider
+    assert provider.counts["rejected"] == 1
+
+def test_half_open_trial_success_closes():
+    provider = ResilientProvider(FakeProvider(Overloaded(), Overloaded(), Overloaded(), "better"))
+    for _ in range(3):
+        with pytest.raises(Overloaded):
+            call(provider)
+    cool_down(provider.breaker)
+    assert call(provider) == "better"
+    assert provider.breaker.state == CircuitBreaker.CLOSED
+    assert provider.breaker.consecutive_failures == 0
+
+def test_half_open_trial_failure_reopens():
+    fake = FakeProvider(*(Overloaded() for _ in range(4)))
+    provider = ResilientProvider(fake)
+    for _ in range(3):
+        with pytest.raises(Overloaded):
+            call(provider)
+    cool_down(provider.breaker)
+    with pytest.raises(Overloaded):
+        call(provider)
+    assert provider.breaker.state == CircuitBreaker.OPEN
+    assert provider.breaker.opens == 2
+    with pytest.raises(CircuitOpenError):
+        call(provider)
+    assert fake.calls == 4
+
+def test_half_open_lets_one_trial_through():
+    breaker = CircuitBreaker(failures=1, cooldown=30.0)
+    breaker.failed()
+    cool_down(breaker)
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+def test_retryable_error_is_retried(monkeypatch):
+    monkeypatch.setattr(config, "AI_MAX_RETRIES", 2)
+    fake = FakeProvider(Overloaded(), "ok")
+    provider = ResilientProvider(fake)
+    assert call(provider) == "ok"
+    assert fake.calls == 2 and provider.counts["retries"] == 1
+
+def test_non_retryable_error_is_not_retried(monkeypatch):
+    monkeypatch.setattr(config, "AI_MAX_RETRIES", 3)
+    fake = FakeProvider(*(Rejected() for _ in range(5)))
+    provider = ResilientProvider(fake)
+    for _ in range(5):
+        with pytest.raises(Rejected):
+            call(provider)
+    assert fake.calls == 5 and provider.counts["retries"] == 0
+    # The provider answered: not held against it
+    assert provider.breaker.state == CircuitBreaker.CLOSED
+
+def test_hedge_cancels_the_losing_call(monkeypatch):
+    monkeypatch.setattr(config, "AI_HEDGE_ENABLED", True)
+    monkeypatch.setattr(config, "AI_HEDGE_MIN_SAMPLES", 1)
+    monkeypatch.setattr(config, "AI_HEDGE_BUDGET", 1.0)
+    fake = FakeProvider("hang", "hedge")
+    provider = ResilientProvider(fake)
+    provider.recent.add(0.01) # p95 so far: hedge after 10 ms
+
+    async def run():
+        assert await provider.generate("headache") == "hedge"
+        await asyncio.sleep(0) # let the cancellation reach the first call
+        # Checked before asyncio.run() returns: it would cancel a leftover task itself
+        assert fake.cancelled == 1
+
+    asyncio.run(run())
+    assert fake.calls == 2
+    assert provider.counts["hedged"] == 1 and provider.counts["hedge_wins"] == 1
@@ -0,0 +1,36 @@
+import pytest
+from app.core import config
+from app.services.triage_cache import TriageCache, embed, normalize, _cosine
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(config, "TRIAGE_CACHE_ENABLED", True)
+    monkeypatch.setattr(config, "TRIAGE_CACHE_SEMANTIC", True)
+    return TriageCache(maxsize=100, ttl=3600)
+
+def similarity(a: str, b: str) -> float:
+    return _cosine(embed(normalize(a)), embed(normalize(b)))
+
+@pytest.mark.parametrize("stored, asked", [
+    ("I have a headache but no fever", "I have a fever but no headache"),
+    ("No fever or cough, just a sore throat", "Fever and cough but no sore throat"),
+    ("I don't have a rash", "I have a rash"),
+])
+def test_swapped_negation_misses(cache, stored, asked):
+    cache.put(stored, "advice for: " + stored)
+    assert cache.get(asked) is None
+    assert similarity(stored, asked) < config.TRIAGE_CACHE_SIMILARITY
+
+def test_rewording_hits(cache):
+    cache.put("I have a headache but no fever", "rest")
+    assert cache.get("headache, but no fever") == "rest"
+    assert cache.get("Headaches but no fever!") == "rest"
+    assert cache.similar_hits == 2
+
+def test_negation_carries_across_or():
+    assert similarity("no fever or cough", "no fever and a cough") < 1.0
+
+def test_emergencies_never_cached(cache):
+    cache.put("crushing chest pain", "rest")
+    assert cache.get("crushing chest pain") is None
+    assert cache.stats()["size"] == 0